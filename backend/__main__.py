@@ -0,0 +1,7 @@
+"""Entry point for `python -m backend` (see backend/cli.py)"""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Apply Planner
+The dependency graph of the Terraform that generate_terraform_code writes,
+and how long `terraform apply` should take to walk it.
+
+Terraform creates a resource once everything it references exists, up to
+-parallelism resources at a time. The graph mirrors the references in
+terraform.py's templates:
+
+    VPC → internet gateway, subnets
+    subnet + gateway → route table → route table association
+    VPC → security group → instances ← subnet
+    subnets → DB subnet group → database
+    subnets → load balancer;  VPC → target group → attachments ← instance
+
+The plan reports:
+- waves: resources grouped by depth, each wave can be created in parallel
+- critical path: the chain with the longest total provisioning time, which
+  bounds the apply however high -parallelism is set
+- estimated apply time at a given -parallelism, from a simulation of
+  Terraform's walk with the latencies in PROVISIONING_SECONDS
+- suggested parallelism: the lowest setting that gets within 5% of the
+  critical path
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from .model import InfrastructureModel, SubnetType
+from .terraform import tf_name
+
+
+# Typical create times in seconds for each resource type. Databases and
+# load balancers dominate: Terraform waits until RDS reports "available"
+# and the ALB "active".
+PROVISIONING_SECONDS = {
+    "aws_vpc": 5.0,
+    "aws_internet_gateway": 3.0,
+    "aws_subnet": 4.0,
+    "aws_route_table": 3.0,
+    "aws_route_table_association": 1.0,
+    "aws_security_group": 4.0,
+    "aws_instance": 40.0,
+    "aws_db_subnet_group": 2.0,
+    "aws_db_instance": 420.0,
+    "aws_lb": 180.0,
+    "aws_lb_target_group": 3.0,
+    "aws_lb_target_group_attachment": 1.0,
+}
+
+# Used for resource types missing from the latency table
+DEFAULT_SECONDS = 5.0
+
+# terraform apply's default -parallelism
+DEFAULT_PARALLELISM = 10
+
+# The suggested parallelism is the lowest within this factor of the critical path
+SUGGESTION_TOLERANCE = 1.05
+
+
+def terraform_dependency_graph(model: InfrastructureModel) -> Dict[str, List[str]]:
+    """
+    Terraform address → addresses it depends on, for every resource
+    generate_terraform_code emits. Resources are in file order, which
+    always lists a dependency before its dependents.
+    """
+    graph: Dict[str, List[str]] = {}
+    first_vpc = f"aws_vpc.{tf_name(model.vpcs[0].id)}" if model.vpcs else None
+
+    for vpc in model.vpcs:
+        vpc_tf = tf_name(vpc.id)
+        vpc_address = f"aws_vpc.{vpc_tf}"
+        graph[vpc_address] = []
+        gateway = f"aws_internet_gateway.{vpc_tf}_igw"
+        if any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets):
+            graph[gateway] = [vpc_address]
+        for subnet in vpc.subnets:
+            tf = tf_name(subnet.id)
+            graph[f"aws_subnet.{tf}"] = [vpc_address]
+            if subnet.subnet_type == SubnetType.PUBLIC:
+                graph[f"aws_route_table.{tf}_rt"] = [vpc_address, gateway]
+                graph[f"aws_route_table_association.{tf}_rta"] = [f"aws_subnet.{tf}", f"aws_route_table.{tf}_rt"]
+
+    security_group = "aws_security_group.ec2_sg"
+    if model.ec2_instances or model.rds_databases:
+        graph[security_group] = [first_vpc] if first_vpc else []
+
+    for ec2 in model.ec2_instances:
+        graph[f"aws_instance.{tf_name(ec2.id)}"] = [f"aws_subnet.{tf_name(ec2.subnet_id)}", security_group]
+
+    for rds in model.rds_databases:
+        tf = tf_name(rds.id)
+        graph[f"aws_db_subnet_group.{tf}_subnet_group"] = [f"aws_subnet.{tf_name(s)}" for s in rds.subnet_ids]
+        graph[f"aws_db_instance.{tf}"] = [f"aws_db_subnet_group.{tf}_subnet_group"]
+
+    for lb in model.load_balancers:
+        tf = tf_name(lb.id)
+        graph[f"aws_lb.{tf}"] = [f"aws_subnet.{tf_name(s)}" for s in lb.subnet_ids]
+        if lb.target_instance_ids:
+            graph[f"aws_lb_target_group.{tf}_tg"] = [first_vpc] if first_vpc else []
+            for target_id in lb.target_instance_ids:
+                graph[f"aws_lb_target_group_attachment.{tf}_{tf_name(target_id)}"] = [
+                    f"aws_lb_target_group.{tf}_tg", f"aws_instance.{tf_name(target_id)}"
+                ]
+
+    # References to resources the model doesn't have (e.g. a removed subnet)
+    # fail at plan time anyway; they don't order anything
+    return {address: [d for d in dependencies if d in graph] for address, dependencies in graph.items()}
+
+
+def topological_waves(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Group resources into waves: a resource's wave is one more than its
+    deepest dependency's. Raises ValueError on a dependency cycle.
+    """
+    dependents: Dict[str, List[str]] = {address: [] for address in graph}
+    remaining = {}
+    for address, dependencies in graph.items():
+        remaining[address] = len(dependencies)
+        for dependency in dependencies:
+            dependents[dependency].append(address)
+
+    waves = []
+    wave = [address for address, count in remaining.items() if count == 0]
+    placed = 0
+    while wave:
+        waves.append(wave)
+        placed += len(wave)
+        next_wave = []
+        for address in wave:
+            for dependent in dependents[address]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    next_wave.append(dependent)
+        wave = next_wave
+
+    if placed < len(graph):
+        raise ValueError(f"Dependency cycle among {len(graph) - placed} resource(s)")
+    return waves
+
+
+def resource_type(address: str) -> str:
+    return address.split(".", 1)[0]
+
+
+class ApplyPlan:
+    """Waves, critical path and apply time estimates for a dependency graph"""
+    def __init__(self, graph: Dict[str, List[str]], latencies: Optional[Dict[str, float]] = None,
+                 parallelism: int = DEFAULT_PARALLELISM):
+        if parallelism < 1:
+            raise ValueError("parallelism must be at least 1")
+        table = {**PROVISIONING_SECONDS, **(latencies or {})}
+        self.graph = graph
+        self.parallelism = parallelism
+        self.seconds = {address: table.get(resource_type(address), DEFAULT_SECONDS) for address in graph}
+        self.waves = topological_waves(graph)
+        self.order = [address for wave in self.waves for address in wave]
+        self.critical_path, self.critical_path_seconds = self.find_critical_path()
+        self.estimated_seconds = self.simulate(parallelism)
+        self.suggested_parallelism = self.suggest_parallelism()
+
+    def find_critical_path(self) -> Tuple[List[str], float]:
+        """The dependency chain with the latest finish time, and that time"""
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for address in self.order:
+            slowest = max(self.graph[address], key=finish.__getitem__, default=None)
+            previous[address] = slowest
+            finish[address] = self.seconds[address] + (finish[slowest] if slowest else 0.0)
+        if not finish:
+            return [], 0.0
+
+        end = max(self.order, key=finish.__getitem__)
+        path = []
+        node: Optional[str] = end
+        while node:
+            path.append(node)
+            node = previous[node]
+        return path[::-1], finish[end]
+
+    def simulate(self, parallelism: int) -> float:
+        """
+        Apply time with at most parallelism resources in flight: each
+        resource starts once its dependencies are done and a slot is free.
+        Terraform's walk has no set order among ready resources; file
+        order stands in for it.
+        """
+        addresses = list(self.graph)
+        position = {address: i for i, address in enumerate(addresses)}
+        dependents: Dict[str, List[str]] = {address: [] for address in self.graph}
+        remaining = {}
+        for address, dependencies in self.graph.items():
+            remaining[address] = len(dependencies)
+            for dependency in dependencies:
+                dependents[dependency].append(address)
+
+        ready = [position[address] for address in self.waves[0]] if self.waves else []
+        heapq.heapify(ready)
+        running: List[Tuple[float, int]] = []
+        now = 0.0
+        while ready or running:
+            while ready and len(running) < parallelism:
+                address = addresses[heapq.heappop(ready)]
+                heapq.heappush(running, (now + self.seconds[address], position[address]))
+            now, index = heapq.heappop(running)
+            for dependent in dependents[addresses[index]]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, position[dependent])
+        return now
+
+    def suggest_parallelism(self) -> int:
+        """Lowest parallelism whose estimate is within SUGGESTION_TOLERANCE of the critical path"""
+        target = self.critical_path_seconds * SUGGESTION_TOLERANCE
+        low, high = 1, max((len(wave) for wave in self.waves), default=1)
+        # Estimates only fall as parallelism rises (up to list-scheduling
+        # anomalies), so binary search
+        while low < high:
+            middle = (low + high) // 2
+            if self.simulate(middle) <= target:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def to_dict(self) -> Dict:
+        return {
+            "resources": len(self.graph),
+            "waves": [
+                {"wave": i, "resources": wave, "seconds": max(self.seconds[a] for a in wave)}
+                for i, wave in enumerate(self.waves)
+            ],
+            "max_wave_width": max((len(wave) for wave in self.waves), default=0),
+            "critical_path": [{"address": a, "seconds": self.seconds[a]} for a in self.critical_path],
+            "critical_path_seconds": self.critical_path_seconds,
+            "parallelism": self.parallelism,
+            "estimated_seconds": self.estimated_seconds,
+            "suggested_parallelism": self.suggested_parallelism,
+            "estimated_seconds_at_suggested": self.simulate(self.suggested_parallelism),
+        }
+
+
+def plan_apply(model: InfrastructureModel, parallelism: int = DEFAULT_PARALLELISM,
+               latencies: Optional[Dict[str, float]] = None) -> ApplyPlan:
+    """Apply plan for the Terraform generated from model"""
+    return ApplyPlan(terraform_dependency_graph(model), latencies, parallelism)
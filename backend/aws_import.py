@@ -0,0 +1,458 @@
+"""
+AWS Inventory Importer
+Loads offline AWS CLI exports (describe-vpcs, describe-subnets,
+describe-instances, describe-db-instances, and also describe-security-groups,
+elbv2 describe-load-balancers and s3api list-buckets) into an
+InfrastructureModel, so the diagram and security validator can run on
+real estates.
+
+Dumps can be hundreds of MB, so they are never loaded whole.
+RecordStream reads a file in chunks and walks its structure as events:
+- record arrays ("Vpcs": [...], "Subnets": [...], "DBInstances": [...])
+  are decoded one element at a time with json's C decoder
+  (JSONDecoder.raw_decode), so only one record is in memory at once
+- container arrays ("Reservations": [...]) are walked into, so a huge
+  describe-instances page streams instance by instance
+- any other value ("NextToken", ...) is decoded and dropped
+
+A file may hold one document, several concatenated pages (or JSON lines),
+or a top-level array of records (e.g. from --query 'Reservations[].Instances[]');
+records outside a known array are recognised by their fields.
+
+InventoryBuilder adds each record to the model as it arrives, keeping id
+indexes for VPCs and subnets: a subnet that arrives before its VPC waits
+in a pending list until the VPC shows up, and references that never
+resolve are reported as warnings at the end.
+"""
+
+import codecs
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .model import (
+    InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer, S3Bucket, SecurityGroup,
+    SubnetType, InstanceType, DatabaseEngine
+)
+
+
+# Arrays whose elements are records, and the record kind
+RECORD_KEYS = {
+    "Vpcs": "vpc",
+    "Subnets": "subnet",
+    "Instances": "instance",
+    "DBInstances": "db_instance",
+    "SecurityGroups": "security_group",
+    "LoadBalancers": "load_balancer",
+    "Buckets": "bucket",
+}
+
+# Arrays whose elements are objects that hold record arrays
+CONTAINER_KEYS = {"Reservations"}
+
+# Bytes read from the file at a time
+CHUNK_SIZE = 1 << 20
+
+# A single record larger than this is treated as invalid JSON rather than
+# buffered further (decode errors look the same as truncated records)
+MAX_RECORD_CHARS = 64 << 20
+
+# Print a progress line every this many records (when progress is on)
+PROGRESS_EVERY = 100_000
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+DECODER = json.JSONDecoder()
+
+INSTANCE_TYPES = {t.value: t for t in InstanceType}
+
+ENGINES = {
+    "postgres": DatabaseEngine.POSTGRES,
+    "aurora-postgresql": DatabaseEngine.POSTGRES,
+    "mysql": DatabaseEngine.MYSQL,
+    "aurora-mysql": DatabaseEngine.MYSQL,
+    "aurora": DatabaseEngine.MYSQL,
+    "mariadb": DatabaseEngine.MARIADB,
+}
+
+
+class RecordStream:
+    """
+    Event-based reader over a JSON file: yields (kind, record) pairs while
+    holding only the current chunk and record in memory.
+    """
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.file = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.dropped = 0  # characters discarded from the front of the buffer
+        self.eof = False
+        self.bytes_read = 0
+
+    def fill(self) -> bool:
+        """Read the next chunk into the buffer; False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if self.pos:
+            self.dropped += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += self.decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            self.eof = True
+        return True
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid JSON at character {self.dropped + self.pos}: {message}")
+
+    def peek(self) -> str:
+        """The next non-whitespace character ("" at end of file)"""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise self.error(f"expected '{char}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value, reading more of the file as needed"""
+        while True:
+            if self.peek() == "":
+                raise self.error("unexpected end of input")
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof or len(self.buffer) - self.pos > MAX_RECORD_CHARS:
+                    raise self.error(e.msg) from None
+                self.fill()
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def elements(self) -> Iterator[None]:
+        """Walk an array after its '[', yielding once per element for the caller to consume"""
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            if char not in (",", "]"):
+                raise self.error("expected ',' or ']'")
+            self.pos += 1
+            if char == "]":
+                return
+
+    def records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(kind, record) for every record in the file"""
+        while True:
+            char = self.peek()
+            if char == "":
+                return
+            if char == "{":
+                yield from self.object_records()
+            elif char == "[":
+                self.pos += 1
+                for _ in self.elements():
+                    yield from records_in(self.value())
+            else:
+                raise self.error("expected '{' or '['")
+
+    def object_records(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Records of the object at the current position, streaming its record arrays"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise self.error("expected a property name")
+            self.expect(":")
+            if key in RECORD_KEYS and self.peek() == "[":
+                self.pos += 1
+                kind = RECORD_KEYS[key]
+                for _ in self.elements():
+                    record = self.value()
+                    if isinstance(record, dict):
+                        yield kind, record
+            elif key in CONTAINER_KEYS and self.peek() == "[":
+                self.pos += 1
+                for _ in self.elements():
+                    if self.peek() == "{":
+                        yield from self.object_records()
+                    else:
+                        self.value()
+            else:
+                self.value()
+
+            char = self.peek()
+            if char not in (",", "}"):
+                raise self.error("expected ',' or '}'")
+            self.pos += 1
+            if char == "}":
+                return
+
+
+def records_in(value: Any) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Records in an already decoded value: a page, a record, or a list of either"""
+    if isinstance(value, list):
+        for item in value:
+            yield from records_in(item)
+    elif isinstance(value, dict):
+        # Checked first: an instance record has a "SecurityGroups" list too
+        kind = record_kind(value)
+        if kind:
+            yield kind, value
+            return
+        for key, items in value.items():
+            if key in RECORD_KEYS and isinstance(items, list):
+                yield from ((RECORD_KEYS[key], item) for item in items if isinstance(item, dict))
+            elif key in CONTAINER_KEYS:
+                yield from records_in(items)
+
+
+def record_kind(record: Dict[str, Any]) -> Optional[str]:
+    """Recognise a bare record by the fields its describe-* call returns"""
+    if "InstanceId" in record:
+        return "instance"
+    if "DBInstanceIdentifier" in record:
+        return "db_instance"
+    if "LoadBalancerArn" in record:
+        return "load_balancer"
+    if "SubnetId" in record and "CidrBlock" in record:
+        return "subnet"
+    if "GroupId" in record and "IpPermissions" in record:
+        return "security_group"
+    if "VpcId" in record and "CidrBlock" in record:
+        return "vpc"
+    if "Name" in record and "CreationDate" in record:
+        return "bucket"
+    return None
+
+
+def tag(record: Dict[str, Any], key: str) -> Optional[str]:
+    """A tag value from an AWS Tags list ([{"Key": ..., "Value": ...}])"""
+    for item in record.get("Tags") or []:
+        if isinstance(item, dict) and item.get("Key") == key:
+            return item.get("Value")
+    return None
+
+
+def security_rules(permissions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """IpPermissions as rule dicts, like the ones security groups carry in the model"""
+    rules = []
+    for permission in permissions or []:
+        rule = {"protocol": permission.get("IpProtocol", "-1"),
+                "cidr_blocks": [r["CidrIp"] for r in permission.get("IpRanges", []) if "CidrIp" in r]}
+        if "FromPort" in permission:
+            rule["from_port"] = permission["FromPort"]
+            rule["to_port"] = permission.get("ToPort", permission["FromPort"])
+        rules.append(rule)
+    return rules
+
+
+class InventoryBuilder:
+    """Adds records to a model as they stream in, keeping id indexes"""
+    def __init__(self):
+        self.model = InfrastructureModel()
+        self.vpcs: Dict[str, VPC] = {}
+        self.subnets: Dict[str, Subnet] = {}
+        self.pending_subnets: Dict[str, List[Subnet]] = defaultdict(list)
+        self.seen = set()
+        self.counts = Counter()
+        self.warnings: List[str] = []
+        self.fallbacks = Counter()
+
+    def add(self, kind: str, record: Dict[str, Any]):
+        self.counts[kind] += 1
+        getattr(self, f"add_{kind}")(record)
+
+    def first_seen(self, resource_id: Optional[str]) -> bool:
+        """False for records without an id or already imported (overlapping pages or files)"""
+        if not resource_id or resource_id in self.seen:
+            return False
+        self.seen.add(resource_id)
+        return True
+
+    def add_vpc(self, record: Dict[str, Any]):
+        vpc_id = record.get("VpcId")
+        if not self.first_seen(vpc_id):
+            return
+        vpc = VPC(id=vpc_id, name=tag(record, "Name") or vpc_id, cidr=record.get("CidrBlock", ""))
+        self.vpcs[vpc_id] = vpc
+        self.model.add_vpc(vpc)
+        for subnet in self.pending_subnets.pop(vpc_id, []):
+            vpc.add_subnet(subnet)
+
+    def add_subnet(self, record: Dict[str, Any]):
+        subnet_id = record.get("SubnetId")
+        if not self.first_seen(subnet_id):
+            return
+        name = tag(record, "Name") or subnet_id
+        # Whether a subnet is public depends on its route table, which
+        # describe-subnets doesn't include; auto-assigned public IPs or the
+        # name are the best hint
+        public = record.get("MapPublicIpOnLaunch") is True or "public" in name.lower()
+        subnet = Subnet(id=subnet_id, name=name, cidr=record.get("CidrBlock", ""),
+                        subnet_type=SubnetType.PUBLIC if public else SubnetType.PRIVATE,
+                        availability_zone=record.get("AvailabilityZone", "us-east-1a"))
+        self.subnets[subnet_id] = subnet
+        vpc = self.vpcs.get(record.get("VpcId"))
+        if vpc:
+            vpc.add_subnet(subnet)
+        else:
+            self.pending_subnets[record.get("VpcId")].append(subnet)
+
+    def add_instance(self, record: Dict[str, Any]):
+        state = record.get("State")
+        if isinstance(state, dict) and state.get("Name") in ("terminated", "shutting-down"):
+            return
+        instance_id = record.get("InstanceId")
+        if not record.get("SubnetId"):
+            self.warnings.append(f"{instance_id}: no SubnetId; instance skipped")
+            return
+        if not self.first_seen(instance_id):
+            return
+        instance_type = self.enum_value(record.get("InstanceType"), INSTANCE_TYPES, "InstanceType",
+                                        InstanceType.T2_MICRO)
+        self.model.add_ec2(EC2Instance(id=instance_id, name=tag(record, "Name") or instance_id,
+                                       instance_type=instance_type, subnet_id=record["SubnetId"],
+                                       ami=record.get("ImageId") or EC2Instance.ami))
+
+    def add_db_instance(self, record: Dict[str, Any]):
+        db_id = record.get("DBInstanceIdentifier")
+        if not self.first_seen(db_id):
+            return
+        group = record.get("DBSubnetGroup") or {}
+        subnet_ids = [s["SubnetIdentifier"] for s in group.get("Subnets", []) if "SubnetIdentifier" in s]
+        self.model.add_rds(RDSDatabase(
+            id=db_id, name=db_id,
+            engine=self.enum_value(record.get("Engine"), ENGINES, "Engine", DatabaseEngine.POSTGRES),
+            instance_class=record.get("DBInstanceClass", "db.t3.micro"),
+            subnet_ids=subnet_ids, allocated_storage=record.get("AllocatedStorage", 20)))
+
+    def add_security_group(self, record: Dict[str, Any]):
+        group_id = record.get("GroupId")
+        if not self.first_seen(group_id):
+            return
+        self.model.add_security_group(SecurityGroup(
+            id=group_id, name=record.get("GroupName", group_id), vpc_id=record.get("VpcId", ""),
+            description=record.get("Description", "Security group"),
+            ingress_rules=security_rules(record.get("IpPermissions")),
+            egress_rules=security_rules(record.get("IpPermissionsEgress"))))
+
+    def add_load_balancer(self, record: Dict[str, Any]):
+        name = record.get("LoadBalancerName")
+        if not self.first_seen(name and f"lb-{name}"):
+            return
+        subnet_ids = [zone["SubnetId"] for zone in record.get("AvailabilityZones", []) if "SubnetId" in zone]
+        self.model.add_load_balancer(LoadBalancer(id=f"lb-{name}", name=name, subnet_ids=subnet_ids))
+
+    def add_bucket(self, record: Dict[str, Any]):
+        name = record.get("Name")
+        if not self.first_seen(name and f"s3-{name}"):
+            return
+        self.model.add_s3_bucket(S3Bucket(id=f"s3-{name}", name=name))
+
+    def enum_value(self, value: Any, choices: Dict[str, Any], field: str, default: Any) -> Any:
+        """Map a value to a model enum, counting values the model doesn't have"""
+        if value in choices:
+            return choices[value]
+        self.fallbacks[(field, str(value), default.value)] += 1
+        return default
+
+    def finish(self) -> InfrastructureModel:
+        """Drop resources whose subnets never arrived and report what didn't resolve"""
+        for vpc_id, subnets in self.pending_subnets.items():
+            self.warnings.append(f"VPC {vpc_id} not found; {len(subnets)} subnet(s) skipped")
+            for subnet in subnets:
+                del self.subnets[subnet.id]
+
+        instances = self.model.ec2_instances
+        self.model.ec2_instances = [i for i in instances if i.subnet_id in self.subnets]
+        if len(self.model.ec2_instances) < len(instances):
+            self.warnings.append(f"{len(instances) - len(self.model.ec2_instances)} instance(s) "
+                                 f"skipped: subnet not found")
+        for resource in self.model.rds_databases + self.model.load_balancers:
+            known = [s for s in resource.subnet_ids if s in self.subnets]
+            if len(known) < len(resource.subnet_ids):
+                self.warnings.append(f"{resource.id}: {len(resource.subnet_ids) - len(known)} "
+                                     f"subnet(s) not found")
+                resource.subnet_ids = known
+
+        for (field, value, default), count in sorted(self.fallbacks.items()):
+            self.warnings.append(f"{field} {value!r} is not supported by the model; "
+                                 f"{count} resource(s) imported as {default}")
+        return self.model
+
+
+class AWSImportResult:
+    """Result of importing AWS inventory dumps"""
+    def __init__(self, model: InfrastructureModel, warnings: List[str], stats: Dict[str, Any]):
+        self.model = model
+        self.warnings = warnings
+        self.stats = stats
+
+
+def iter_inventory_files(path: str) -> Iterator[str]:
+    """path itself, or the *.json files in a directory, sorted"""
+    if not os.path.isdir(path):
+        yield path
+        return
+    for entry in sorted(os.listdir(path)):
+        if entry.endswith(".json"):
+            yield os.path.join(path, entry)
+
+
+def import_aws_inventory(path: str, chunk_size: int = CHUNK_SIZE, progress: bool = False) -> AWSImportResult:
+    """
+    Import an AWS CLI JSON dump, or a directory of them, into one model.
+    With progress, prints a line every PROGRESS_EVERY records.
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Not found: {path}")
+
+    builder = InventoryBuilder()
+    started = time.perf_counter()
+    records = total_bytes = files = 0
+    for file_path in iter_inventory_files(path):
+        with open(file_path, "rb") as f:
+            stream = RecordStream(f, chunk_size)
+            try:
+                for kind, record in stream.records():
+                    builder.add(kind, record)
+                    records += 1
+                    if progress and records % PROGRESS_EVERY == 0:
+                        elapsed = time.perf_counter() - started
+                        print(f"... {records} record(s) in {elapsed:.1f}s ({records / elapsed:.0f} records/s)")
+            except ValueError as e:
+                raise ValueError(f"{file_path}: {e}") from None
+        total_bytes += stream.bytes_read
+        files += 1
+
+    model = builder.finish()
+    seconds = time.perf_counter() - started
+    return AWSImportResult(model, builder.warnings, {
+        "files": files,
+        "bytes": total_bytes,
+        "records": records,
+        "records_by_kind": dict(builder.counts),
+        "seconds": seconds,
+        "records_per_second": records / seconds if seconds else 0.0,
+    })
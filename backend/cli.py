@@ -0,0 +1,291 @@
+"""
+Offline Batch CLI
+Generates Mermaid, Terraform and security reports without running the API.
+
+Usage:
+    python -m backend INPUT -o OUTPUT_DIR [--workers N] [--offline] [--diagram-output FORMAT]
+                                  [--terraform-layout LAYOUT] [--from-terraform | --from-aws]
+
+INPUT is either:
+- a directory of *.txt descriptions and/or *.json intents, or
+- a JSONL file with one item per line: {"id": ..., "text": ...},
+  {"id": ..., "intent": {...}} (the same JSON the LLM produces) or
+  {"id": ..., "model": {...}} (InfrastructureModel.to_dict output), or
+- with --from-terraform, an existing Terraform directory, imported into
+  one model (terraform_import.py); import warnings go to import.txt
+- with --from-aws, an AWS CLI describe-* JSON dump or a directory of them,
+  streamed into one model (aws_import.py); warnings go to import.txt
+
+Items are processed on a process pool and each item's outputs are written
+to OUTPUT_DIR/<id>/ as soon as it completes (ids that map to the same
+directory name get a -2, -3, ... suffix). Per-stage throughput is
+printed at the end.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .parser import parse_text_to_model, mock_llm_extract
+from .intent import build_model_from_intent
+from .model import InfrastructureModel
+from .diagram import export_diagram, EDGE_MODES, DIAGRAM_OUTPUTS
+from .terraform import generate_terraform_files, TERRAFORM_LAYOUTS
+from .security import validate_security, generate_security_report
+from .terraform_import import import_terraform_directory
+from .aws_import import import_aws_inventory
+
+
+STAGES = ["parse", "diagram", "terraform", "security"]
+
+# Print a progress line every this many completed items
+PROGRESS_EVERY = 100
+
+# Diagram file written for each --diagram-output
+DIAGRAM_FILENAMES = {"mermaid": "diagram.mmd", "json": "diagram.json", "dot": "diagram.dot"}
+
+
+def safe_name(name: str) -> str:
+    """Make an item id safe to use as a directory name"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("._") or "item"
+
+
+def assign_output_dirs(items: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Give each item its own OUTPUT_DIR subdirectory in "dir". Distinct ids
+    can have the same safe_name ("a b" and "a_b", or a.txt and a.json);
+    later ones get a -2, -3, ... suffix instead of overwriting the earlier
+    item's outputs. Names are compared case-insensitively, for filesystems
+    that do.
+    """
+    used = set()
+    for item in items:
+        base = name = safe_name(item["id"])
+        suffix = 1
+        while name.lower() in used:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        if name != base:
+            print(f"⚠️ {item['id']}: output directory {base} already used, writing to {name}", file=sys.stderr)
+        used.add(name.lower())
+        item["dir"] = name
+        yield item
+
+
+def iter_items(input_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield work items lazily from a directory or JSONL file.
+    Each item has an "id" and either "text" or "intent".
+    """
+    if os.path.isdir(input_path):
+        for entry in sorted(os.listdir(input_path)):
+            path = os.path.join(input_path, entry)
+            stem, ext = os.path.splitext(entry)
+            if ext == ".txt":
+                with open(path, encoding="utf-8") as f:
+                    yield {"id": stem, "text": f.read()}
+            elif ext == ".json":
+                yield {"id": stem, "intent_path": path}
+        return
+
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": f"line-{line_number}", "error": f"Invalid JSON: {e}"}
+                continue
+            item = {"id": str(record.get("id", f"item-{line_number:06d}"))}
+            if "intent" in record:
+                item["intent"] = record["intent"]
+            elif "model" in record:
+                item["model_dict"] = record["model"]
+            else:
+                item["text"] = record.get("text", record.get("description", ""))
+            yield item
+
+
+def process_item(job: Tuple[Dict[str, Any], bool, str, str, str]) -> Dict[str, Any]:
+    """
+    Worker: run all stages for one item and time each of them.
+    Runs in a pool process, so it only returns plain data.
+    """
+    item, offline, edge_mode, diagram_output, terraform_layout = job
+    timings = {}
+    result = {"id": item["id"], "dir": item.get("dir") or safe_name(item["id"]), "timings": timings}
+
+    try:
+        if "error" in item:
+            raise ValueError(item["error"])
+
+        start = time.perf_counter()
+        if "model" in item:
+            model = item["model"]
+        elif "intent_path" in item:
+            with open(item["intent_path"], encoding="utf-8") as f:
+                model = build_model_from_intent(json.load(f))
+        elif "intent" in item:
+            model = build_model_from_intent(item["intent"])
+        elif "model_dict" in item:
+            model = InfrastructureModel.from_dict(item["model_dict"])
+        elif offline:
+            model = build_model_from_intent(mock_llm_extract(item["text"]))
+        else:
+            model = parse_text_to_model(item["text"])
+        timings["parse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        diagram = export_diagram(model, diagram_output, edge_mode)
+        result["diagram"] = json.dumps(diagram, indent=2) if diagram_output == "json" else diagram
+        result["diagram_file"] = DIAGRAM_FILENAMES[diagram_output]
+        timings["diagram"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result["terraform"] = generate_terraform_files(model, terraform_layout)
+        timings["terraform"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result["security"] = generate_security_report(validate_security(model))
+        timings["security"] = time.perf_counter() - start
+    except Exception as e:
+        result["error"] = str(e)
+
+    return result
+
+
+def write_outputs(output_dir: str, result: Dict[str, Any]):
+    """Write one item's artifacts (or its error) to OUTPUT_DIR/<dir>/"""
+    item_dir = os.path.join(output_dir, result["dir"])
+    os.makedirs(item_dir, exist_ok=True)
+
+    if "error" in result:
+        with open(os.path.join(item_dir, "error.txt"), "w", encoding="utf-8") as f:
+            f.write(result["error"])
+        return
+
+    files = {result["diagram_file"]: result["diagram"], "security.txt": result["security"],
+             **result["terraform"]}
+    root = os.path.realpath(item_dir)
+    for filename, content in files.items():
+        path = os.path.join(item_dir, filename)
+        if os.path.commonpath([root, os.path.realpath(path)]) != root:
+            print(f"⚠️ {result['id']}: refusing to write {filename} outside {item_dir}", file=sys.stderr)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def print_throughput(stage_seconds: Dict[str, float], stage_counts: Dict[str, int],
+                     completed: int, failed: int, wall_seconds: float):
+    """Print per-stage and overall throughput"""
+    print(f"\nProcessed {completed} item(s), {failed} failed, in {wall_seconds:.2f}s "
+          f"({completed / wall_seconds if wall_seconds else 0:.1f} items/s)")
+    for stage in STAGES:
+        seconds = stage_seconds[stage]
+        count = stage_counts[stage]
+        rate = count / seconds if seconds else 0
+        print(f"  {stage:<10} {count:>8} item(s)  {seconds:8.3f}s worker time  {rate:10.1f} items/s per worker")
+
+
+def import_model(args) -> int:
+    """Import a Terraform directory or AWS inventory dumps, then write its outputs like any other item"""
+    try:
+        if args.from_aws:
+            imported = import_aws_inventory(args.input, progress=True)
+        else:
+            imported = import_terraform_directory(args.input, workers=args.workers)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ {e}", file=sys.stderr)
+        return 2
+    stats = imported.stats
+    if args.from_aws:
+        print(f"Imported {stats['records']} record(s) from {stats['files']} file(s) "
+              f"({stats['bytes'] / 1e6:.1f} MB) in {stats['seconds']:.2f}s "
+              f"({stats['records_per_second']:.0f} records/s), {len(imported.warnings)} warning(s)")
+    else:
+        print(f"Imported {stats['resources']} resource(s) from {stats['files']} file(s) "
+              f"({stats['bytes'] / 1e6:.1f} MB) in {stats['seconds']:.2f}s, {len(imported.warnings)} warning(s)")
+
+    item_id = os.path.basename(os.path.normpath(os.path.abspath(args.input)))
+    if args.from_aws and not os.path.isdir(args.input):
+        item_id = os.path.splitext(item_id)[0]
+    result = process_item(({"id": item_id, "model": imported.model}, args.offline, args.edge_mode,
+                           args.diagram_output, args.terraform_layout))
+    write_outputs(args.output, result)
+    with open(os.path.join(args.output, result["dir"], "import.txt"), "w", encoding="utf-8") as f:
+        f.write("".join(f"{warning}\n" for warning in imported.warnings))
+    if "error" in result:
+        print(f"⚠️ {item_id}: {result['error']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend",
+        description="Generate Mermaid, Terraform and security reports offline."
+    )
+    parser.add_argument("input", help="Directory of .txt/.json files, or a .jsonl file")
+    parser.add_argument("-o", "--output", required=True, help="Output directory")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=8,
+                        help="Items handed to a worker at a time (default: 8)")
+    parser.add_argument("--offline", action="store_true",
+                        help="Never call Gemini; always use the mock LLM for text items")
+    parser.add_argument("--edge-mode", choices=EDGE_MODES, default="auto",
+                        help="Diagram relationship edges (default: auto)")
+    parser.add_argument("--diagram-output", choices=DIAGRAM_OUTPUTS, default="mermaid",
+                        help="Diagram format: Mermaid, typed graph JSON or Graphviz DOT (default: mermaid)")
+    parser.add_argument("--terraform-layout", choices=TERRAFORM_LAYOUTS, default="single",
+                        help="Terraform files: one main.tf, or providers/network/compute/data "
+                             "plus a module per VPC (default: single)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--from-terraform", action="store_true",
+                        help="INPUT is a Terraform directory to import into one model")
+    source.add_argument("--from-aws", action="store_true",
+                        help="INPUT is an AWS CLI describe-* JSON dump (or a directory of them) "
+                             "to import into one model")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"Input not found: {args.input}", file=sys.stderr)
+        return 2
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.from_terraform or args.from_aws:
+        return import_model(args)
+
+    stage_seconds = {stage: 0.0 for stage in STAGES}
+    stage_counts = {stage: 0 for stage in STAGES}
+    completed = failed = 0
+    started = time.perf_counter()
+
+    jobs = ((item, args.offline, args.edge_mode, args.diagram_output, args.terraform_layout)
+            for item in assign_output_dirs(iter_items(args.input)))
+    with Pool(processes=args.workers) as pool:
+        for result in pool.imap_unordered(process_item, jobs, chunksize=args.chunksize):
+            write_outputs(args.output, result)
+            completed += 1
+            if "error" in result:
+                failed += 1
+                print(f"⚠️ {result['id']}: {result['error']}", file=sys.stderr)
+            for stage, seconds in result["timings"].items():
+                stage_seconds[stage] += seconds
+                stage_counts[stage] += 1
+            if completed % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"... {completed} item(s) in {elapsed:.1f}s")
+
+    print_throughput(stage_seconds, stage_counts, completed, failed,
+                     time.perf_counter() - started)
+    return 1 if failed else 0
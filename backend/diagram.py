@@ -4,10 +4,246 @@ Converts InfrastructureModel to Mermaid diagram format.
 This reads from the model, never directly from text or Terraform.
 """
 
-from .model import InfrastructureModel, SubnetType
+from collections import defaultdict, OrderedDict
+from threading import Lock
+from typing import Dict, Iterator, List, Literal, Optional, Tuple, get_args
 
+from .model import InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer, SubnetType
 
-def generate_mermaid_diagram(model: InfrastructureModel) -> str:
+
+# Above this many relationship edges, "auto" mode bundles them per subnet
+EDGE_BUNDLE_THRESHOLD = 200
+
+# Relationship edge modes; the API and CLI both accept exactly these
+EdgeMode = Literal["auto", "full", "bundled", "none"]
+EDGE_MODES = get_args(EdgeMode)
+
+
+def bucket_resources(model: InfrastructureModel) -> Tuple[Dict[str, Subnet], Dict[str, List[EC2Instance]], Dict[str, List[RDSDatabase]]]:
+    """
+    Group resources by subnet in one pass over the model.
+    
+    Returns (subnets by id, EC2 instances by subnet id, RDS databases by
+    primary subnet id). List order follows model order.
+    """
+    subnets_by_id = {s.id: s for vpc in model.vpcs for s in vpc.subnets}
+    ec2_by_subnet: Dict[str, List[EC2Instance]] = defaultdict(list)
+    rds_by_subnet: Dict[str, List[RDSDatabase]] = defaultdict(list)
+    
+    for ec2 in model.ec2_instances:
+        ec2_by_subnet[ec2.subnet_id].append(ec2)
+    for rds in model.rds_databases:
+        if rds.subnet_ids:
+            rds_by_subnet[rds.subnet_ids[0]].append(rds)
+    
+    return subnets_by_id, ec2_by_subnet, rds_by_subnet
+
+
+def generate_relationship_edges(model: InfrastructureModel, subnets_by_id: Dict[str, Subnet],
+                                edge_mode: str) -> List[Tuple[str, str, Optional[str], bool]]:
+    """List form of iter_relationship_edges"""
+    return list(iter_relationship_edges(model, subnets_by_id, edge_mode))
+
+
+def iter_relationship_edges(model: InfrastructureModel, subnets_by_id: Dict[str, Subnet],
+                            edge_mode: str) -> Iterator[Tuple[str, str, Optional[str], bool]]:
+    """
+    Relationship edges: Load Balancer → EC2 and private EC2 → RDS.
+    
+    - full: one edge per pair (EC2 → RDS grows as instances × databases)
+    - bundled: Load Balancer → subnet edges labelled with target counts, and
+      one edge per database from the VPC of its private instances, so the
+      edge count is linear in the model size
+    - none: no relationship edges
+    - auto: full unless it would exceed EDGE_BUNDLE_THRESHOLD edges
+    
+    Yields (source id, target id, label or None, dashed) tuples lazily, so
+    even full mode never holds all edges. Endpoints are resource ids, or
+    subnet/VPC ids for bundled edges.
+    """
+    if edge_mode not in EDGE_MODES:
+        raise ValueError(f"Unknown edge mode: {edge_mode}")
+    if edge_mode == "none":
+        return
+    
+    private_ec2 = [
+        ec2 for ec2 in model.ec2_instances
+        if ec2.subnet_id in subnets_by_id
+        and subnets_by_id[ec2.subnet_id].subnet_type == SubnetType.PRIVATE
+    ]
+    
+    if edge_mode == "auto":
+        full_count = (sum(len(lb.target_instance_ids) for lb in model.load_balancers)
+                      + len(private_ec2) * len(model.rds_databases))
+        edge_mode = "full" if full_count <= EDGE_BUNDLE_THRESHOLD else "bundled"
+    
+    if edge_mode == "full":
+        # Add relationships: Load Balancer → EC2 instances
+        for lb in model.load_balancers:
+            for target_id in lb.target_instance_ids:
+                yield (lb.id, target_id, None, False)
+        
+        # Add relationships: EC2 → RDS (if EC2 is in private subnet and RDS exists)
+        for ec2 in private_ec2:
+            for rds in model.rds_databases:
+                yield (ec2.id, rds.id, None, True)
+        return
+    
+    # Bundled: aggregate instance endpoints to their subnet subgraph
+    ec2_subnet = {ec2.id: ec2.subnet_id for ec2 in model.ec2_instances}
+    for lb in model.load_balancers:
+        per_subnet: Dict[str, int] = {}
+        for target_id in lb.target_instance_ids:
+            subnet_id = ec2_subnet.get(target_id)
+            if subnet_id in subnets_by_id:
+                per_subnet[subnet_id] = per_subnet.get(subnet_id, 0) + 1
+            else:
+                yield (lb.id, target_id, None, False)
+        for subnet_id, count in per_subnet.items():
+            yield (lb.id, subnet_id, f"{count} instance(s)", False)
+    
+    # One edge per database, from the VPC holding its private instances
+    vpc_of_subnet = {s.id: vpc.id for vpc in model.vpcs for s in vpc.subnets}
+    private_counts: Dict[str, int] = {}
+    for ec2 in private_ec2:
+        vpc_id = vpc_of_subnet[ec2.subnet_id]
+        private_counts[vpc_id] = private_counts.get(vpc_id, 0) + 1
+    for rds in model.rds_databases:
+        vpc_id = vpc_of_subnet.get(rds.subnet_ids[0]) if rds.subnet_ids else None
+        if private_counts.get(vpc_id):
+            yield (vpc_id, rds.id, f"{private_counts[vpc_id]} private instance(s)", True)
+
+
+def iter_relationship_lines(model: InfrastructureModel, subnets_by_id: Dict[str, Subnet],
+                            edge_mode: str, aliases: Optional[Dict[str, str]] = None,
+                            indent: str = "    ") -> Iterator[str]:
+    """
+    Mermaid lines for iter_relationship_edges.
+    
+    aliases maps model ids to the node names to draw (compact diagrams).
+    """
+    n = (lambda node_id: aliases.get(node_id, node_id)) if aliases else (lambda node_id: node_id)
+    for source, target, label, dashed in iter_relationship_edges(model, subnets_by_id, edge_mode):
+        arrow = "-.->" if dashed else "-->"
+        if label:
+            arrow += f"|{label}|"
+        yield f"{indent}{n(source)} {arrow} {n(target)}"
+
+
+# Rendered subnet fragments kept by render_subnet_fragment (LRU)
+FRAGMENT_CACHE_SIZE = 4096
+FRAGMENT_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+FRAGMENT_CACHE_LOCK = Lock()
+
+
+def render_subnet_fragment(subnet: Subnet, ec2s: List[EC2Instance], rdss: List[RDSDatabase]) -> str:
+    """
+    Render one subnet subgraph, reusing the cached text when nothing that
+    appears in it has changed.
+    
+    The cache key is the tuple of every rendered field, so equal keys always
+    render to equal text.
+    """
+    key = (
+        subnet.id, subnet.name, subnet.cidr, subnet.subnet_type,
+        tuple((e.id, e.name, e.instance_type) for e in ec2s),
+        tuple((r.id, r.name, r.engine, r.instance_class) for r in rdss)
+    )
+    with FRAGMENT_CACHE_LOCK:
+        text = FRAGMENT_CACHE.get(key)
+        if text is not None:
+            FRAGMENT_CACHE.move_to_end(key)
+            return text
+    
+    subnet_style = "fill:#e1f5e1" if subnet.subnet_type == SubnetType.PUBLIC else "fill:#ffe1e1"
+    subnet_label = f"{subnet.name}<br/>{subnet.cidr}<br/>({subnet.subnet_type.value})"
+    
+    lines = [f"        subgraph {subnet.id}[\"{subnet_label}\"]"]
+    lines.append(f"            direction TB")
+    
+    # Add EC2 instances in this subnet
+    for ec2 in ec2s:
+        lines.append(f"            {ec2.id}[\"🖥️ {ec2.name}<br/>{ec2.instance_type.value}\"]")
+    
+    # Add RDS databases whose primary subnet is this one
+    for rds in rdss:
+        lines.append(f"            {rds.id}[\"🗄️ {rds.name}<br/>{rds.engine.value}<br/>{rds.instance_class}\"]")
+    
+    lines.append(f"        end")
+    lines.append(f"        style {subnet.id} {subnet_style}")
+    text = "\n".join(lines)
+    
+    with FRAGMENT_CACHE_LOCK:
+        FRAGMENT_CACHE[key] = text
+        if len(FRAGMENT_CACHE) > FRAGMENT_CACHE_SIZE:
+            FRAGMENT_CACHE.popitem(last=False)
+    return text
+
+
+def render_diagram_fragments(model: InfrastructureModel, edge_mode: str = "auto") -> List[Tuple[str, str]]:
+    """
+    Render the full Mermaid diagram as an ordered list of (key, text) fragments.
+    
+    Keys are stable across edits ("header", "vpc:<id>", "subnet:<id>",
+    "vpc-end:<id>", "load_balancers", "relationships"), and joining the texts
+    with newlines gives the complete diagram.
+    """
+    subnets_by_id, ec2_by_subnet, rds_by_subnet = bucket_resources(model)
+    fragments = list(iter_node_fragments(model, ec2_by_subnet, rds_by_subnet))
+    
+    relationship_lines = [RELATIONSHIPS_HEADER]
+    relationship_lines.extend(iter_relationship_lines(model, subnets_by_id, edge_mode))
+    fragments.append(("relationships", "\n".join(relationship_lines)))
+    
+    return fragments
+
+
+RELATIONSHIPS_HEADER = "\n    %% Relationships"
+
+
+def iter_node_fragments(model: InfrastructureModel, ec2_by_subnet: Dict[str, List[EC2Instance]],
+                        rds_by_subnet: Dict[str, List[RDSDatabase]]) -> Iterator[Tuple[str, str]]:
+    """Every fragment of render_diagram_fragments except "relationships", lazily"""
+    yield ("header", "graph TB\n    %% Infrastructure Diagram Generated from Model\n")
+    
+    # Generate VPCs and Subnets
+    for vpc in model.vpcs:
+        yield (f"vpc:{vpc.id}",
+               f"    subgraph {vpc.id}[\"{vpc.name}<br/>{vpc.cidr}\"]\n        direction TB")
+        for subnet in vpc.subnets:
+            yield (f"subnet:{subnet.id}", render_subnet_fragment(
+                subnet, ec2_by_subnet.get(subnet.id, []), rds_by_subnet.get(subnet.id, [])
+            ))
+        yield (f"vpc-end:{vpc.id}",
+               f"    end\n    style {vpc.id} fill:#e1e8f5,stroke:#333,stroke-width:2px\n")
+    
+    # Add Load Balancers (outside VPC subgraph for clarity)
+    if model.load_balancers:
+        yield ("load_balancers", "\n".join(
+            f"    {lb.id}[\"⚖️ {lb.name}<br/>Application Load Balancer\"]\n"
+            f"    style {lb.id} fill:#fff4e1,stroke:#333,stroke-width:2px"
+            for lb in model.load_balancers
+        ))
+
+
+def diff_diagram_fragments(old: List[Tuple[str, str]], new: List[Tuple[str, str]]) -> Dict:
+    """
+    Patch that turns the `old` fragment list into `new`.
+    
+    Returns {"order": [keys], "changed": {key: text}, "removed": [keys]}.
+    A client keeps fragments by key, applies the patch and joins the texts
+    in `order` with newlines to get the full diagram.
+    """
+    old_texts = dict(old)
+    new_keys = {key for key, _ in new}
+    return {
+        "order": [key for key, _ in new],
+        "changed": {key: text for key, text in new if old_texts.get(key) != text},
+        "removed": [key for key, _ in old if key not in new_keys]
+    }
+
+
+def generate_mermaid_diagram(model: InfrastructureModel, edge_mode: str = "auto") -> str:
     """
     Generate a Mermaid diagram from the infrastructure model.
     
@@ -17,69 +253,421 @@ def generate_mermaid_diagram(model: InfrastructureModel) -> str:
     - VPCs as subgraphs
     - Subnets as nested subgraphs
     - EC2, RDS, and Load Balancers as nodes
-    - Relationships between components
+    - Relationships between components (see iter_relationship_edges
+      for edge_mode)
+    
+    Resources are bucketed by subnet once, so generation is linear in the
+    size of the model, and unchanged subnets come from the fragment cache.
+    """
+    return "\n".join(text for _, text in render_diagram_fragments(model, edge_mode))
+
+
+def iter_mermaid_diagram(model: InfrastructureModel, edge_mode: str = "auto") -> Iterator[str]:
+    """
+    Stream generate_mermaid_diagram's output in chunks.
+    
+    Joining the chunks gives exactly the same text, but relationship lines
+    are produced one at a time, so memory does not grow with the edge count.
     """
+    subnets_by_id, ec2_by_subnet, rds_by_subnet = bucket_resources(model)
+    for _, text in iter_node_fragments(model, ec2_by_subnet, rds_by_subnet):
+        yield text + "\n"
+    yield RELATIONSHIPS_HEADER
+    for line in iter_relationship_lines(model, subnets_by_id, edge_mode):
+        yield "\n" + line
+
+
+# Styles for compact diagrams, declared once and assigned with `class`
+COMPACT_CLASS_DEFS = {
+    "vpc": "fill:#e1e8f5,stroke:#333,stroke-width:2px",
+    "pub": "fill:#e1f5e1",
+    "priv": "fill:#ffe1e1",
+    "lb": "fill:#fff4e1,stroke:#333,stroke-width:2px",
+}
+
+
+# Words Mermaid parses as keywords, never usable as node ids
+MERMAID_KEYWORDS = frozenset({
+    "end", "graph", "flowchart", "subgraph", "style", "class", "classdef",
+    "click", "linkstyle", "direction", "call", "href", "default",
+})
+
+
+def to_base36(number: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    text = ""
+    while True:
+        number, rem = divmod(number, 36)
+        text = digits[rem] + text
+        if not number:
+            return text
+
+
+def generate_compact_diagram(model: InfrastructureModel, edge_mode: str = "auto") -> Tuple[str, Dict[str, str]]:
+    """
+    Generate a smaller Mermaid diagram of the same graph as
+    generate_mermaid_diagram.
+    
+    - Nodes are named with short aliases (v0, s0, e0, d0, l0, ... in base 36),
+      skipping any that spell a Mermaid keyword
+    - Styles are declared once with classDef and assigned with one `class`
+      line per style instead of a `style` line per node
+    - Repeated label parts are shown once: an instance type shared by every
+      EC2 instance in a subnet goes in the subnet label, and the constant
+      load balancer caption is dropped
+    - No indentation or redundant `direction TB` lines
+    
+    Returns (mermaid text, {alias: model id}) so clients can map clicked
+    nodes back to model resources.
+    """
+    subnets_by_id, ec2_by_subnet, rds_by_subnet = bucket_resources(model)
+    aliases: Dict[str, str] = {}
+    
+    def alias(prefix: str, resources: list):
+        index = 0
+        for resource in resources:
+            name = prefix + to_base36(index)
+            while name in MERMAID_KEYWORDS:  # e.g. EC2 #841 would be "end"
+                index += 1
+                name = prefix + to_base36(index)
+            aliases[resource.id] = name
+            index += 1
+    
+    alias("v", model.vpcs)
+    alias("s", list(subnets_by_id.values()))
+    alias("e", model.ec2_instances)
+    alias("d", model.rds_databases)
+    alias("l", model.load_balancers)
+    
     lines = ["graph TB"]
-    lines.append("    %% Infrastructure Diagram Generated from Model")
-    lines.append("")
+    lines.extend(f"classDef {name} {style}" for name, style in COMPACT_CLASS_DEFS.items())
+    classes: Dict[str, List[str]] = {name: [] for name in COMPACT_CLASS_DEFS}
     
-    # Track all components for relationship mapping
-    all_subnets = {}
+    for vpc in model.vpcs:
+        lines.append(f"subgraph {aliases[vpc.id]}[\"{vpc.name}<br/>{vpc.cidr}\"]")
+        classes["vpc"].append(aliases[vpc.id])
+        for subnet in vpc.subnets:
+            ec2s = ec2_by_subnet.get(subnet.id, [])
+            types = {ec2.instance_type for ec2 in ec2s}
+            shared_type = types.pop().value if len(types) == 1 else None
+            label = f"{subnet.name}<br/>{subnet.cidr}"
+            if shared_type:
+                label += f"<br/>🖥️ {shared_type}"
+            lines.append(f"subgraph {aliases[subnet.id]}[\"{label}\"]")
+            classes["pub" if subnet.subnet_type == SubnetType.PUBLIC else "priv"].append(aliases[subnet.id])
+            for ec2 in ec2s:
+                if shared_type:
+                    lines.append(f"{aliases[ec2.id]}[\"🖥️ {ec2.name}\"]")
+                else:
+                    lines.append(f"{aliases[ec2.id]}[\"🖥️ {ec2.name}<br/>{ec2.instance_type.value}\"]")
+            for rds in rds_by_subnet.get(subnet.id, []):
+                lines.append(f"{aliases[rds.id]}[\"🗄️ {rds.name}<br/>{rds.engine.value}<br/>{rds.instance_class}\"]")
+            lines.append("end")
+        lines.append("end")
+    
+    for lb in model.load_balancers:
+        lines.append(f"{aliases[lb.id]}[\"⚖️ {lb.name}\"]")
+        classes["lb"].append(aliases[lb.id])
+    
+    lines.extend(iter_relationship_lines(model, subnets_by_id, edge_mode, aliases, indent=""))
+    lines.extend(f"class {','.join(names)} {name}" for name, names in classes.items() if names)
+    
+    return "\n".join(lines), {short: model_id for model_id, short in aliases.items()}
+
+
+DIAGRAM_OUTPUTS = ("mermaid", "json", "dot")
+
+# Fill colours shared by the exporters (same palette as the Mermaid styles)
+GROUP_FILLS = {"vpc": "#e1e8f5", "public": "#e1f5e1", "private": "#ffe1e1"}
+LOAD_BALANCER_FILL = "#fff4e1"
+
+
+def build_diagram_graph(model: InfrastructureModel, edge_mode: str = "auto") -> Dict[str, list]:
+    """
+    Typed graph of the diagram: one traversal of the model, shared by the
+    JSON and DOT exporters.
+    
+    Returns {"groups", "nodes", "edges"}:
+    - groups: VPC and subnet boxes ({"id", "kind", "label", "parent", ...}),
+      each VPC directly followed by its subnets
+    - nodes: EC2, RDS and load balancers with their typed attributes and
+      "parent" subnet (None for load balancers)
+    - edges: {"source", "target", "label", "dashed"} as in
+      iter_relationship_edges; bundled endpoints may be group ids
+    """
+    subnets_by_id, ec2_by_subnet, rds_by_subnet = bucket_resources(model)
+    groups = []
+    nodes = []
     
-    # Generate VPCs and Subnets
     for vpc in model.vpcs:
+        groups.append({"id": vpc.id, "kind": "vpc", "label": vpc.name, "parent": None,
+                       "cidr": vpc.cidr})
+        for subnet in vpc.subnets:
+            groups.append({"id": subnet.id, "kind": "subnet", "label": subnet.name, "parent": vpc.id,
+                           "cidr": subnet.cidr, "subnet_type": subnet.subnet_type.value,
+                           "availability_zone": subnet.availability_zone})
+            for ec2 in ec2_by_subnet.get(subnet.id, []):
+                nodes.append({"id": ec2.id, "kind": "ec2", "label": ec2.name, "parent": subnet.id,
+                              "instance_type": ec2.instance_type.value})
+            for rds in rds_by_subnet.get(subnet.id, []):
+                nodes.append({"id": rds.id, "kind": "rds", "label": rds.name, "parent": subnet.id,
+                              "engine": rds.engine.value, "instance_class": rds.instance_class})
+    
+    for lb in model.load_balancers:
+        nodes.append({"id": lb.id, "kind": "load_balancer", "label": lb.name, "parent": None})
+    
+    edges = [
+        {"source": source, "target": target, "label": label, "dashed": dashed}
+        for source, target, label, dashed in iter_relationship_edges(model, subnets_by_id, edge_mode)
+    ]
+    return {"groups": groups, "nodes": nodes, "edges": edges}
+
+
+def dot_quote(text: str) -> str:
+    """Quote a string as a DOT ID (newlines become \\n line breaks)"""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def export_dot(graph: Dict[str, list]) -> str:
+    """
+    Render a build_diagram_graph result as Graphviz DOT.
+    
+    VPCs and subnets become nested clusters. Edges to or from a group are
+    drawn from its first node with lhead/ltail (compound=true), the DOT
+    equivalent of Mermaid's edges to subgraphs.
+    """
+    children: Dict[Optional[str], List[dict]] = defaultdict(list)
+    for item in graph["groups"] + graph["nodes"]:
+        children[item["parent"]].append(item)
+    
+    # First node inside each group (instances preferred over databases, so a
+    # VPC → database edge never starts at the database), used as the
+    # endpoint of group edges
+    group_parent = {group["id"]: group["parent"] for group in graph["groups"]}
+    anchors: Dict[str, str] = {}
+    for node in sorted(graph["nodes"], key=lambda node: node["kind"] != "ec2"):
+        parent = node["parent"]
+        while parent is not None and parent not in anchors:
+            anchors[parent] = node["id"]
+            parent = group_parent[parent]
+    
+    lines = ["digraph infrastructure {",
+             "    compound=true;",
+             "    rankdir=TB;",
+             '    node [shape=box, style="rounded,filled", fillcolor=white];']
+    
+    def emit(item: dict, indent: str):
+        if item["kind"] in ("vpc", "subnet"):
+            fill = GROUP_FILLS[item["kind"] if item["kind"] == "vpc" else item["subnet_type"]]
+            lines.append(f"{indent}subgraph {dot_quote('cluster_' + item['id'])} {{")
+            label = f"{item['label']}\n{item['cidr']}"
+            lines.append(f"{indent}    label={dot_quote(label)};")
+            lines.append(f'{indent}    style=filled; fillcolor="{fill}";')
+            for child in children[item["id"]]:
+                emit(child, indent + "    ")
+            lines.append(f"{indent}}}")
+        elif item["kind"] == "ec2":
+            label = f"{item['label']}\n{item['instance_type']}"
+            lines.append(f"{indent}{dot_quote(item['id'])} [label={dot_quote(label)}];")
+        elif item["kind"] == "rds":
+            label = f"{item['label']}\n{item['engine']}\n{item['instance_class']}"
+            lines.append(f"{indent}{dot_quote(item['id'])} [label={dot_quote(label)}, shape=cylinder];")
+        else:
+            lines.append(f"{indent}{dot_quote(item['id'])} "
+                         f'[label={dot_quote(item["label"])}, fillcolor="{LOAD_BALANCER_FILL}"];')
+    
+    for item in children[None]:
+        emit(item, "    ")
+    
+    for edge in graph["edges"]:
+        source, target = edge["source"], edge["target"]
+        attributes = []
+        if source in anchors:
+            attributes.append(f"ltail={dot_quote('cluster_' + source)}")
+            source = anchors[source]
+        if target in anchors:
+            attributes.append(f"lhead={dot_quote('cluster_' + target)}")
+            target = anchors[target]
+        if edge["label"]:
+            attributes.append(f"label={dot_quote(edge['label'])}")
+        if edge["dashed"]:
+            attributes.append("style=dashed")
+        suffix = f" [{', '.join(attributes)}]" if attributes else ""
+        lines.append(f"    {dot_quote(source)} -> {dot_quote(target)}{suffix};")
+    
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def export_diagram(model: InfrastructureModel, output: str = "mermaid", edge_mode: str = "auto"):
+    """
+    Diagram in the requested output format:
+    "mermaid" (text), "json" (build_diagram_graph dict) or "dot" (text).
+    """
+    if output == "mermaid":
+        return generate_mermaid_diagram(model, edge_mode)
+    if output not in DIAGRAM_OUTPUTS:
+        raise ValueError(f"Unknown diagram output: {output}")
+    graph = build_diagram_graph(model, edge_mode)
+    return graph if output == "json" else export_dot(graph)
+
+
+# Models with more nodes than this get the collapsed overview by default
+DETAIL_NODE_LIMIT = 500
+
+
+def count_diagram_nodes(model: InfrastructureModel) -> int:
+    """Number of subnets and resources a full diagram would draw"""
+    return (sum(len(vpc.subnets) for vpc in model.vpcs) + len(model.ec2_instances)
+            + len(model.rds_databases) + len(model.load_balancers))
+
+
+def scope_model(model: InfrastructureModel, scope: str = "model") -> InfrastructureModel:
+    """
+    Cut a shallow sub-model for a diagram scope.
+    
+    Scopes: "model" (everything), "vpc:<id>" or "subnet:<id>". Resources
+    outside the scope are dropped, and load balancers are kept only if they
+    sit in or target something inside it. Resource objects are shared with
+    the original model, not copied.
+    
+    Raises ValueError for a malformed scope and KeyError for an unknown id.
+    """
+    if scope == "model":
+        return model
+    
+    kind, _, scope_id = scope.partition(":")
+    if kind == "vpc":
+        vpcs = [vpc for vpc in model.vpcs if vpc.id == scope_id]
+    elif kind == "subnet":
+        vpcs = [
+            VPC(id=vpc.id, name=vpc.name, cidr=vpc.cidr,
+                subnets=[s for s in vpc.subnets if s.id == scope_id])
+            for vpc in model.vpcs if any(s.id == scope_id for s in vpc.subnets)
+        ]
+    else:
+        raise ValueError(f"Unknown diagram scope: {scope}")
+    if not vpcs:
+        raise KeyError(scope)
+    
+    subnet_ids = {s.id for vpc in vpcs for s in vpc.subnets}
+    ec2_instances = [ec2 for ec2 in model.ec2_instances if ec2.subnet_id in subnet_ids]
+    instance_ids = {ec2.id for ec2 in ec2_instances}
+    load_balancers = []
+    for lb in model.load_balancers:
+        targets = [t for t in lb.target_instance_ids if t in instance_ids]
+        if targets or any(sid in subnet_ids for sid in lb.subnet_ids):
+            load_balancers.append(LoadBalancer(
+                id=lb.id, name=lb.name, subnet_ids=lb.subnet_ids, target_instance_ids=targets
+            ))
+    
+    return InfrastructureModel(
+        vpcs=vpcs,
+        ec2_instances=ec2_instances,
+        rds_databases=[r for r in model.rds_databases if r.subnet_ids and r.subnet_ids[0] in subnet_ids],
+        load_balancers=load_balancers,
+        model_id=model.model_id
+    )
+
+
+def generate_overview_diagram(model: InfrastructureModel, depth: int = 1) -> str:
+    """
+    Generate a collapsed Mermaid diagram whose size does not grow with the
+    number of resources.
+    
+    - depth 0: one node per VPC with subnet/EC2/RDS counts
+    - depth 1: VPC subgraphs with one node per subnet holding resource counts
+    
+    Load balancers are drawn with one edge per VPC (depth 0) or subnet
+    (depth 1) they target, labelled with the number of targets.
+    Node ids match the model ids, so "vpc:<id>" / "subnet:<id>" scopes can
+    be requested for the detail of any node.
+    """
+    subnets_by_id, ec2_by_subnet, rds_by_subnet = bucket_resources(model)
+    vpc_of_subnet = {s.id: vpc.id for vpc in model.vpcs for s in vpc.subnets}
+    
+    lines = ["graph TB"]
+    lines.append("    %% Infrastructure Overview Generated from Model")
+    lines.append("")
+    
+    for vpc in model.vpcs:
+        if depth <= 0:
+            ec2_count = sum(len(ec2_by_subnet.get(s.id, ())) for s in vpc.subnets)
+            rds_count = sum(len(rds_by_subnet.get(s.id, ())) for s in vpc.subnets)
+            lines.append(f"    {vpc.id}[\"{vpc.name}<br/>{vpc.cidr}<br/>"
+                         f"{len(vpc.subnets)} subnet(s) · 🖥️ {ec2_count} · 🗄️ {rds_count}\"]")
+            lines.append(f"    style {vpc.id} fill:#e1e8f5,stroke:#333,stroke-width:2px")
+            continue
+        
         lines.append(f"    subgraph {vpc.id}[\"{vpc.name}<br/>{vpc.cidr}\"]")
         lines.append(f"        direction TB")
-        
-        # Generate subnets within VPC
         for subnet in vpc.subnets:
-            all_subnets[subnet.id] = subnet
             subnet_style = "fill:#e1f5e1" if subnet.subnet_type == SubnetType.PUBLIC else "fill:#ffe1e1"
-            subnet_label = f"{subnet.name}<br/>{subnet.cidr}<br/>({subnet.subnet_type.value})"
-            
-            lines.append(f"        subgraph {subnet.id}[\"{subnet_label}\"]")
-            lines.append(f"            direction TB")
-            
-            # Add EC2 instances in this subnet
-            for ec2 in model.ec2_instances:
-                if ec2.subnet_id == subnet.id:
-                    lines.append(f"            {ec2.id}[\"🖥️ {ec2.name}<br/>{ec2.instance_type.value}\"]")
-            
-            # Add RDS databases in this subnet (if primary subnet)
-            for rds in model.rds_databases:
-                if subnet.id in rds.subnet_ids and subnet.id == rds.subnet_ids[0]:
-                    lines.append(f"            {rds.id}[\"🗄️ {rds.name}<br/>{rds.engine.value}<br/>{rds.instance_class}\"]")
-            
-            lines.append(f"        end")
+            lines.append(f"        {subnet.id}[\"{subnet.name}<br/>{subnet.cidr}<br/>"
+                         f"🖥️ {len(ec2_by_subnet.get(subnet.id, ()))} · "
+                         f"🗄️ {len(rds_by_subnet.get(subnet.id, ()))}\"]")
             lines.append(f"        style {subnet.id} {subnet_style}")
-        
         lines.append(f"    end")
         lines.append(f"    style {vpc.id} fill:#e1e8f5,stroke:#333,stroke-width:2px")
         lines.append("")
     
-    # Add Load Balancers (outside VPC subgraph for clarity)
     for lb in model.load_balancers:
         lines.append(f"    {lb.id}[\"⚖️ {lb.name}<br/>Application Load Balancer\"]")
         lines.append(f"    style {lb.id} fill:#fff4e1,stroke:#333,stroke-width:2px")
     
     lines.append("")
     lines.append("    %% Relationships")
-    
-    # Add relationships: Load Balancer → EC2 instances
+    ec2_subnet = {ec2.id: ec2.subnet_id for ec2 in model.ec2_instances}
     for lb in model.load_balancers:
+        per_target: Dict[str, int] = {}
         for target_id in lb.target_instance_ids:
-            lines.append(f"    {lb.id} --> {target_id}")
-    
-    # Add relationships: EC2 → RDS (if EC2 is in private subnet and RDS exists)
-    for ec2 in model.ec2_instances:
-        subnet = model.get_subnet_by_id(ec2.subnet_id)
-        if subnet and subnet.subnet_type == SubnetType.PRIVATE:
-            for rds in model.rds_databases:
-                lines.append(f"    {ec2.id} -.-> {rds.id}")
+            subnet_id = ec2_subnet.get(target_id)
+            if subnet_id not in subnets_by_id:
+                continue
+            node_id = vpc_of_subnet[subnet_id] if depth <= 0 else subnet_id
+            per_target[node_id] = per_target.get(node_id, 0) + 1
+        for node_id, count in per_target.items():
+            lines.append(f"    {lb.id} -->|{count} instance(s)| {node_id}")
     
     return "\n".join(lines)
 
 
+def child_scopes(model: InfrastructureModel, scope: str) -> List[str]:
+    """Scopes one level of detail below `scope`, for lazy drill-down"""
+    if scope == "model":
+        return [f"vpc:{vpc.id}" for vpc in model.vpcs]
+    if scope.startswith("vpc:"):
+        vpc_id = scope[len("vpc:"):]
+        return [f"subnet:{s.id}" for vpc in model.vpcs if vpc.id == vpc_id for s in vpc.subnets]
+    return []
+
+
+def generate_scoped_diagram(model: InfrastructureModel, scope: str = "model",
+                            depth: Optional[int] = None, edge_mode: str = "auto",
+                            compact: bool = False) -> Tuple[str, int, Dict[str, str]]:
+    """
+    Level-of-detail diagram for part of a model.
+    
+    depth 0/1 give the collapsed overview (see generate_overview_diagram),
+    depth 2 the full diagram of the scope. When depth is None it is picked
+    from the scope's size: full detail up to DETAIL_NODE_LIMIT nodes,
+    otherwise the subnet-level overview. With compact, the full detail is
+    drawn by generate_compact_diagram; overviews keep model ids as node
+    names so they can be used as scopes.
+    
+    Returns (mermaid text, depth used, {alias: model id} for compact output).
+    """
+    sub_model = scope_model(model, scope)
+    if depth is None:
+        depth = 2 if count_diagram_nodes(sub_model) <= DETAIL_NODE_LIMIT else 1
+    if depth >= 2:
+        if compact:
+            text, aliases = generate_compact_diagram(sub_model, edge_mode)
+            return text, depth, aliases
+        return generate_mermaid_diagram(sub_model, edge_mode), depth, {}
+    return generate_overview_diagram(sub_model, depth), depth, {}
+
+
 def generate_diagram_description(model: InfrastructureModel) -> str:
     """
     Generate a human-readable description of the infrastructure.
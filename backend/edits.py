@@ -306,7 +306,7 @@ def update_resource_property(model: InfrastructureModel, resource_id: str,
                     return EditResult(False, None, [], 
                                     f"Property {property_name} is not editable for EC2")
                 if property_name == "instance_type":
-                    ec2.instance_type = value  # String, will be converted by __post_init__
+                    ec2.instance_type = InstanceType(value)  # setattr bypasses __post_init__
                 updated = True
                 break
         
@@ -345,3 +345,54 @@ def update_resource_property(model: InfrastructureModel, resource_id: str,
         
     except Exception as e:
         return EditResult(False, None, [], f"Error updating property: {str(e)}")
+
+
+def apply_edit_operations(model: InfrastructureModel, operations: List[Dict[str, Any]],
+                          source: EditSource) -> EditResult:
+    """
+    Apply a list of edit operation dictionaries in order
+    
+    Operation format (shared by Terraform and text edits):
+    - {"operation": "add_resource", "resource_type": ..., "properties": {...}}
+    - {"operation": "remove_resource", "resource_id": ...}
+    - {"operation": "move_resource", "resource_id": ..., "target_subnet_id": ...}
+    - {"operation": "update_resource_property", "resource_id": ..., "property": ..., "value": ...}
+    
+    Stops at the first failing operation; the input model is never modified.
+    Unknown operations are skipped. The returned warnings are collected from
+    every operation applied (including a failing one), each distinct warning
+    once, in the order first seen.
+    """
+    working_model = model
+    warnings = []
+    seen = set()
+    
+    def collect(step_warnings: List[SecurityWarning]):
+        for warning in step_warnings:
+            key = (warning.severity, warning.resource, warning.message)
+            if key not in seen:
+                seen.add(key)
+                warnings.append(warning)
+    
+    for op in operations:
+        operation_type = op['operation']
+        
+        if operation_type == 'add_resource':
+            result = add_resource(working_model, op['resource_type'], op['properties'], source)
+        elif operation_type == 'update_resource_property':
+            result = update_resource_property(working_model, op['resource_id'], op['property'], op['value'], source)
+        elif operation_type == 'move_resource':
+            result = move_resource(working_model, op['resource_id'], op['target_subnet_id'], source)
+        elif operation_type == 'remove_resource':
+            result = remove_resource(working_model, op['resource_id'], source)
+        else:
+            continue  # Skip unknown operations
+        
+        collect(result.warnings)
+        if not result.success:
+            return EditResult(False, None, warnings,
+                              f"Failed at {operation_type}: {result.error}")
+        
+        working_model = result.model
+    
+    return EditResult(True, working_model, warnings)
@@ -0,0 +1,431 @@
+"""
+HCL Subset Parser
+Tokenizer and recursive-descent parser for the HCL that terraform.py
+generates, used by terraform_parser.py to read Terraform edits back.
+
+Covers bodies of attributes and labelled blocks, comments, strings,
+numbers, bools, null, lists, objects, traversal or call expressions
+(aws_subnet.web.id) and operator or conditional expressions
+(var.enabled ? 1 : 0), the last three kept as their source text.
+Anything else raises HCLSyntaxError.
+
+Input is bytes. The tokenizer is one precompiled regex run once over the
+whole file, the parser makes a single pass over the tokens, and every
+block and attribute records its byte span [start, end).
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+# One alternative per token kind; the outermost group number is the kind
+# (match.lastindex). Whitespace and newlines are skipped by the leading
+# class: attributes end where the next identifier or closing brace starts,
+# so newlines carry no meaning in the generated subset.
+#
+# Most generated lines are a whole token: "name = <scalar>" or
+# "name = [<scalar>, ...]" (ATTRIBUTE with an inline value) or
+# "type "label" ... {" (BLOCK). Values that span lines or hold objects
+# fall back to the fine-grained kinds.
+#
+# Quantifiers are possessive (*+, ++): no token ever needs to give
+# characters back, and skipping backtracking makes the scan much cheaper.
+NAME = rb"[A-Za-z_][\w-]*+"
+QUOTED = rb'"(?:[^"\\\n]++|\\.)*+"'
+NUMERIC = rb"-?[0-9]++(?:\.[0-9]++)?(?:[eE][+-]?[0-9]++)?"
+TRAVERSAL = NAME + rb"(?:\.(?:" + NAME + rb"|[0-9]++|\*))*+"
+SCALAR = QUOTED + rb"|" + NUMERIC + rb"(?![\w.])|" + TRAVERSAL + rb"(?![\w.(\[])"
+SCALAR_LIST = rb"\[[ \t]*+(?:(?:" + SCALAR + rb")[ \t]*+(?:,[ \t]*+)?)*+\]"
+
+TOKEN_PATTERN = re.compile(rb"""
+    [ \t\r\n]*+
+    (?:
+        ((?:\#|//)[^\n]*+|/\*.*?\*/)                                   # 1 comment
+      | ((""" + NAME + rb""")[ \t]*+=(?![=>])[ \t]*+                     # 2 attribute, 3 name
+           ((?:""" + SCALAR + rb"|" + SCALAR_LIST + rb""")(?=[ \t]*+(?:[\r\n#},]|//|/\*|\Z)))?)
+                                                                     # 4 inline value, unless an
+                                                                     #   operator follows it
+      | ((""" + NAME + rb""")((?:[ \t]++(?:""" + QUOTED + rb"|" + NAME + rb"""))*+)[ \t]*+\{)
+                                                                     # 5 block, 6 type, 7 labels
+      | (\})                                                             # 8 closing brace
+      | (""" + QUOTED + rb""")                                            # 9 string
+      | (""" + NUMERIC + rb""")                                           # 10 number
+      | (""" + TRAVERSAL + rb""")                                         # 11 identifier/traversal
+      | ([{\[\]()=,.:*])                                                 # 12 other punctuation
+      | ([^ \t\r\n])                                                     # 13 anything else
+    )
+""", re.VERBOSE | re.DOTALL)
+
+COMMENT, ATTRIBUTE, BLOCK, CLOSE, STRING, NUMBER, IDENTIFIER, PUNCTUATION, OTHER = 1, 2, 5, 8, 9, 10, 11, 12, 13
+ATTRIBUTE_NAME, ATTRIBUTE_VALUE, BLOCK_TYPE, BLOCK_LABELS = 3, 4, 6, 7
+
+LABEL_PATTERN = re.compile(QUOTED + rb"|" + NAME)
+SCALAR_PATTERN = re.compile(SCALAR)
+
+LITERALS = {b"true": True, b"false": False, b"null": None}
+
+# Single-character tokens that continue an expression after a value (the
+# first character of two-character operators like == and &&), and the
+# prefix operators
+OPERATORS = frozenset(b"?<>!=&|+-*/%")
+TWO_CHARACTER_OPERATORS = {b"==", b"!=", b"<=", b">=", b"&&", b"||"}
+PREFIX_OPERATORS = frozenset(b"!-")
+
+ESCAPES = {"n": "\n", "r": "\r", "t": "\t", '"': '"', "\\": "\\"}
+ESCAPE_PATTERN = re.compile(r"\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)")
+
+
+class HCLSyntaxError(ValueError):
+    """Raised for text outside the supported HCL subset"""
+    def __init__(self, message: str, data: bytes, offset: int):
+        self.offset = offset
+        self.line = data.count(b"\n", 0, offset) + 1
+        super().__init__(f"Invalid HCL at line {self.line}: {message}")
+
+
+class Reference(str):
+    """Source text of a traversal or call expression, e.g. aws_subnet.web.id"""
+
+
+class HCLBlock:
+    """
+    A block: type, labels, attributes and nested blocks.
+
+    start/end are byte offsets of the block (type keyword through closing
+    brace), line is its 1-based first line, comments are the comment lines
+    directly above it, and attribute_spans maps each attribute name to the
+    byte span of "name = value".
+    """
+    __slots__ = ("block_type", "labels", "attributes", "attribute_spans", "blocks",
+                 "start", "end", "line", "comments")
+
+    def __init__(self, block_type: str, labels: Tuple[str, ...], start: int, line: int,
+                 comments: List[str]):
+        self.block_type = block_type
+        self.labels = labels
+        self.attributes: Dict[str, Any] = {}
+        self.attribute_spans: Dict[str, Tuple[int, int]] = {}
+        self.blocks: List["HCLBlock"] = []
+        self.start = start
+        self.end = start
+        self.line = line
+        self.comments = comments
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Attributes plus nested blocks, grouped by type into lists (JSON-syntax shape)"""
+        result = dict(self.attributes)
+        for block in self.blocks:
+            result.setdefault(block.block_type, []).append(block.to_dict())
+        return result
+
+    def __repr__(self) -> str:
+        labels = " ".join(f'"{label}"' for label in self.labels)
+        return f"<HCLBlock {self.block_type} {labels} [{self.start}:{self.end}]>"
+
+
+def tokenize(data: bytes) -> Iterator[Any]:
+    """
+    Match objects for every token (kind = match.lastindex), lazily, in one
+    linear regex pass. Tokens are streamed rather than collected: holding
+    every match object alive makes each garbage collection pass rescan
+    them all.
+    """
+    return TOKEN_PATTERN.finditer(data)
+
+
+def decode_string(text: bytes) -> str:
+    """Quoted string token → str (interpolations like ${...} are kept as-is)"""
+    value = text[1:-1].decode()
+    if "\\" in value:
+        value = ESCAPE_PATTERN.sub(unescape, value)
+    return value
+
+
+def unescape(match) -> str:
+    escape = match.group(1)
+    if len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return ESCAPES.get(escape, match.group(0))
+
+
+def decode_scalar(text: bytes) -> Any:
+    """Inline attribute value (string, number, literal, traversal or a list of them) → Python value"""
+    first = text[0]
+    if first == 0x22:  # '"'
+        return decode_string(text)
+    if first == 0x5B:  # '['
+        return [decode_scalar(item) for item in SCALAR_PATTERN.findall(text, 1, len(text) - 1)]
+    if first == 0x2D or 0x30 <= first <= 0x39:  # '-' or a digit
+        return float(text) if b"." in text or b"e" in text or b"E" in text else int(text)
+    if text in LITERALS:
+        return LITERALS[text]
+    return Reference(text.decode())
+
+
+def parse_hcl(data: Union[bytes, str]) -> HCLBlock:
+    """
+    Parse an HCL document into a root block (type "", no labels) holding
+    the top-level attributes and blocks.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    return HCLParser(data).parse_document()
+
+
+class HCLParser:
+    """
+    Recursive-descent parser over the token stream of one document, with
+    one token of pushback for lookahead.
+    """
+    def __init__(self, data: bytes):
+        self.data = data
+        self.stream = tokenize(data)
+        self.pending = None
+        self.last = None
+        # Line tracking is incremental: newlines are counted from the last
+        # block start, so computing every block's line stays linear
+        self.line = 1
+        self.line_offset = 0
+
+    def error(self, message: str, token=None, show_token: bool = True):
+        offset = token.start(token.lastindex) if token is not None else len(self.data)
+        if token is not None and show_token:
+            message += f", got {token.group(token.lastindex).decode(errors='replace')!r}"
+        raise HCLSyntaxError(message, self.data, offset)
+
+    def line_at(self, offset: int) -> int:
+        self.line += self.data.count(b"\n", self.line_offset, offset)
+        self.line_offset = offset
+        return self.line
+
+    def parse_document(self) -> HCLBlock:
+        root = HCLBlock("", (), 0, 1, [])
+        self.parse_body(root, closing=False)
+        root.end = len(self.data)
+        return root
+
+    def parse_body(self, block: HCLBlock, closing: bool):
+        """Attributes and blocks until "}" (closing) or the end of input"""
+        stream = self.stream
+        attributes = block.attributes
+        spans = block.attribute_spans
+        comments = []
+        while True:
+            token = self.pending
+            if token is None:
+                token = next(stream, None)
+                if token is None:
+                    if closing:
+                        self.error("unexpected end of input, expected '}'")
+                    return
+            else:
+                self.pending = None
+            kind = token.lastindex
+
+            if kind == ATTRIBUTE:
+                name, value = token.group(ATTRIBUTE_NAME, ATTRIBUTE_VALUE)
+                name = name.decode()
+                if name in attributes:
+                    self.error(f"duplicate attribute {name!r}", token, show_token=False)
+                if value is not None:
+                    if value[0] == 0x22 and b"\\" not in value:  # plain string, the common case
+                        attributes[name] = value[1:-1].decode()
+                    else:
+                        attributes[name] = decode_scalar(value)
+                    spans[name] = token.span(ATTRIBUTE)
+                else:
+                    attributes[name] = self.parse_expression()
+                    spans[name] = (token.start(ATTRIBUTE), self.last_end())
+                if comments:
+                    comments = []
+            elif kind == CLOSE:
+                if not closing:
+                    self.error("expected an attribute or block", token)
+                block.end = token.end(CLOSE)
+                return
+            elif kind == COMMENT:
+                comments.append(token.group(COMMENT).decode())
+            elif kind == BLOCK:
+                start = token.start(BLOCK)
+                block_type, labels = token.group(BLOCK_TYPE, BLOCK_LABELS)
+                labels = tuple(
+                    decode_string(label) if label[0] == 0x22 else label.decode()
+                    for label in LABEL_PATTERN.findall(labels)
+                )
+                child = HCLBlock(block_type.decode(), labels, start, self.line_at(start), comments)
+                self.parse_body(child, closing=True)
+                block.blocks.append(child)
+                comments = []
+            else:
+                self.error("expected an attribute or block", token)
+
+    def next_token(self):
+        """Next token that is not a comment (comments inside values are ignored)"""
+        token = self.pending
+        if token is not None:
+            self.pending = None
+        else:
+            token = next(self.stream, None)
+        while token is not None and token.lastindex == COMMENT:
+            token = next(self.stream, None)
+        if token is None:
+            self.error("unexpected end of input")
+        self.last = token
+        return token
+
+    def push_back(self, token):
+        """Return a token peeked with next_token (one token of lookahead)"""
+        self.pending = token
+
+    def last_end(self) -> int:
+        """Byte offset just after the last consumed token"""
+        return self.last.end(self.last.lastindex)
+
+    def is_punctuation(self, token, text: bytes) -> bool:
+        if text == b"}":
+            return token.lastindex == CLOSE
+        return token.lastindex == PUNCTUATION and token.group(PUNCTUATION) == text
+
+    def parse_expression(self) -> Any:
+        """A value; with operators (a == b, c ? d : e) the whole expression as its source text"""
+        token = self.next_token()
+        start = token.start(token.lastindex)
+        self.push_back(token)
+        value = self.parse_operand()
+
+        operator = self.next_operator()
+        if operator is None:
+            return value
+        while operator is not None:
+            if operator == b"?":
+                self.parse_expression()
+                self.expect(b":")
+                self.parse_expression()
+                break
+            end = self.last_end()
+            if operator + self.data[end:end + 1] in TWO_CHARACTER_OPERATORS:
+                self.next_token()
+            self.parse_operand()
+            operator = self.next_operator()
+        return Reference(self.data[start:self.last_end()].decode())
+
+    def next_operator(self) -> Optional[bytes]:
+        """Consume and return the operator that follows a value, if any"""
+        following = self.pending or next(self.stream, None)
+        self.pending = None
+        if following is None:
+            return None
+        kind = following.lastindex
+        text = following.group(kind)
+        end = following.end(kind)
+        if kind in (PUNCTUATION, OTHER) and text[0] in OPERATORS:
+            # A lone "=" separates an object key from its value; "==" compares
+            if text != b"=" or self.data[end:end + 1] == b"=":
+                self.last = following
+                return text
+        self.push_back(following)
+        return None
+
+    def parse_operand(self) -> Any:
+        token = self.next_token()
+        kind = token.lastindex
+        text = token.group(kind)
+
+        if kind == STRING:
+            return decode_string(text)
+        if kind == NUMBER:
+            return decode_scalar(text)
+        if kind == IDENTIFIER:
+            if text in LITERALS:
+                return LITERALS[text]
+            return self.parse_traversal(token)
+        if kind == PUNCTUATION:
+            if text == b"[":
+                return self.parse_sequence(b"]")
+            if text == b"{":
+                return self.parse_object()
+            if text == b"(":
+                self.parse_expression()
+                self.expect(b")")
+                return Reference(self.data[token.start(kind):self.last_end()].decode())
+        if kind == OTHER and text[0] in PREFIX_OPERATORS:
+            self.parse_operand()
+            return Reference(self.data[token.start(kind):self.last_end()].decode())
+        self.error("expected a value", token)
+
+    def parse_traversal(self, token) -> Reference:
+        """name.attr... followed by any [index], [*], .attr or (args), as its source text"""
+        start = token.start(IDENTIFIER)
+        end = self.last_end()
+        while True:
+            # Only tokens that touch the previous one continue the expression
+            following = self.pending or next(self.stream, None)
+            self.pending = None
+            if following is None:
+                break
+            if following.start(following.lastindex) != end:
+                self.push_back(following)
+                break
+            kind = following.lastindex
+            text = following.group(kind)
+            self.last = following
+            if kind == PUNCTUATION and text == b"[":
+                token = self.next_token()
+                if not self.is_punctuation(token, b"*"):
+                    self.push_back(token)
+                    self.parse_expression()
+                self.expect(b"]")
+            elif kind == PUNCTUATION and text == b"(":
+                self.parse_sequence(b")")
+            elif not (kind == IDENTIFIER or (kind == PUNCTUATION and text in (b".", b"*"))):
+                self.push_back(following)
+                break
+            end = self.last_end()
+        return Reference(self.data[start:end].decode())
+
+    def parse_sequence(self, closing: bytes) -> List[Any]:
+        """Comma-separated values up to closing (a trailing comma is allowed)"""
+        items = []
+        while True:
+            token = self.next_token()
+            if self.is_punctuation(token, closing):
+                return items
+            self.push_back(token)
+            items.append(self.parse_expression())
+            token = self.next_token()
+            if self.is_punctuation(token, closing):
+                return items
+            if not self.is_punctuation(token, b","):
+                self.error(f"expected ',' or {closing.decode()!r}", token)
+
+    def parse_object(self) -> Dict[str, Any]:
+        """{ key = value ... } with optional commas; keys are identifiers or strings"""
+        result = {}
+        while True:
+            token = self.next_token()
+            kind = token.lastindex
+            if kind == ATTRIBUTE:
+                key = token.group(ATTRIBUTE_NAME).decode()
+                value = token.group(ATTRIBUTE_VALUE)
+                result[key] = decode_scalar(value) if value is not None else self.parse_expression()
+                continue
+            if self.is_punctuation(token, b"}"):
+                return result
+            if self.is_punctuation(token, b","):
+                continue
+            if kind == IDENTIFIER:
+                key = token.group(IDENTIFIER).decode()
+            elif kind == STRING:
+                key = decode_string(token.group(STRING))
+            else:
+                self.error("expected an object key", token)
+            token = self.next_token()
+            if not (self.is_punctuation(token, b"=") or self.is_punctuation(token, b":")):
+                self.error("expected '=' or ':' after object key", token)
+            result[key] = self.parse_expression()
+
+    def expect(self, punctuation: bytes):
+        """Consume the given punctuation"""
+        token = self.next_token()
+        if not self.is_punctuation(token, punctuation):
+            self.error(f"expected {punctuation.decode()!r}", token)
@@ -0,0 +1,255 @@
+"""
+Intent Schema & Model Builder
+Validates the structured intent JSON produced by the LLM (or mock LLM)
+and builds the InfrastructureModel from it in bulk.
+
+The schema is compiled into a pydantic TypeAdapter once at import, so each
+intent is validated in a single call into pydantic-core. Enum fields come
+back as model enums, which means the builder never relies on __post_init__
+string conversion. Referential integrity (subnet_id, subnet_ids,
+target_instance_ids) is checked against hash sets in one pass.
+"""
+
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+# pydantic only accepts typing.TypedDict from Python 3.12; the service runs 3.11
+from typing_extensions import TypedDict, NotRequired
+from pydantic import Field, TypeAdapter, ValidationError
+
+from .model import (
+    InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer,
+    SubnetType, InstanceType, DatabaseEngine
+)
+
+
+# Maximum number of problems listed in an IntentError message
+MAX_REPORTED_ERRORS = 10
+
+
+class SubnetIntent(TypedDict):
+    id: str
+    name: str
+    cidr: str
+    type: SubnetType
+    az: NotRequired[str]
+
+
+class VPCIntent(TypedDict):
+    id: str
+    name: str
+    cidr: str
+    subnets: NotRequired[List[SubnetIntent]]
+
+
+class EC2Intent(TypedDict):
+    id: str
+    name: str
+    instance_type: InstanceType
+    subnet_id: str
+
+
+class RDSIntent(TypedDict):
+    id: str
+    name: str
+    engine: DatabaseEngine
+    instance_class: str
+    subnet_ids: List[str]
+    allocated_storage: NotRequired[int]
+
+
+class LoadBalancerIntent(TypedDict):
+    id: str
+    name: str
+    subnet_ids: List[str]
+    target_instance_ids: NotRequired[List[str]]
+
+
+class InfrastructureIntent(TypedDict):
+    vpcs: NotRequired[List[VPCIntent]]
+    ec2_instances: NotRequired[List[EC2Intent]]
+    rds_databases: NotRequired[List[RDSIntent]]
+    load_balancers: NotRequired[List[LoadBalancerIntent]]
+
+
+class AddResourceOperation(TypedDict):
+    operation: Literal["add_resource"]
+    resource_type: Literal["ec2", "rds", "load_balancer", "elb", "subnet", "s3", "security_group"]
+    properties: Dict[str, Any]
+
+
+class RemoveResourceOperation(TypedDict):
+    operation: Literal["remove_resource"]
+    resource_id: str
+
+
+class MoveResourceOperation(TypedDict):
+    operation: Literal["move_resource"]
+    resource_id: str
+    target_subnet_id: str
+
+
+class UpdateResourcePropertyOperation(TypedDict):
+    operation: Literal["update_resource_property"]
+    resource_id: str
+    property: str
+    value: Any
+
+
+EditOperation = Annotated[
+    Union[AddResourceOperation, RemoveResourceOperation,
+          MoveResourceOperation, UpdateResourcePropertyOperation],
+    Field(discriminator="operation")
+]
+
+
+# Compiled once at import and reused for every request
+INTENT_ADAPTER = TypeAdapter(InfrastructureIntent)
+EDIT_OPERATIONS_ADAPTER = TypeAdapter(List[EditOperation])
+
+
+class IntentError(ValueError):
+    """Raised when an intent is malformed or references unknown resources"""
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        shown = "; ".join(errors[:MAX_REPORTED_ERRORS])
+        if len(errors) > MAX_REPORTED_ERRORS:
+            shown += f"; ... ({len(errors) - MAX_REPORTED_ERRORS} more)"
+        super().__init__(f"Invalid infrastructure intent: {shown}")
+
+
+def format_validation_errors(error: ValidationError) -> List[str]:
+    """Flatten pydantic errors into 'path.to.field: message' strings"""
+    return [
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    ]
+
+
+def validate_intent(intent: Any) -> InfrastructureIntent:
+    """
+    Validate raw intent JSON against the compiled schema.
+    
+    Returns the validated intent with enum fields converted.
+    Raises IntentError listing every schema problem found.
+    """
+    try:
+        return INTENT_ADAPTER.validate_python(intent)
+    except ValidationError as e:
+        raise IntentError(format_validation_errors(e))
+
+
+def validate_edit_operations(operations: Any) -> List[Dict[str, Any]]:
+    """
+    Validate a list of edit operations (as consumed by edits.py).
+    Raises IntentError listing every schema problem found.
+    """
+    try:
+        return EDIT_OPERATIONS_ADAPTER.validate_python(operations)
+    except ValidationError as e:
+        raise IntentError(format_validation_errors(e))
+
+
+def check_references(intent: InfrastructureIntent) -> List[str]:
+    """
+    Check that every id referenced in the intent exists and ids are unique.
+    
+    Builds the subnet and instance id sets once, then tests each reference
+    with a set lookup, so the check is linear in the size of the intent.
+    """
+    errors = []
+    seen_ids = set()
+    subnet_ids = set()
+    instance_ids = set()
+    
+    def register(resource_id: str, into: Optional[set] = None):
+        if resource_id in seen_ids:
+            errors.append(f"duplicate resource id '{resource_id}'")
+        seen_ids.add(resource_id)
+        if into is not None:
+            into.add(resource_id)
+    
+    for vpc in intent.get("vpcs", []):
+        register(vpc["id"])
+        for subnet in vpc.get("subnets", []):
+            register(subnet["id"], subnet_ids)
+    for ec2 in intent.get("ec2_instances", []):
+        register(ec2["id"], instance_ids)
+    for rds in intent.get("rds_databases", []):
+        register(rds["id"])
+    for lb in intent.get("load_balancers", []):
+        register(lb["id"])
+    
+    for ec2 in intent.get("ec2_instances", []):
+        if ec2["subnet_id"] not in subnet_ids:
+            errors.append(f"EC2 '{ec2['id']}' references unknown subnet '{ec2['subnet_id']}'")
+    for rds in intent.get("rds_databases", []):
+        for subnet_id in rds["subnet_ids"]:
+            if subnet_id not in subnet_ids:
+                errors.append(f"RDS '{rds['id']}' references unknown subnet '{subnet_id}'")
+    for lb in intent.get("load_balancers", []):
+        for subnet_id in lb["subnet_ids"]:
+            if subnet_id not in subnet_ids:
+                errors.append(f"Load balancer '{lb['id']}' references unknown subnet '{subnet_id}'")
+        for target_id in lb.get("target_instance_ids", []):
+            if target_id not in instance_ids:
+                errors.append(f"Load balancer '{lb['id']}' targets unknown instance '{target_id}'")
+    
+    return errors
+
+
+def build_model_from_intent(intent: Any) -> InfrastructureModel:
+    """
+    Intent JSON → InfrastructureModel
+    
+    Validates the schema and references first, so a bad LLM response is
+    rejected as a whole with an IntentError instead of failing partway
+    through construction.
+    """
+    validated = validate_intent(intent)
+    errors = check_references(validated)
+    if errors:
+        raise IntentError(errors)
+    
+    model = InfrastructureModel()
+    model.vpcs = [
+        VPC(
+            id=vpc["id"],
+            name=vpc["name"],
+            cidr=vpc["cidr"],
+            subnets=[
+                Subnet(
+                    id=s["id"],
+                    name=s["name"],
+                    cidr=s["cidr"],
+                    subnet_type=s["type"],
+                    availability_zone=s.get("az", "us-east-1a")
+                ) for s in vpc.get("subnets", [])
+            ]
+        ) for vpc in validated.get("vpcs", [])
+    ]
+    model.ec2_instances = [
+        EC2Instance(
+            id=ec2["id"],
+            name=ec2["name"],
+            instance_type=ec2["instance_type"],
+            subnet_id=ec2["subnet_id"]
+        ) for ec2 in validated.get("ec2_instances", [])
+    ]
+    model.rds_databases = [
+        RDSDatabase(
+            id=rds["id"],
+            name=rds["name"],
+            engine=rds["engine"],
+            instance_class=rds["instance_class"],
+            subnet_ids=rds["subnet_ids"],
+            allocated_storage=rds.get("allocated_storage", 20)
+        ) for rds in validated.get("rds_databases", [])
+    ]
+    model.load_balancers = [
+        LoadBalancer(
+            id=lb["id"],
+            name=lb["name"],
+            subnet_ids=lb["subnet_ids"],
+            target_instance_ids=lb.get("target_instance_ids", [])
+        ) for lb in validated.get("load_balancers", [])
+    ]
+    return model
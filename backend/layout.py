@@ -0,0 +1,415 @@
+"""
+Server-side Diagram Layout
+Computes a layered (Sugiyama-style) layout of the infrastructure model and
+exports it as JSON, so the frontend can draw large diagrams directly instead
+of running Mermaid's layout in the browser.
+
+Model → Layout (never Text → Layout directly), with the same relationship
+edges as the Mermaid diagram (see generate_relationship_edges).
+
+Steps:
+1. Rank: longest path over LB → EC2 → RDS dependencies. Private EC2 → RDS
+   goes through one virtual port node instead of instances × databases edges.
+2. Order: barycenter sweeps that keep every subnet's nodes together and
+   every VPC's subnets together, keeping the order with the fewest crossings.
+3. Coordinates: ranks become rows, subnets become columns inside their VPC
+   boxes, and load balancers sit above the instances they target.
+
+Layouts are cached by model fingerprint. When a model is edited, the layout
+of its previous version seeds the new one: subnets whose contents did not
+change keep their order and are not re-swept.
+"""
+
+import hashlib
+from collections import OrderedDict, defaultdict, deque
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from .model import InfrastructureModel, SubnetType
+from .diagram import bucket_resources, generate_relationship_edges
+
+
+# Geometry (pixels)
+NODE_WIDTH = 160
+NODE_HEIGHT = 60
+NODE_GAP = 20
+RANK_GAP = 100
+GROUP_PADDING = 20
+GROUP_HEADER = 30
+MARGIN = 20
+ROW_HEIGHT = NODE_HEIGHT + RANK_GAP
+
+# Barycenter sweeps for a fresh layout, and when seeded from a previous one
+LAYOUT_SWEEPS = 4
+INCREMENTAL_SWEEPS = 1
+
+# Cached layouts by fingerprint (LRU), and the last fingerprint per model
+# lineage (LRU, same bound: a lineage only helps while its layout is cached)
+LAYOUT_CACHE_SIZE = 128
+LAYOUT_CACHE: "OrderedDict[str, Tuple[Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+LAYOUT_LINEAGE: "OrderedDict[str, str]" = OrderedDict()
+LAYOUT_CACHE_LOCK = Lock()
+
+PRIVATE_PORT = "port:private"
+
+
+def layout_fingerprint(model: InfrastructureModel, edge_mode: str = "auto") -> str:
+    """
+    Content hash of everything the layout depends on.
+    Two model versions with the same content share a layout.
+    """
+    content = (
+        edge_mode,
+        tuple((v.id, v.name, v.cidr,
+               tuple((s.id, s.name, s.cidr, s.subnet_type.value) for s in v.subnets))
+              for v in model.vpcs),
+        tuple((e.id, e.name, e.instance_type.value, e.subnet_id) for e in model.ec2_instances),
+        tuple((r.id, r.name, r.engine.value, r.instance_class, tuple(r.subnet_ids))
+              for r in model.rds_databases),
+        tuple((lb.id, lb.name, tuple(lb.subnet_ids), tuple(lb.target_instance_ids))
+              for lb in model.load_balancers),
+    )
+    return hashlib.sha1(repr(content).encode()).hexdigest()[:16]
+
+
+def rank_nodes(model: InfrastructureModel, private_ids: set) -> Dict[str, int]:
+    """
+    Longest-path ranking (Kahn's algorithm) of EC2, RDS and LB nodes.
+
+    Edges: LB → each target instance, private instance → PRIVATE_PORT →
+    each database (the port carries no rank of its own). Nodes with no
+    predecessors are then pulled down to just above their nearest successor.
+    """
+    successors: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+    in_degree: Dict[str, int] = {}
+    for node_id in ([e.id for e in model.ec2_instances] + [r.id for r in model.rds_databases]
+                    + [lb.id for lb in model.load_balancers] + [PRIVATE_PORT]):
+        in_degree[node_id] = 0
+
+    def add_edge(source: str, target: str, weight: int):
+        if source in in_degree and target in in_degree:
+            successors[source].append((target, weight))
+            in_degree[target] += 1
+
+    for lb in model.load_balancers:
+        for target_id in lb.target_instance_ids:
+            add_edge(lb.id, target_id, 1)
+    for ec2_id in private_ids:
+        add_edge(ec2_id, PRIVATE_PORT, 0)
+    for rds in model.rds_databases:
+        add_edge(PRIVATE_PORT, rds.id, 1)
+
+    sources = [node_id for node_id, degree in in_degree.items() if degree == 0]
+    ranks = {node_id: 0 for node_id in in_degree}
+    queue = deque(sources)
+    while queue:
+        node_id = queue.popleft()
+        for target, weight in successors[node_id]:
+            ranks[target] = max(ranks[target], ranks[node_id] + weight)
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                queue.append(target)
+
+    for node_id in sources:
+        if successors[node_id]:
+            ranks[node_id] = max(ranks[node_id],
+                                 min(ranks[t] - w for t, w in successors[node_id]))
+    del ranks[PRIVATE_PORT]
+    return ranks
+
+
+def count_crossings(edges: List[Tuple[str, str]], ranks: Dict[str, int],
+                    position: Dict[str, float]) -> int:
+    """
+    Edge crossings between adjacent ranks, counted as inversions with a
+    Fenwick tree (O(E log E)). Edges spanning several ranks are skipped.
+    """
+    by_rank: Dict[int, List[Tuple[float, float]]] = defaultdict(list)
+    for source, target in edges:
+        if source not in ranks or target not in ranks:
+            continue
+        upper, lower = (source, target) if ranks[source] < ranks[target] else (target, source)
+        if ranks[lower] - ranks[upper] == 1:
+            by_rank[ranks[upper]].append((position[upper], position[lower]))
+
+    crossings = 0
+    for pairs in by_rank.values():
+        pairs.sort()
+        lower_values = sorted({lower for _, lower in pairs})
+        index = {value: i + 1 for i, value in enumerate(lower_values)}
+        tree = [0] * (len(lower_values) + 1)
+        for seen, (_, lower) in enumerate(pairs):
+            # Earlier edges ending strictly to the right of this one cross it
+            i, not_greater = index[lower], 0
+            while i > 0:
+                not_greater += tree[i]
+                i -= i & -i
+            crossings += seen - not_greater
+            i = index[lower]
+            while i < len(tree):
+                tree[i] += 1
+                i += i & -i
+    return crossings
+
+
+class LayoutState:
+    """Orders found by crossing reduction, kept to seed the next version's layout"""
+    def __init__(self):
+        self.vpc_order: List[str] = []
+        self.subnet_order: Dict[str, List[str]] = {}
+        self.rows: Dict[str, Dict[int, List[str]]] = {}
+        self.signatures: Dict[str, tuple] = {}
+
+
+def compute_layout(model: InfrastructureModel, edge_mode: str = "auto",
+                   seed: Optional[LayoutState] = None) -> Tuple[Dict[str, Any], LayoutState]:
+    """
+    Lay out the model and return (layout JSON, state).
+
+    The JSON has "nodes" and "groups" (VPC/subnet boxes) with top-left x/y,
+    width and height, the "edges" of the Mermaid diagram for edge_mode,
+    the overall "width"/"height" and the number of "crossings" left.
+
+    With a seed from an earlier version of the model, subnets whose nodes
+    and ranks are unchanged keep their seeded order and are not re-swept.
+    """
+    subnets_by_id, ec2_by_subnet, rds_by_subnet = bucket_resources(model)
+    private_ids = {e.id for e in model.ec2_instances
+                   if e.subnet_id in subnets_by_id
+                   and subnets_by_id[e.subnet_id].subnet_type == SubnetType.PRIVATE}
+    ranks = rank_nodes(model, private_ids)
+    edges = generate_relationship_edges(model, subnets_by_id, edge_mode)
+
+    state = LayoutState()
+    frozen = set()
+    for vpc in model.vpcs:
+        for subnet in vpc.subnets:
+            members = ([e.id for e in ec2_by_subnet.get(subnet.id, [])]
+                       + [r.id for r in rds_by_subnet.get(subnet.id, [])])
+            signature = tuple(sorted((m, ranks[m]) for m in members))
+            state.signatures[subnet.id] = signature
+
+            rows: Dict[int, List[str]] = defaultdict(list)
+            for member in members:
+                rows[ranks[member]].append(member)
+            if seed and seed.signatures.get(subnet.id) == signature:
+                rows = {rank: list(order) for rank, order in seed.rows[subnet.id].items()}
+                frozen.add(subnet.id)
+            state.rows[subnet.id] = dict(rows)
+
+    def seeded(order: List[str], previous: Optional[List[str]]) -> List[str]:
+        if not previous:
+            return order
+        known = {item: i for i, item in enumerate(previous)}
+        return sorted(order, key=lambda item: known.get(item, len(known)))
+
+    state.vpc_order = seeded([v.id for v in model.vpcs], seed.vpc_order if seed else None)
+    for vpc in model.vpcs:
+        state.subnet_order[vpc.id] = seeded([s.id for s in vpc.subnets],
+                                            seed.subnet_order.get(vpc.id) if seed else None)
+
+    # Neighbours for barycenters: LB/instance/subnet endpoints of every edge
+    # except the all-pairs private → database edges, which go through the port
+    neighbours: Dict[str, List[str]] = defaultdict(list)
+    for source, target, _, dashed in edges:
+        if not dashed:
+            neighbours[source].append(target)
+            neighbours[target].append(source)
+    leaf_edges = [(s, t) for s, t, _, dashed in edges if not dashed]
+    
+    # Bundled LB → subnet edges count crossings as if the subnet sat on the
+    # rank of its first row
+    edge_ranks = dict(ranks)
+    for subnet_id, signature in state.signatures.items():
+        if signature:
+            edge_ranks[subnet_id] = min(rank for _, rank in signature)
+
+    vpcs_by_id = {v.id: v for v in model.vpcs}
+
+    def place() -> Dict[str, float]:
+        """x centre of every node and subnet for the current orders"""
+        centre: Dict[str, float] = {}
+        x = MARGIN
+        for vpc_id in state.vpc_order:
+            x += GROUP_PADDING
+            for subnet_id in state.subnet_order[vpc_id]:
+                rows = state.rows[subnet_id]
+                widest = max((len(r) for r in rows.values()), default=1)
+                inner = max(widest, 1) * (NODE_WIDTH + NODE_GAP) - NODE_GAP
+                left = x + GROUP_PADDING
+                for row in rows.values():
+                    offset = left + (inner - (len(row) * (NODE_WIDTH + NODE_GAP) - NODE_GAP)) / 2
+                    for i, member in enumerate(row):
+                        centre[member] = offset + i * (NODE_WIDTH + NODE_GAP) + NODE_WIDTH / 2
+                centre[subnet_id] = left + inner / 2
+                x += inner + 2 * GROUP_PADDING + NODE_GAP
+            x += GROUP_PADDING
+
+        # Load balancers: at the barycenter of what they target, without overlaps
+        wanted = []
+        for lb in model.load_balancers:
+            targets = [centre[n] for n in neighbours[lb.id] if n in centre]
+            wanted.append((sum(targets) / len(targets) if targets else x, lb.id))
+        wanted.sort()
+        right = -float("inf")
+        for desired, lb_id in wanted:
+            centre[lb_id] = max(desired, right + NODE_WIDTH + NODE_GAP)
+            right = centre[lb_id]
+        return centre
+
+    def barycenter(node_id: str, centre: Dict[str, float]) -> Optional[float]:
+        points = [centre[n] for n in neighbours.get(node_id, ()) if n in centre]
+        return sum(points) / len(points) if points else None
+
+    centre = place()
+    best_crossings = count_crossings(leaf_edges, edge_ranks, centre)
+    sweeps = INCREMENTAL_SWEEPS if seed else LAYOUT_SWEEPS
+    for _ in range(sweeps):
+        if best_crossings == 0:
+            break
+        previous = (list(state.vpc_order), {k: list(v) for k, v in state.subnet_order.items()},
+                    {k: {r: list(o) for r, o in rows.items()} for k, rows in state.rows.items()})
+
+        subnet_score: Dict[str, float] = {}
+        for subnet_id, rows in state.rows.items():
+            scores = []
+            for rank, row in rows.items():
+                keyed = [(barycenter(m, centre), i, m) for i, m in enumerate(row)]
+                scores.extend(b for b, _, _ in keyed if b is not None)
+                if subnet_id not in frozen:
+                    rows[rank] = [m for _, _, m in sorted(
+                        keyed, key=lambda k: (k[0] if k[0] is not None else centre[k[2]], k[1]))]
+            own = barycenter(subnet_id, centre)
+            if own is not None:
+                scores.append(own)
+            subnet_score[subnet_id] = sum(scores) / len(scores) if scores else centre[subnet_id]
+        for vpc_id, order in state.subnet_order.items():
+            order.sort(key=lambda sid: subnet_score[sid])
+        state.vpc_order.sort(key=lambda vid: sum(subnet_score[s.id] for s in vpcs_by_id[vid].subnets)
+                             / max(len(vpcs_by_id[vid].subnets), 1))
+
+        centre = place()
+        crossings = count_crossings(leaf_edges, edge_ranks, centre)
+        if crossings >= best_crossings:
+            state.vpc_order, state.subnet_order, state.rows = previous
+            centre = place()
+            break
+        best_crossings = crossings
+
+    return build_layout_json(model, state, ranks, centre, edges, best_crossings,
+                             len(frozen), ec2_by_subnet, rds_by_subnet), state
+
+
+def build_layout_json(model: InfrastructureModel, state: LayoutState, ranks: Dict[str, int],
+                      centre: Dict[str, float], edges: list, crossings: int, reused: int,
+                      ec2_by_subnet: dict, rds_by_subnet: dict) -> Dict[str, Any]:
+    """Turn ranks and x centres into boxes (top-left x/y, width, height)"""
+    top_rank = min(ranks.values(), default=0)
+    inner_ranks = [ranks[e.id] for e in model.ec2_instances] + [ranks[r.id] for r in model.rds_databases]
+    lb_ranks = [ranks[lb.id] for lb in model.load_balancers]
+    first_inner = min(inner_ranks, default=top_rank)
+    last_inner = max(inner_ranks, default=first_inner)
+    # Load balancers are drawn outside the VPC boxes, so push the VPC rows
+    # below the lowest load balancer row
+    shift = max(0, max(lb_ranks) + 1 - first_inner) if lb_ranks and inner_ranks else 0
+
+    def row_y(rank: int) -> float:
+        return MARGIN + (rank - top_rank) * ROW_HEIGHT + 2 * GROUP_HEADER + GROUP_PADDING
+
+    nodes = []
+
+    def add_node(node_id: str, kind: str, label: str, parent: Optional[str], row_shift: int = 0):
+        nodes.append({
+            "id": node_id, "kind": kind, "label": label, "parent": parent,
+            "rank": ranks[node_id],
+            "x": centre[node_id] - NODE_WIDTH / 2, "y": row_y(ranks[node_id] + row_shift),
+            "width": NODE_WIDTH, "height": NODE_HEIGHT
+        })
+
+    groups = []
+    vpcs_by_id = {v.id: v for v in model.vpcs}
+    group_top = row_y(first_inner + shift) - GROUP_HEADER - GROUP_PADDING
+    group_bottom = row_y(last_inner + shift) + NODE_HEIGHT + GROUP_PADDING
+    right_edge = MARGIN
+    for vpc_id in state.vpc_order:
+        vpc = vpcs_by_id[vpc_id]
+        subnets = {s.id: s for s in vpc.subnets}
+        vpc_left = vpc_right = None
+        for subnet_id in state.subnet_order[vpc_id]:
+            subnet = subnets[subnet_id]
+            widest = max((len(r) for r in state.rows[subnet_id].values()), default=1)
+            inner = max(widest, 1) * (NODE_WIDTH + NODE_GAP) - NODE_GAP
+            left = centre[subnet_id] - inner / 2 - GROUP_PADDING
+            groups.append({
+                "id": subnet.id, "kind": "subnet", "parent": vpc.id,
+                "label": f"{subnet.name} {subnet.cidr}", "subnet_type": subnet.subnet_type.value,
+                "x": left, "y": group_top, "width": inner + 2 * GROUP_PADDING,
+                "height": group_bottom - group_top
+            })
+            vpc_left = left if vpc_left is None else vpc_left
+            vpc_right = left + inner + 2 * GROUP_PADDING
+            for ec2 in ec2_by_subnet.get(subnet.id, []):
+                add_node(ec2.id, "ec2", f"{ec2.name} {ec2.instance_type.value}", subnet.id, shift)
+            for rds in rds_by_subnet.get(subnet.id, []):
+                add_node(rds.id, "rds", f"{rds.name} {rds.engine.value}", subnet.id, shift)
+        if vpc_left is None:
+            vpc_left = vpc_right = right_edge + GROUP_PADDING
+        groups.append({
+            "id": vpc.id, "kind": "vpc", "parent": None, "label": f"{vpc.name} {vpc.cidr}",
+            "x": vpc_left - GROUP_PADDING, "y": group_top - GROUP_HEADER,
+            "width": vpc_right - vpc_left + 2 * GROUP_PADDING,
+            "height": group_bottom - group_top + GROUP_HEADER + GROUP_PADDING
+        })
+        right_edge = vpc_right + GROUP_PADDING
+
+    for lb in model.load_balancers:
+        add_node(lb.id, "load_balancer", lb.name, None)
+
+    boxes = nodes + groups
+    return {
+        "nodes": nodes,
+        "groups": groups,
+        "edges": [{"source": s, "target": t, "label": label, "dashed": dashed}
+                  for s, t, label, dashed in edges],
+        "width": max((b["x"] + b["width"] for b in boxes), default=0) + MARGIN,
+        "height": max((b["y"] + b["height"] for b in boxes), default=0) + MARGIN,
+        "crossings": crossings,
+        "reused_subnets": reused
+    }
+
+
+def remember_lineage(lineage: str, fingerprint: str):
+    """Record a lineage's latest layout; call with LAYOUT_CACHE_LOCK held"""
+    LAYOUT_LINEAGE[lineage] = fingerprint
+    LAYOUT_LINEAGE.move_to_end(lineage)
+    if len(LAYOUT_LINEAGE) > LAYOUT_CACHE_SIZE:
+        LAYOUT_LINEAGE.popitem(last=False)
+
+
+def get_layout(model: InfrastructureModel, edge_mode: str = "auto") -> Dict[str, Any]:
+    """
+    Cached layout for a model.
+
+    Looks the layout up by fingerprint first. On a miss, the last layout
+    computed for the same model lineage (model id without its -vN suffix)
+    seeds the new one, so small edits only re-sweep the subnets they touch.
+    """
+    fingerprint = layout_fingerprint(model, edge_mode)
+    lineage = f"{model.model_id.rsplit('-v', 1)[0]}:{edge_mode}"
+
+    with LAYOUT_CACHE_LOCK:
+        cached = LAYOUT_CACHE.get(fingerprint)
+        if cached is not None:
+            LAYOUT_CACHE.move_to_end(fingerprint)
+            remember_lineage(lineage, fingerprint)
+            return {"fingerprint": fingerprint, "cached": True, **cached[0]}
+        seed_entry = LAYOUT_CACHE.get(LAYOUT_LINEAGE.get(lineage, ""))
+
+    layout, state = compute_layout(model, edge_mode, seed_entry[1] if seed_entry else None)
+
+    with LAYOUT_CACHE_LOCK:
+        LAYOUT_CACHE[fingerprint] = (layout, state)
+        remember_lineage(lineage, fingerprint)
+        if len(LAYOUT_CACHE) > LAYOUT_CACHE_SIZE:
+            LAYOUT_CACHE.popitem(last=False)
+    return {"fingerprint": fingerprint, "cached": False, **layout}
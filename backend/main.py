@@ -7,18 +7,38 @@ The model is the single source of truth.
 """
 
 import os
-from fastapi import FastAPI, HTTPException
+import posixpath
+import asyncio
+import json
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from zipfile import ZipFile, ZIP_DEFLATED
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Literal, Optional, Tuple, Union
 
-from .parser import parse_text_to_model
-from .diagram import generate_mermaid_diagram, generate_diagram_description
-from .terraform import generate_terraform_code
+from .parser import parse_text_to_model, parse_text_to_edits
+from .diagram import (
+    generate_mermaid_diagram, generate_compact_diagram, generate_diagram_description,
+    generate_scoped_diagram, child_scopes, scope_model, export_diagram, iter_mermaid_diagram,
+    render_diagram_fragments, diff_diagram_fragments, EdgeMode
+)
+from .layout import get_layout
+from .apply_plan import plan_apply, DEFAULT_PARALLELISM
+from .terraform import (
+    generate_terraform_code, iter_terraform_code, generate_terraform_files, generate_terraform_json,
+    terraform_manifest, terraform_patch
+)
 from .security import validate_security, generate_security_report
-from .model import EditSource
-from .edits import add_resource, remove_resource, move_resource, update_resource_property
+from .model import EditSource, InfrastructureModel
+from .edits import add_resource, remove_resource, move_resource, update_resource_property, apply_edit_operations
 from .terraform_parser import parse_terraform_edits
+from .terraform_diff import apply_text_changes, span_index, parse_cache_stats
 
 
 # Initialize FastAPI app
@@ -45,10 +65,30 @@ app.add_middleware(
 )
 
 
+# Batch processing limits
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_EXTRACTION_CONCURRENCY = int(os.getenv("BATCH_EXTRACTION_CONCURRENCY", "8"))
+
+# Worker pool for diagram/Terraform/security generation in batch requests
+ARTIFACT_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("ARTIFACT_WORKERS", "4")))
+
+
+# Artifacts /text can return (see ARTIFACT_BUILDERS)
+Artifact = Literal["diagram", "description", "terraform", "security", "summary"]
+
+# Artifacts the edit endpoints can return; each endpoint returns the ones
+# its edit source affects unless the request's include narrows them
+EditArtifact = Literal["diagram", "description", "terraform", "security"]
+
+
 # Request/Response Models
 class TextRequest(BaseModel):
     """Request body for /text endpoint"""
     text: str
+    edge_mode: EdgeMode = "auto"  # Diagram relationship edges
+    diagram_style: Literal["standard", "compact"] = "standard"  # compact: short aliases + classDef
+    diagram_output: Literal["mermaid", "json", "dot"] = "mermaid"  # Diagram format to return
+    include: Optional[List[Artifact]] = None  # Artifacts to build and return; None = all
     
     class Config:
         json_schema_extra = {
@@ -59,15 +99,42 @@ class TextRequest(BaseModel):
 
 
 class InfrastructureResponse(BaseModel):
-    """Response from /text endpoint"""
+    """Response from /text endpoint; artifacts left out of include are None"""
     success: bool
-    description: str
-    mermaid_diagram: str
-    terraform_code: str
-    security_warnings: List[Dict[str, str]]
-    security_report: str
-    model_summary: Dict[str, Any]
+    description: Optional[str] = None
+    mermaid_diagram: Optional[str] = None  # Set for diagram_output "mermaid" (default)
+    diagram_graph: Optional[Dict[str, Any]] = None  # Set for diagram_output "json"
+    diagram_dot: Optional[str] = None  # Set for diagram_output "dot"
+    terraform_code: Optional[str] = None
+    security_warnings: Optional[List[Dict[str, str]]] = None
+    security_report: Optional[str] = None
+    model_summary: Optional[Dict[str, Any]] = None
     model_id: str
+    diagram_aliases: Optional[Dict[str, str]] = None  # Compact diagrams only: alias → model id
+
+
+class TextBatchRequest(BaseModel):
+    """Request body for /text/batch endpoint"""
+    texts: List[str]
+    edge_mode: EdgeMode = "auto"
+    diagram_style: Literal["standard", "compact"] = "standard"
+    diagram_output: Literal["mermaid", "json", "dot"] = "mermaid"
+    include: Optional[List[Artifact]] = None
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one description in a batch"""
+    index: int
+    success: bool
+    result: Optional[InfrastructureResponse] = None
+    error: Optional[str] = None
+
+
+class TextBatchResponse(BaseModel):
+    """Response from /text/batch endpoint"""
+    success: bool
+    unique_inputs: int
+    results: List[BatchItemResult]
 
 
 class DiagramEditRequest(BaseModel):
@@ -80,13 +147,60 @@ class DiagramEditRequest(BaseModel):
     target_subnet_id: str = None  # For move_resource
     property_name: str = None  # For update_resource_property
     value: Any = None  # For update_resource_property
+    diagram_format: Literal["full", "patch"] = "full"  # Full Mermaid text or changed fragments only
+    terraform_response: Literal["full", "patch"] = "full"  # Full Terraform text or changed blocks only
+    include: Optional[List[EditArtifact]] = None  # Artifacts to return; None = diagram, terraform, security
+
+
+class TerraformPosition(BaseModel):
+    """0-based line and UTF-16 character offset, as in LSP"""
+    line: int
+    character: int
+
+
+class TerraformRange(BaseModel):
+    start: TerraformPosition
+    end: TerraformPosition
+
+
+class TerraformTextChange(BaseModel):
+    """One LSP didChange content change; no range replaces the whole document"""
+    range: Optional[TerraformRange] = None
+    text: str
 
 
 class TerraformEditRequest(BaseModel):
-    """Request for Terraform code edits"""
+    """
+    Request for Terraform code edits
+    
+    Either both original_terraform and modified_terraform, or changes:
+    text ranges and replacements applied in order to the Terraform the
+    server keeps for current_model_id (HCL only).
+    """
+    current_model_id: str
+    original_terraform: Optional[str] = None
+    modified_terraform: Optional[str] = None
+    changes: Optional[List[TerraformTextChange]] = None
+    terraform_format: Literal["hcl", "json"] = "hcl"
+    diagram_format: Literal["full", "patch"] = "full"
+    include: Optional[List[EditArtifact]] = None  # None = diagram, description, security
+
+
+class TextEditRequest(BaseModel):
+    """Request for natural-language edits of an existing model"""
     current_model_id: str
-    original_terraform: str
-    modified_terraform: str
+    instruction: str
+    diagram_format: Literal["full", "patch"] = "full"
+    terraform_response: Literal["full", "patch"] = "full"
+    include: Optional[List[EditArtifact]] = None  # None = all four
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "current_model_id": "model-1a2b3c4d-v1",
+                "instruction": "Move the database to a t3 class and add a second web server"
+            }
+        }
 
 
 # API Endpoints
@@ -99,6 +213,17 @@ def read_root():
         "version": "1.0.0",
         "endpoints": {
             "POST /text": "Generate infrastructure from text description",
+            "POST /text/edit": "Edit an existing model with a text instruction",
+            "POST /text/batch": "Generate infrastructure for many descriptions at once",
+            "GET /model/{id}/diagram": "Level-of-detail diagram for a model scope",
+            "GET /model/{id}/layout": "Precomputed diagram layout as JSON coordinates",
+            "GET /model/{id}/terraform.tf": "Stream Terraform code",
+            "GET /model/{id}/terraform.tf.json": "Terraform code in JSON syntax",
+            "GET /model/{id}/terraform.zip": "Stream the Terraform files as a zip archive",
+            "GET /model/{id}/terraform/manifest": "Terraform file list with per-file ETags",
+            "GET /model/{id}/terraform/files/{path}": "One Terraform file (honours If-None-Match)",
+            "GET /model/{id}/diagram.mmd": "Stream the Mermaid diagram",
+            "GET /model/{id}/{artifact}": "Description, terraform, security or summary, built on first request",
             "POST /edit/diagram": "Edit infrastructure via diagram events",
             "POST /edit/terraform": "Edit infrastructure via Terraform code",
             "GET /health": "Health check"
@@ -118,7 +243,8 @@ def health_check():
             "security_validator": "operational",
             "edit_operations": "operational",
             "terraform_parser": "operational"
-        }
+        },
+        "parse_cache": parse_cache_stats()
     }
 
 
@@ -140,31 +266,9 @@ def generate_infrastructure(request: TextRequest):
         # This is where AI/LLM is used (mock for now)
         model = parse_text_to_model(request.text)
         
-        # Step 2: Generate Mermaid diagram from model
-        mermaid_diagram = generate_mermaid_diagram(model)
-        diagram_desc = generate_diagram_description(model)
-        
-        # Step 3: Generate Terraform code from model
-        terraform_code = generate_terraform_code(model)
-        
-        # Step 4: Validate security at model level
-        security_warnings = validate_security(model)
-        security_report = generate_security_report(security_warnings)
-        
-        # Store model for edit operations
-        MODEL_STORE[model.model_id] = model
-        
-        # Step 5: Return combined response
-        return InfrastructureResponse(
-            success=True,
-            description=diagram_desc,
-            mermaid_diagram=mermaid_diagram,
-            terraform_code=terraform_code,
-            security_warnings=[w.to_dict() for w in security_warnings],
-            security_report=security_report,
-            model_summary=model.to_dict(),
-            model_id=model.model_id  # ADD THIS - include model_id in response
-        )
+        # Steps 2-5: Generate the requested artifacts, store and return
+        return build_infrastructure_response(model, request.edge_mode, request.diagram_style,
+                                             request.diagram_output, request.include)
     
     except Exception as e:
         raise HTTPException(
@@ -173,6 +277,93 @@ def generate_infrastructure(request: TextRequest):
         )
 
 
+def build_infrastructure_response(model: InfrastructureModel, edge_mode: str = "auto",
+                                  diagram_style: str = "standard", diagram_output: str = "mermaid",
+                                  include: Optional[Iterable[str]] = None) -> InfrastructureResponse:
+    """
+    Run the Model → [Diagram, Terraform, Security] stages and store the model.
+    Shared by /text and /text/batch.
+    
+    Only the artifacts in include (default: all) are built; the rest are
+    built on demand by GET /model/{id}/{artifact}. Each is memoized, so a
+    later GET of one built here is served from the artifact cache.
+    """
+    include = ARTIFACT_BUILDERS.keys() if include is None else set(include)
+    
+    # Store model for edit operations and the artifact endpoints
+    store_model(model)
+    
+    # Steps 2-4: Diagram, Terraform and security stages, as requested
+    fields: Dict[str, Any] = {}
+    for artifact in ARTIFACT_BUILDERS:
+        if artifact in include:
+            options = (diagram_output, diagram_style, edge_mode) if artifact == "diagram" else ()
+            fields.update(model_artifact(model, artifact, options))
+    
+    # Edits are made against the Terraform the client was sent
+    if "terraform_code" in fields:
+        store_terraform_baseline(model.model_id, fields["terraform_code"])
+    
+    # Step 5: Return combined response
+    return InfrastructureResponse(success=True, model_id=model.model_id, **fields)
+
+
+@app.post("/text/batch", response_model=TextBatchResponse)
+async def generate_infrastructure_batch(request: TextBatchRequest):
+    """
+    Batch endpoint: Generate infrastructure for many descriptions at once.
+    
+    - Identical descriptions are processed once and share a result
+    - LLM extraction runs concurrently, at most BATCH_EXTRACTION_CONCURRENCY at a time
+    - Diagram/Terraform/security stages run on ARTIFACT_POOL as soon as
+      each item's model is ready
+    
+    Each item carries its own success flag and error, so one bad description
+    does not fail the batch. Total time tracks the slowest item, not the sum.
+    """
+    if len(request.texts) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.texts)} items (max {BATCH_MAX_ITEMS})"
+        )
+    
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(BATCH_EXTRACTION_CONCURRENCY)
+    
+    async def process(text: str) -> InfrastructureResponse:
+        async with semaphore:
+            model = await loop.run_in_executor(None, parse_text_to_model, text)
+        return await loop.run_in_executor(ARTIFACT_POOL, build_infrastructure_response, model,
+                                          request.edge_mode, request.diagram_style,
+                                          request.diagram_output, request.include)
+    
+    # Deduplicate identical inputs, keeping first-seen order
+    unique_texts = list(dict.fromkeys(request.texts))
+    outcomes = await asyncio.gather(
+        *(process(text) for text in unique_texts),
+        return_exceptions=True
+    )
+    by_text = dict(zip(unique_texts, outcomes))
+    
+    results = []
+    for index, text in enumerate(request.texts):
+        outcome = by_text[text]
+        if isinstance(outcome, Exception):
+            results.append(BatchItemResult(
+                index=index,
+                success=False,
+                error=f"Error generating infrastructure: {str(outcome)}"
+            ))
+        else:
+            results.append(BatchItemResult(index=index, success=True, result=outcome))
+    
+    return TextBatchResponse(
+        success=all(r.success for r in results),
+        unique_inputs=len(unique_texts),
+        results=results
+    )
+
+
 @app.post("/validate")
 def validate_infrastructure(request: TextRequest):
     """
@@ -204,6 +395,203 @@ def validate_infrastructure(request: TextRequest):
 
 # Global model store (in production, use a database)
 MODEL_STORE = {}
+MODEL_STORE_LOCK = Lock()
+
+
+def store_model(model: InfrastructureModel):
+    """
+    Store a model under an id no other model has had.
+    
+    Edits bump -vN, so two edits made from the same version both come out
+    as -v(N+1); the later one moves on to the next free version instead of
+    replacing the first. A stored id therefore always names the same
+    content, which the caches keyed by model id rely on.
+    """
+    with MODEL_STORE_LOCK:
+        stored = MODEL_STORE.get(model.model_id)
+        if stored is not None and stored is not model:
+            prefix, version = model.model_id.rsplit("-v", 1)
+            version = int(version)
+            while f"{prefix}-v{version}" in MODEL_STORE:
+                version += 1
+            model.model_id = f"{prefix}-v{version}"
+        MODEL_STORE[model.model_id] = model
+
+# Terraform each model's edits are made against (zlib-compressed), keyed by
+# model id: what the server rendered for it, or the client's document after
+# the Terraform edit that produced it. Bounded by count and compressed size,
+# least recently used first out; an evicted baseline is rendered again from
+# its model.
+TERRAFORM_BASELINES_SIZE = int(os.getenv("TERRAFORM_BASELINES_SIZE", "1024"))
+TERRAFORM_BASELINES_BYTES = int(os.getenv("TERRAFORM_BASELINES_BYTES", str(64 * 1024 * 1024)))
+TERRAFORM_BASELINES: "OrderedDict[str, bytes]" = OrderedDict()
+TERRAFORM_BASELINES_LOCK = Lock()
+terraform_baselines_bytes = 0
+
+# Fast zlib level: generated Terraform still compresses ~20x
+BASELINE_COMPRESSION_LEVEL = 1
+
+
+def store_terraform_baseline(model_id: str, terraform_code: Union[str, bytes]):
+    """Keep the Terraform text a model's range edits apply to"""
+    global terraform_baselines_bytes
+    if isinstance(terraform_code, str):
+        terraform_code = terraform_code.encode()
+    compressed = zlib.compress(terraform_code, BASELINE_COMPRESSION_LEVEL)
+    with TERRAFORM_BASELINES_LOCK:
+        previous = TERRAFORM_BASELINES.pop(model_id, None)
+        terraform_baselines_bytes += len(compressed) - (len(previous) if previous else 0)
+        TERRAFORM_BASELINES[model_id] = compressed
+        while TERRAFORM_BASELINES and (len(TERRAFORM_BASELINES) > TERRAFORM_BASELINES_SIZE
+                                       or terraform_baselines_bytes > TERRAFORM_BASELINES_BYTES):
+            terraform_baselines_bytes -= len(TERRAFORM_BASELINES.popitem(last=False)[1])
+
+
+def terraform_baseline(model: InfrastructureModel) -> bytes:
+    """The stored Terraform baseline of a model, rendered and stored if missing"""
+    with TERRAFORM_BASELINES_LOCK:
+        compressed = TERRAFORM_BASELINES.get(model.model_id)
+        if compressed is not None:
+            TERRAFORM_BASELINES.move_to_end(model.model_id)
+    if compressed is None:
+        code = generate_terraform_code(model).encode()
+        store_terraform_baseline(model.model_id, code)
+        return code
+    return zlib.decompress(compressed)
+
+
+def diagram_fields(model: InfrastructureModel, diagram_output: str = "mermaid",
+                   diagram_style: str = "standard", edge_mode: str = "auto") -> Dict[str, Any]:
+    """The diagram in the requested format, as InfrastructureResponse fields"""
+    if diagram_output in ("json", "dot"):
+        diagram = export_diagram(model, diagram_output, edge_mode)
+        return {"diagram_graph" if diagram_output == "json" else "diagram_dot": diagram}
+    if diagram_style == "compact":
+        mermaid_diagram, diagram_aliases = generate_compact_diagram(model, edge_mode)
+        return {"mermaid_diagram": mermaid_diagram, "diagram_aliases": diagram_aliases}
+    return {"mermaid_diagram": generate_mermaid_diagram(model, edge_mode)}
+
+
+def security_fields(model: InfrastructureModel) -> Dict[str, Any]:
+    security_warnings = validate_security(model)
+    return {
+        "security_warnings": [w.to_dict() for w in security_warnings],
+        "security_report": generate_security_report(security_warnings)
+    }
+
+
+# Artifact → builder of its InfrastructureResponse fields, in response order.
+# Only the diagram takes options (diagram_fields' arguments after the model).
+ARTIFACT_BUILDERS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "diagram": diagram_fields,
+    "description": lambda model: {"description": generate_diagram_description(model)},
+    "terraform": lambda model: {"terraform_code": generate_terraform_code(model)},
+    "security": security_fields,
+    "summary": lambda model: {"model_summary": model.to_dict()},
+}
+
+# Built artifacts as zlib-compressed JSON, keyed by (model id, artifact,
+# options). Stored models are never mutated and store_model never reuses an
+# id, so an entry always matches the model its id names. Bounded by count
+# and compressed size, least recently used first out.
+ARTIFACT_CACHE_SIZE = int(os.getenv("ARTIFACT_CACHE_SIZE", "1024"))
+ARTIFACT_CACHE_BYTES = int(os.getenv("ARTIFACT_CACHE_BYTES", str(64 * 1024 * 1024)))
+ARTIFACT_CACHE: "OrderedDict[Tuple[str, str, tuple], bytes]" = OrderedDict()
+ARTIFACT_CACHE_LOCK = Lock()
+artifact_cache_bytes = 0
+
+
+def cached_artifact_json(key: Tuple[str, str, tuple]) -> Optional[bytes]:
+    with ARTIFACT_CACHE_LOCK:
+        compressed = ARTIFACT_CACHE.get(key)
+        if compressed is None:
+            return None
+        ARTIFACT_CACHE.move_to_end(key)
+    return zlib.decompress(compressed)
+
+
+def store_artifact_json(key: Tuple[str, str, tuple], data: bytes):
+    global artifact_cache_bytes
+    compressed = zlib.compress(data, BASELINE_COMPRESSION_LEVEL)
+    with ARTIFACT_CACHE_LOCK:
+        previous = ARTIFACT_CACHE.pop(key, None)
+        artifact_cache_bytes += len(compressed) - (len(previous) if previous else 0)
+        ARTIFACT_CACHE[key] = compressed
+        while ARTIFACT_CACHE and (len(ARTIFACT_CACHE) > ARTIFACT_CACHE_SIZE
+                                  or artifact_cache_bytes > ARTIFACT_CACHE_BYTES):
+            artifact_cache_bytes -= len(ARTIFACT_CACHE.popitem(last=False)[1])
+
+
+def model_artifact(model: InfrastructureModel, artifact: str, options: tuple = ()) -> Dict[str, Any]:
+    """An artifact's response fields, built and memoized on first request"""
+    key = (model.model_id, artifact, options)
+    data = cached_artifact_json(key)
+    if data is not None:
+        return json.loads(data)
+    fields = ARTIFACT_BUILDERS[artifact](model, *options)
+    store_artifact_json(key, json.dumps(fields).encode())
+    return fields
+
+
+def model_artifact_json(model: InfrastructureModel, artifact: str) -> bytes:
+    """model_artifact as a JSON object, without decoding a cached one"""
+    key = (model.model_id, artifact, ())
+    data = cached_artifact_json(key)
+    if data is None:
+        data = json.dumps(ARTIFACT_BUILDERS[artifact](model)).encode()
+        store_artifact_json(key, data)
+    return data
+
+
+def edit_artifacts(include: Optional[List[str]], default: Tuple[str, ...]) -> Iterable[str]:
+    """The artifacts an edit response carries: include, or the endpoint's default"""
+    return default if include is None else set(include)
+
+
+def edit_security_fields(warnings) -> Dict[str, Any]:
+    """An edit's security warnings and report, as response fields"""
+    return {
+        "security_warnings": [w.to_dict() for w in warnings],
+        "security_report": generate_security_report(warnings)
+    }
+
+
+def diagram_payload(base_model: InfrastructureModel, updated_model: InfrastructureModel,
+                    diagram_format: str) -> Dict[str, Any]:
+    """
+    Diagram part of an edit response.
+    
+    "full" returns the whole Mermaid text as mermaid_diagram. "patch" returns
+    diagram_patch with only the subgraph fragments that differ from
+    base_model's diagram plus the stable fragment order (see
+    diff_diagram_fragments); unchanged subnets are served from the fragment
+    cache, so both renders are cheap.
+    """
+    if diagram_format == "patch":
+        patch = diff_diagram_fragments(render_diagram_fragments(base_model),
+                                       render_diagram_fragments(updated_model))
+        return {"diagram_patch": {"base_model_id": base_model.model_id, **patch}}
+    return {"mermaid_diagram": generate_mermaid_diagram(updated_model)}
+
+
+def terraform_payload(base_model: InfrastructureModel, updated_model: InfrastructureModel,
+                      terraform_response: str) -> Dict[str, Any]:
+    """
+    Terraform part of an edit response; also stores the updated model's
+    baseline.
+    
+    "full" returns the whole regenerated file as terraform_code. "patch"
+    returns terraform_patch with block-level edits against base_model's
+    baseline (see terraform_patch), so the client can apply them in place
+    and keep its cursor and undo history.
+    """
+    if terraform_response == "patch":
+        code, edits = terraform_patch(terraform_baseline(base_model), base_model, updated_model)
+        store_terraform_baseline(updated_model.model_id, code)
+        return {"terraform_patch": {"base_model_id": base_model.model_id, "size": len(code), "edits": edits}}
+    terraform_code = generate_terraform_code(updated_model)
+    store_terraform_baseline(updated_model.model_id, terraform_code)
+    return {"terraform_code": terraform_code}
 
 
 @app.post("/edit/diagram")
@@ -239,22 +627,21 @@ def edit_via_diagram(request: DiagramEditRequest):
         
         # Store updated model
         updated_model = result.model
-        MODEL_STORE[updated_model.model_id] = updated_model
+        store_model(updated_model)
         
-        # Regenerate both diagram and Terraform for frontend display
-        mermaid_diagram = generate_mermaid_diagram(updated_model)
-        terraform_code = generate_terraform_code(updated_model)
-        security_report = generate_security_report(result.warnings)
-        
-        return {
-            "success": True,
-            "model_id": updated_model.model_id,
-            "mermaid_diagram": mermaid_diagram,
-            "terraform_code": terraform_code,
-            "security_warnings": [w.to_dict() for w in result.warnings],
-            "security_report": security_report,
-            "message": f"Applied {request.operation} successfully"
-        }
+        # Regenerate diagram and Terraform for frontend display, as requested
+        include = edit_artifacts(request.include, ("diagram", "terraform", "security"))
+        response = {"success": True, "model_id": updated_model.model_id}
+        if "diagram" in include:
+            response.update(diagram_payload(current_model, updated_model, request.diagram_format))
+        if "description" in include:
+            response.update(model_artifact(updated_model, "description"))
+        if "terraform" in include:
+            response.update(terraform_payload(current_model, updated_model, request.terraform_response))
+        if "security" in include:
+            response.update(edit_security_fields(result.warnings))
+        response["message"] = f"Applied {request.operation} successfully"
+        return response
     except Exception as e:
         raise HTTPException(500, f"Edit failed: {str(e)}")
 
@@ -266,6 +653,12 @@ def edit_via_terraform(request: TerraformEditRequest):
     
     Flow: Terraform Edit → Parse → Model Update → Security → Regenerate Diagram
     
+    With changes instead of original/modified text, the ranges are applied
+    to the Terraform stored for current_model_id, so only the edits are
+    uploaded. Either way the edited document becomes the baseline of the
+    resulting model, matching what the client's editor now shows; when it
+    yields no edit operations, the model and its baseline stay as they were.
+    
     Loop Prevention: Tracks EditSource.TERRAFORM
     """
     try:
@@ -274,51 +667,473 @@ def edit_via_terraform(request: TerraformEditRequest):
             raise HTTPException(404, f"Model {request.current_model_id} not found")
         
         # Parse Terraform changes
-        edit_operations = parse_terraform_edits(request.original_terraform, request.modified_terraform)
+        try:
+            original, modified = terraform_edit_documents(current_model, request)
+            edit_operations = parse_terraform_edits(original, modified, request.terraform_format)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
         
         if not edit_operations:
             return {"success": True, "message": "No changes detected", "model_id": current_model.model_id}
         
         # Apply operations
-        working_model = current_model
-        all_warnings = []
+        result = apply_edit_operations(current_model, edit_operations, EditSource.TERRAFORM)
+        if not result.success:
+            return {"success": False, "error": result.error, "warnings": [w.to_dict() for w in result.warnings] if result.warnings else []}
         
-        for op in edit_operations:
-            if op['operation'] == 'update_resource_property':
-                result = update_resource_property(working_model, op['resource_id'], op['property'], op['value'], EditSource.TERRAFORM)
-            elif op['operation'] == 'move_resource':
-                result = move_resource(working_model, op['resource_id'], op['target_subnet_id'], EditSource.TERRAFORM)
-            elif op['operation'] == 'remove_resource':
-                result = remove_resource(working_model, op['resource_id'], EditSource.TERRAFORM)
-            else:
-                continue
-            
-            if not result.success:
-                return {"success": False, "error": f"Failed: {result.error}", "warnings": [w.to_dict() for w in result.warnings] if result.warnings else []}
-            
-            working_model = result.model
-            all_warnings.extend(result.warnings)
+        working_model = result.model
+        all_warnings = result.warnings
         
         # Store updated model
-        MODEL_STORE[working_model.model_id] = working_model
+        store_model(working_model)
+        if request.terraform_format == "hcl":
+            store_terraform_baseline(working_model.model_id, modified)
         
-        # Regenerate diagram only (Terraform edit source)
-        mermaid_diagram = generate_mermaid_diagram(working_model)
-        diagram_desc = generate_diagram_description(working_model)
-        security_report = generate_security_report(all_warnings)
+        # Regenerate diagram only (Terraform edit source), as requested
+        include = edit_artifacts(request.include, ("diagram", "description", "security"))
+        response = {"success": True, "model_id": working_model.model_id}
+        if "diagram" in include:
+            response.update(diagram_payload(current_model, working_model, request.diagram_format))
+        if "description" in include:
+            response.update(model_artifact(working_model, "description"))
+        if "terraform" in include:
+            # The client's document is the baseline; regenerated code only on request
+            response["terraform_code"] = generate_terraform_code(working_model)
+        if "security" in include:
+            response.update(edit_security_fields(all_warnings))
+        response["operations_applied"] = len(edit_operations)
+        response["message"] = f"Applied {len(edit_operations)} operation(s)"
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Terraform edit failed: {str(e)}")
+
+
+def terraform_edit_documents(model: InfrastructureModel,
+                             request: TerraformEditRequest) -> Tuple[Union[str, bytes], Union[str, bytes]]:
+    """
+    (original, modified) Terraform for an edit request: the uploaded texts,
+    or the stored baseline and the baseline with the range changes applied.
+    Raises ValueError for an incomplete request or an invalid range.
+    """
+    if request.changes is None:
+        if request.original_terraform is None or request.modified_terraform is None:
+            raise ValueError("Send original_terraform and modified_terraform, or changes")
+        return request.original_terraform, request.modified_terraform
+    
+    if request.terraform_format != "hcl":
+        raise ValueError("Range changes apply to the stored HCL baseline; use terraform_format 'hcl'")
+    original = terraform_baseline(model)
+    modified = apply_text_changes(original, span_index(original),
+                                  [change.model_dump() for change in request.changes])
+    return original, modified
+
+
+@app.post("/text/edit")
+def edit_via_text(request: TextEditRequest):
+    """
+    Edit infrastructure with a natural-language instruction
+    
+    Flow: Instruction → LLM edit operations → Model Update → Security → Regenerate
+    
+    Only a compact summary of the current model and the instruction go to the
+    LLM, and it answers with edit operations rather than a whole new intent.
+    Resource ids and prior diagram/Terraform edits are preserved.
+    
+    Loop Prevention: Tracks EditSource.TEXT
+    """
+    try:
+        current_model = MODEL_STORE.get(request.current_model_id)
+        if not current_model:
+            raise HTTPException(404, f"Model {request.current_model_id} not found")
+        
+        edit_operations = parse_text_to_edits(request.instruction, current_model)
+        
+        if not edit_operations:
+            return {"success": True, "message": "No changes detected", "model_id": current_model.model_id}
+        
+        result = apply_edit_operations(current_model, edit_operations, EditSource.TEXT)
+        if not result.success:
+            return {"success": False, "error": result.error, "operations": edit_operations, "warnings": [w.to_dict() for w in result.warnings] if result.warnings else []}
         
+        # Store updated model
+        updated_model = result.model
+        store_model(updated_model)
+        
+        # Text edits affect both views, so regenerate both unless narrowed
+        include = edit_artifacts(request.include, ("diagram", "description", "terraform", "security"))
+        response = {"success": True, "model_id": updated_model.model_id}
+        if "diagram" in include:
+            response.update(diagram_payload(current_model, updated_model, request.diagram_format))
+        if "description" in include:
+            response.update(model_artifact(updated_model, "description"))
+        if "terraform" in include:
+            response.update(terraform_payload(current_model, updated_model, request.terraform_response))
+        if "security" in include:
+            response.update(edit_security_fields(result.warnings))
+        response.update({
+            "operations": edit_operations,
+            "operations_applied": len(edit_operations),
+            "message": f"Applied {len(edit_operations)} operation(s) from text"
+        })
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Text edit failed: {str(e)}")
+
+
+@lru_cache(maxsize=256)
+def cached_scoped_diagram(model_id: str, scope: str, depth: Optional[int], edge_mode: str, compact: bool):
+    """Stored models are never mutated and store_model never reuses an id, so cache by id"""
+    return generate_scoped_diagram(MODEL_STORE[model_id], scope, depth, edge_mode, compact)
+
+
+@lru_cache(maxsize=64)
+def cached_diagram_export(model_id: str, scope: str, output: str, edge_mode: str):
+    """Full-detail graph JSON / DOT export of a scope, cached by id like cached_scoped_diagram"""
+    return export_diagram(scope_model(MODEL_STORE[model_id], scope), output, edge_mode)
+
+
+@app.get("/model/{model_id}/diagram")
+def get_model_diagram(
+    model_id: str,
+    scope: str = "model",
+    depth: Optional[int] = Query(None, ge=0, le=2),
+    edge_mode: EdgeMode = "auto",
+    diagram_style: Literal["standard", "compact"] = "standard",
+    output: Literal["mermaid", "json", "dot"] = "mermaid"
+):
+    """
+    Level-of-detail diagram for part of a stored model
+    
+    - scope: "model", "vpc:<id>" or "subnet:<id>"
+    - depth: 0 = VPC counts, 1 = subnet counts, 2 = every resource;
+      omitted = full detail for small scopes, subnet counts for large ones
+    - diagram_style: "compact" draws full detail with short node aliases,
+      returned in diagram_aliases
+    - output: "json" (typed graph) or "dot" (Graphviz) export the full
+      detail of the scope instead of Mermaid text
+    
+    Clients render the overview first and fetch the returned child_scopes
+    lazily, so payload size follows what is on screen.
+    """
+    model = MODEL_STORE.get(model_id)
+    if not model:
+        raise HTTPException(404, f"Model {model_id} not found")
+    
+    if output != "mermaid":
+        try:
+            diagram = cached_diagram_export(model_id, scope, output, edge_mode)
+        except KeyError:
+            raise HTTPException(404, f"Scope {scope} not found in model {model_id}")
+        except ValueError as e:
+            raise HTTPException(400, str(e))
         return {
             "success": True,
-            "model_id": working_model.model_id,
-            "mermaid_diagram": mermaid_diagram,
-            "description": diagram_desc,
-            "security_warnings": [w.to_dict() for w in all_warnings],
-            "security_report": security_report,
-            "operations_applied": len(edit_operations),
-            "message": f"Applied {len(edit_operations)} operation(s)"
+            "model_id": model_id,
+            "scope": scope,
+            "depth": 2,
+            "diagram_graph" if output == "json" else "diagram_dot": diagram,
+            "child_scopes": child_scopes(model, scope)
         }
+    
+    try:
+        mermaid_diagram, used_depth, diagram_aliases = cached_scoped_diagram(
+            model_id, scope, depth, edge_mode, diagram_style == "compact"
+        )
+    except KeyError:
+        raise HTTPException(404, f"Scope {scope} not found in model {model_id}")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    return {
+        "success": True,
+        "model_id": model_id,
+        "scope": scope,
+        "depth": used_depth,
+        "mermaid_diagram": mermaid_diagram,
+        "diagram_aliases": diagram_aliases,
+        "child_scopes": child_scopes(model, scope)
+    }
+
+
+@app.get("/model/{model_id}/layout")
+def get_model_layout(
+    model_id: str,
+    edge_mode: EdgeMode = "auto"
+):
+    """
+    Precomputed diagram layout for a stored model
+    
+    Returns nodes and VPC/subnet groups with x/y/width/height, plus the
+    relationship edges, so the frontend can draw without running Mermaid's
+    layout. Layouts are cached by model content, and an edited model's
+    layout is seeded from its previous version's.
+    """
+    model = MODEL_STORE.get(model_id)
+    if not model:
+        raise HTTPException(404, f"Model {model_id} not found")
+    
+    try:
+        layout = get_layout(model, edge_mode)
     except Exception as e:
-        raise HTTPException(500, f"Terraform edit failed: {str(e)}")
+        raise HTTPException(500, f"Layout failed: {str(e)}")
+    
+    return {"success": True, "model_id": model_id, **layout}
+
+
+@lru_cache(maxsize=64)
+def cached_apply_plan(model_id: str, parallelism: int) -> Dict:
+    """Stored models are never mutated and store_model never reuses an id, so cache by id"""
+    return plan_apply(MODEL_STORE[model_id], parallelism).to_dict()
+
+
+@app.get("/model/{model_id}/apply-plan")
+def get_apply_plan(model_id: str, parallelism: int = Query(DEFAULT_PARALLELISM, ge=1)):
+    """
+    Apply waves for a stored model's Terraform
+    
+    Returns the resources grouped into waves that can be created in
+    parallel, the critical path and its provisioning time, the estimated
+    `terraform apply` time at the given -parallelism, and the lowest
+    parallelism that gets close to the critical path.
+    """
+    if model_id not in MODEL_STORE:
+        raise HTTPException(404, f"Model {model_id} not found")
+    
+    try:
+        plan = cached_apply_plan(model_id, parallelism)
+    except Exception as e:
+        raise HTTPException(500, f"Apply planning failed: {str(e)}")
+    
+    return {"success": True, "model_id": model_id, **plan}
+
+
+# Streamed artifacts are sent in chunks of about this many characters
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_encoded_chunks(pieces: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Coalesce small rendered pieces into UTF-8 chunks of about chunk_size"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+@app.get("/model/{model_id}/terraform.tf")
+def stream_model_terraform(model_id: str):
+    """
+    Stream the Terraform code of a stored model as a .tf file
+    
+    Bytes are sent as each resource is rendered, so memory stays constant
+    however large the model is.
+    """
+    model = MODEL_STORE.get(model_id)
+    if not model:
+        raise HTTPException(404, f"Model {model_id} not found")
+    
+    return StreamingResponse(
+        iter_encoded_chunks(iter_terraform_code(model)),
+        media_type="text/plain",
+        headers={"Content-Disposition": 'inline; filename="main.tf"'}
+    )
+
+
+@app.get("/model/{model_id}/terraform.tf.json")
+def get_model_terraform_json(model_id: str):
+    """
+    Terraform code of a stored model in JSON syntax
+    
+    infra_id metadata is carried in "//" properties; send edited copies back
+    to POST /edit/terraform with terraform_format="json".
+    """
+    model = MODEL_STORE.get(model_id)
+    if not model:
+        raise HTTPException(404, f"Model {model_id} not found")
+    
+    return Response(
+        generate_terraform_json(model),
+        media_type="application/json",
+        headers={"Content-Disposition": 'inline; filename="main.tf.json"'}
+    )
+
+
+@lru_cache(maxsize=64)
+def cached_terraform_files(model_id: str, layout: str) -> Dict[str, bytes]:
+    """
+    Encoded Terraform files of a stored model. Stored models are never
+    mutated and store_model never reuses an id, so the files (and the ETags
+    derived from them) can be cached by id.
+    """
+    files = generate_terraform_files(MODEL_STORE[model_id], layout)
+    return {path: content.encode() for path, content in files.items()}
+
+
+def get_terraform_files(model_id: str, layout: str) -> Dict[str, bytes]:
+    if model_id not in MODEL_STORE:
+        raise HTTPException(404, f"Model {model_id} not found")
+    try:
+        return cached_terraform_files(model_id, layout)
+    except Exception as e:
+        raise HTTPException(500, f"Terraform generation failed: {str(e)}")
+
+
+class ZipChunkSink:
+    """Write-only file object that collects ZipFile output between drains"""
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def is_archive_path(path: str) -> bool:
+    """Whether path stays inside the archive root once extracted (relative, no .. above it)"""
+    normalized = posixpath.normpath(path.replace("\\", "/"))
+    return not (posixpath.isabs(normalized) or normalized == ".." or normalized.startswith("../")
+                or ":" in normalized.split("/")[0])
+
+
+def iter_zip_chunks(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """
+    Build a zip archive on the fly, yielding its bytes file by file.
+    
+    The sink has no tell/seek, so ZipFile writes each entry's sizes in a
+    data descriptor after its data; nothing is buffered beyond one entry
+    and no temporary file is used.
+    """
+    sink = ZipChunkSink()
+    with ZipFile(sink, "w", compression=ZIP_DEFLATED) as archive:
+        for path, content in files:
+            archive.writestr(path, content)
+            yield sink.drain()
+    yield sink.drain()
+
+
+@app.get("/model/{model_id}/terraform/manifest")
+def get_terraform_manifest(model_id: str, layout: Literal["single", "modules"] = "modules"):
+    """
+    Terraform file list of a stored model with a strong ETag per file
+    
+    After an edit, clients compare ETags with what they hold and fetch only
+    the changed files from /model/{id}/terraform/files/{path}.
+    """
+    files = get_terraform_files(model_id, layout)
+    return {
+        "success": True,
+        "model_id": model_id,
+        "layout": layout,
+        "files": terraform_manifest(files)
+    }
+
+
+@app.get("/model/{model_id}/terraform/files/{path:path}")
+def get_terraform_file(
+    model_id: str,
+    path: str,
+    layout: Literal["single", "modules"] = "modules",
+    if_none_match: Optional[str] = Header(None)
+):
+    """One generated Terraform file; 304 when If-None-Match has its ETag"""
+    files = get_terraform_files(model_id, layout)
+    content = files.get(path)
+    if content is None:
+        raise HTTPException(404, f"File {path} not found in model {model_id}")
+    
+    etag = terraform_manifest({path: content})[0]["etag"]
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content, media_type="text/plain", headers={"ETag": etag})
+
+
+@app.get("/model/{model_id}/terraform.zip")
+def stream_model_terraform_zip(model_id: str, layout: Literal["single", "modules"] = "modules"):
+    """
+    Stream the Terraform files of a stored model as a zip archive
+    
+    The archive is built while it is sent (no temporary files) and ends
+    with manifest.json, the same file list and ETags as
+    /model/{id}/terraform/manifest.
+    """
+    files = get_terraform_files(model_id, layout)
+    unsafe = [path for path in files if not is_archive_path(path)]
+    if unsafe:
+        raise HTTPException(500, f"Terraform file paths escape the archive root: {unsafe}")
+    manifest = json.dumps({"model_id": model_id, "layout": layout,
+                           "files": terraform_manifest(files)}, indent=2).encode()
+    entries = [*files.items(), ("manifest.json", manifest)]
+    
+    return StreamingResponse(
+        iter_zip_chunks(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{model_id}-terraform.zip"'}
+    )
+
+
+@app.get("/model/{model_id}/diagram.mmd")
+def stream_model_diagram(
+    model_id: str,
+    edge_mode: EdgeMode = "auto"
+):
+    """
+    Stream the full Mermaid diagram of a stored model as a .mmd file
+    
+    Relationship edges are rendered one at a time, so even "full" edges on a
+    large model are sent without building the whole text in memory.
+    """
+    model = MODEL_STORE.get(model_id)
+    if not model:
+        raise HTTPException(404, f"Model {model_id} not found")
+    
+    return StreamingResponse(
+        iter_encoded_chunks(iter_mermaid_diagram(model, edge_mode)),
+        media_type="text/plain",
+        headers={"Content-Disposition": 'inline; filename="diagram.mmd"'}
+    )
+
+
+# Registered last, so the specific /model/{model_id}/... routes above match first
+@app.get("/model/{model_id}/{artifact}")
+def get_model_artifact(model_id: str, artifact: str):
+    """
+    One artifact of a stored model: description, terraform, security or
+    summary (the diagram has its own endpoint above)
+    
+    Built on first request and memoized per model version, so a client
+    showing one tab only pays for that tab. The response has the same
+    fields /text would return for the artifact.
+    """
+    model = MODEL_STORE.get(model_id)
+    if not model:
+        raise HTTPException(404, f"Model {model_id} not found")
+    if artifact not in ARTIFACT_BUILDERS or artifact == "diagram":
+        raise HTTPException(404, f"Unknown artifact: {artifact}")
+    
+    try:
+        data = model_artifact_json(model, artifact)
+    except Exception as e:
+        raise HTTPException(500, f"Building {artifact} failed: {str(e)}")
+    
+    # Splice the cached JSON object's fields in without decoding them
+    prefix = json.dumps({"success": True, "model_id": model_id})[:-1].encode()
+    return Response(prefix + b", " + data[1:], media_type="application/json")
 
 
 # Run with: uvicorn backend.main:app --reload
@@ -11,6 +11,12 @@ from typing import List, Optional, Dict
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime
+import uuid
+
+
+def new_model_id() -> str:
+    """Unique id for a new model lineage; edits bump only the -vN suffix"""
+    return f"model-{uuid.uuid4().hex[:8]}-v1"
 
 
 class EditSource(Enum):
@@ -153,7 +159,7 @@ class InfrastructureModel:
     # Edit tracking fields
     last_edit_source: EditSource = EditSource.INITIAL
     last_edit_timestamp: Optional[datetime] = None
-    model_id: str = "model-v1"  # Incremented on edits for conflict detection
+    model_id: str = field(default_factory=new_model_id)  # Version incremented on edits for conflict detection
     
     def add_vpc(self, vpc: VPC):
         """Add a VPC to the model"""
@@ -200,8 +206,36 @@ class InfrastructureModel:
         self.last_edit_source = source
         self.last_edit_timestamp = datetime.now()
         # Update model ID for version tracking
-        version = int(self.model_id.split('-v')[-1]) + 1
-        self.model_id = f"model-v{version}"
+        prefix, version = self.model_id.rsplit('-v', 1)
+        self.model_id = f"{prefix}-v{int(version) + 1}"
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "InfrastructureModel":
+        """
+        Rebuild a model from to_dict output. Fields to_dict leaves out
+        (availability zones, AMIs, DB instance class and storage) get their
+        defaults. Raises ValueError for a malformed dictionary.
+        """
+        try:
+            model = cls()
+            for vpc in data.get("vpcs", []):
+                model.add_vpc(VPC(
+                    id=vpc["id"], name=vpc["name"], cidr=vpc["cidr"],
+                    subnets=[Subnet(id=s["id"], name=s["name"], cidr=s["cidr"], subnet_type=s["type"])
+                             for s in vpc.get("subnets", [])]
+                ))
+            for ec2 in data.get("ec2_instances", []):
+                model.add_ec2(EC2Instance(id=ec2["id"], name=ec2["name"], instance_type=ec2["type"],
+                                          subnet_id=ec2["subnet"]))
+            for rds in data.get("rds_databases", []):
+                model.add_rds(RDSDatabase(id=rds["id"], name=rds["name"], engine=rds["engine"],
+                                          instance_class="db.t3.micro", subnet_ids=list(rds["subnets"])))
+            for lb in data.get("load_balancers", []):
+                model.add_load_balancer(LoadBalancer(id=lb["id"], name=lb["name"], subnet_ids=list(lb["subnets"]),
+                                                     target_instance_ids=list(lb.get("targets", []))))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed model dictionary: {e!r}")
+        return model
     
     def to_dict(self) -> Dict:
         """Convert model to dictionary for debugging/logging"""
@@ -7,7 +7,10 @@ Now supports Google Gemini API with fallback to mock LLM.
 import json
 import re
 import os
-from typing import Dict, Any, Optional
+import ipaddress
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, Optional, List, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -29,15 +32,13 @@ except ImportError:
     GEMINI_AVAILABLE = False
     GEMINI_CONFIGURED = False
 
-from .model import (
-    InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer,
-    SubnetType, InstanceType, DatabaseEngine
-)
+from .model import InfrastructureModel, InstanceType
+from .intent import build_model_from_intent, validate_edit_operations, IntentError
 
 
-def gemini_extract(text: str) -> Optional[Dict[str, Any]]:
+def gemini_generate_json(prompt: str) -> Optional[Any]:
     """
-    Use Google Gemini API to extract structured infrastructure intent from text.
+    Send a prompt to Google Gemini and parse the reply as JSON.
     Returns None if Gemini is not available or fails.
     """
     if not GEMINI_AVAILABLE or not GEMINI_CONFIGURED:
@@ -47,8 +48,35 @@ def gemini_extract(text: str) -> Optional[Dict[str, Any]]:
         # Initialize Gemini model (using gemini-pro for text)
         model = genai.GenerativeModel('gemini-pro')
         
-        # Craft a detailed prompt for infrastructure extraction
-        prompt = f"""You are an expert AWS infrastructure architect. Extract infrastructure requirements from the following text and return ONLY a valid JSON object with this exact structure:
+        # Generate response
+        response = model.generate_content(prompt)
+        
+        # Extract JSON from response
+        response_text = response.text.strip()
+        
+        # Remove markdown code blocks if present
+        if response_text.startswith('```'):
+            response_text = re.sub(r'^```(?:json)?\n', '', response_text)
+            response_text = re.sub(r'\n```$', '', response_text)
+        
+        # Parse JSON
+        return json.loads(response_text)
+        
+    except Exception as e:
+        print(f"⚠️ Gemini API failed: {str(e)}, falling back to mock LLM")
+        return None
+
+
+def gemini_extract(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Use Google Gemini API to extract structured infrastructure intent from text.
+    Returns None if Gemini is not available or fails.
+    """
+    if not GEMINI_AVAILABLE or not GEMINI_CONFIGURED:
+        return None
+    
+    # Craft a detailed prompt for infrastructure extraction
+    prompt = f"""You are an expert AWS infrastructure architect. Extract infrastructure requirements from the following text and return ONLY a valid JSON object with this exact structure:
 
 {{
   "vpcs": [
@@ -108,26 +136,369 @@ User request: {text}
 
 JSON output:"""
 
-        # Generate response
-        response = model.generate_content(prompt)
+    intent = gemini_generate_json(prompt)
+    if intent is not None:
+        print(f"✅ Gemini API successfully parsed infrastructure request")
+    return intent
+
+
+# ---------------------------------------------------------------------------
+# Mock LLM: single-pass keyword automaton
+# ---------------------------------------------------------------------------
+
+# One precompiled tokenizer for the whole description. Sizes and CIDRs are
+# matched before plain words so "t3.small" and "10.0.0.0/16" stay whole.
+TOKEN_PATTERN = re.compile(
+    r"(?P<cidr>\d{1,3}(?:\.\d{1,3}){3}/\d{1,2})"
+    r"|(?P<size>(?:db\.)?[a-z]+\d+[a-z]*\.[a-z0-9]+)"
+    r"|(?P<num>\d+)"
+    r"|(?P<word>[a-z][a-z0-9]*)"
+    r"|(?P<stop>[.;:!?\n])"
+)
+
+# Keyword phrases understood by the mock LLM: phrase -> (category, value)
+KEYWORD_PATTERNS = {
+    "vpc": ("vpc", "vpc"),
+    "vpcs": ("vpc", "vpc"),
+    "public": ("tier", "public"),
+    "private": ("tier", "private"),
+    "subnet": ("subnet", "subnet"),
+    "subnets": ("subnet", "subnet"),
+    "ec2": ("compute", "ec2"),
+    "instance": ("compute", "generic"),
+    "instances": ("compute", "generic"),
+    "server": ("compute", "generic"),
+    "servers": ("compute", "generic"),
+    "vm": ("compute", "generic"),
+    "vms": ("compute", "generic"),
+    "web": ("role", "web"),
+    "frontend": ("role", "web"),
+    "app": ("role", "app"),
+    "application": ("role", "app"),
+    "api": ("role", "api"),
+    "backend": ("role", "app"),
+    "worker": ("role", "worker"),
+    "workers": ("role", "worker"),
+    "rds": ("database", "rds"),
+    "database": ("database", "database"),
+    "databases": ("database", "database"),
+    "db": ("database", "database"),
+    "postgres": ("engine", "postgres"),
+    "postgresql": ("engine", "postgres"),
+    "mysql": ("engine", "mysql"),
+    "mariadb": ("engine", "mariadb"),
+    "load balancer": ("lb", "lb"),
+    "load balancers": ("lb", "lb"),
+    "application load balancer": ("lb", "lb"),
+    "application load balancers": ("lb", "lb"),
+    "alb": ("lb", "lb"),
+    "albs": ("lb", "lb"),
+    "elb": ("lb", "lb"),
+    "az": ("az", "az"),
+    "azs": ("az", "az"),
+    "availability zone": ("az", "az"),
+    "availability zones": ("az", "az"),
+    "multi az": ("az", "multi"),
+    "t2": ("family", "t2"),
+    "t3": ("family", "t3"),
+    "one": ("number", "1"),
+    "two": ("number", "2"),
+    "three": ("number", "3"),
+    "four": ("number", "4"),
+    "five": ("number", "5"),
+    "six": ("number", "6"),
+    "seven": ("number", "7"),
+    "eight": ("number", "8"),
+    "nine": ("number", "9"),
+    "ten": ("number", "10"),
+    "twelve": ("number", "12"),
+    "twenty": ("number", "20"),
+    "add": ("action", "add"),
+    "create": ("action", "add"),
+    "deploy": ("action", "add"),
+    "launch": ("action", "add"),
+    "remove": ("action", "remove"),
+    "delete": ("action", "remove"),
+    "drop": ("action", "remove"),
+    "destroy": ("action", "remove"),
+    "move": ("action", "update"),
+    "change": ("action", "update"),
+    "resize": ("action", "update"),
+    "upgrade": ("action", "update"),
+    "downgrade": ("action", "update"),
+    "switch": ("action", "update"),
+    "set": ("action", "update"),
+    "make": ("action", "update"),
+}
+
+# Categories that only qualify a neighbouring resource phrase
+MODIFIER_CATEGORIES = {"family", "role", "engine", "compute", "database", "lb"}
+
+# Resource nouns that refer to several resources at once ("the web servers")
+PLURAL_NOUNS = {"instances", "servers", "vms", "databases", "balancers", "albs"}
+
+# How many tokens a quantity/size/engine/tier modifier stays "pending"
+# before it no longer applies to the next resource mention
+MODIFIER_WINDOW = 4
+
+# Largest quantity taken from the text ("100000 servers" builds this many)
+MAX_QUANTITY = 1000
+
+# AWS subnets are at most /28; VPCs at least /16
+SMALLEST_SUBNET_PREFIX = 28
+LARGEST_VPC_PREFIX = 16
+
+# VPC CIDR when the text gives none, or one that isn't a valid network
+DEFAULT_VPC_CIDR = "10.0.0.0/16"
+
+# Default subnet tier for compute roles when the text does not say
+ROLE_DEFAULT_TIER = {"web": "public", "app": "private", "api": "private", "worker": "private"}
+
+VALID_INSTANCE_TYPES = {t.value for t in InstanceType}
+FAMILY_DEFAULT_SIZE = {"t2": "t2.micro", "t3": "t3.small"}
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over word tokens.
+    
+    Built once at import from KEYWORD_PATTERNS. Feeding it one token at a time
+    reports the longest phrase ending at that token, so the text is scanned
+    exactly once no matter how many keywords we look for.
+    """
+    def __init__(self, patterns: Dict[str, Tuple[str, str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Longest (length, category, value) ending in each state
+        self.output: List[Optional[Tuple[int, str, str]]] = [None]
         
-        # Extract JSON from response
-        response_text = response.text.strip()
+        for phrase, payload in patterns.items():
+            words = phrase.split()
+            state = 0
+            for word in words:
+                next_state = self.goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][word] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                state = next_state
+            self.output[state] = (len(words), payload[0], payload[1])
         
-        # Remove markdown code blocks if present
-        if response_text.startswith('```'):
-            response_text = re.sub(r'^```(?:json)?\n', '', response_text)
-            response_text = re.sub(r'\n```$', '', response_text)
+        # Breadth-first pass to compute failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and word not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(word, 0)
+                if self.output[next_state] is None:
+                    self.output[next_state] = self.output[self.fail[next_state]]
+    
+    def step(self, state: int, word: str) -> Tuple[int, Optional[Tuple[int, str, str]]]:
+        """Advance by one token, returning the new state and any match ending here"""
+        while state and word not in self.goto[state]:
+            state = self.fail[state]
+        state = self.goto[state].get(word, 0)
+        return state, self.output[state]
+
+
+KEYWORD_AUTOMATON = KeywordAutomaton(KEYWORD_PATTERNS)
+
+
+class ResourceMention:
+    """A resource phrase found in the text, plus the modifiers attached to it"""
+    def __init__(self, kind: str, start: int, end: int, sentence: int):
+        self.kind = kind  # "compute", "database" or "lb"
+        self.start = start
+        self.end = end
+        self.sentence = sentence
+        self.count: Optional[int] = None
+        self.size: Optional[str] = None
+        self.engine: Optional[str] = None
+        self.role: Optional[str] = None
+        self.tier: Optional[str] = None
+        self.action: Optional[str] = None  # Verb governing the mention, for edits
+        self.trailing_size: Optional[str] = None  # Size stated after the mention
+        self.plural = False
+
+
+def scan_text(text: str) -> Dict[str, Any]:
+    """
+    Scan a description once and collect resource mentions and global settings.
+    
+    Quantities, sizes, roles, engines and tiers seen shortly before a resource
+    phrase attach to it ("3 t3.small app servers"); a tier or engine seen
+    after a resource in the same sentence attaches to the latest mention
+    ("an EC2 instance in the public subnet").
+    """
+    mentions: List[ResourceMention] = []
+    tiers = set()
+    tier_counts: Dict[str, int] = {}
+    az_count = 0
+    vpc_cidr = None
+    vpc_mentioned = False
+    
+    # Pending modifiers: name -> (value, token index where seen)
+    pending: Dict[str, Tuple[Any, int]] = {}
+    state = 0
+    sentence = 0
+    action = None
+    last: Optional[ResourceMention] = None
+    # Index of the latest token that is not a modifier; phrases with only
+    # modifiers between them describe the same resource ("EC2 t2.micro server")
+    boundary = -1
+    
+    def quantity(value: int) -> int:
+        if value > MAX_QUANTITY:
+            print(f"⚠️ Quantity {value} is above the limit, using {MAX_QUANTITY}")
+            return MAX_QUANTITY
+        return value
+    
+    def take(name: str, index: int):
+        item = pending.pop(name, None)
+        if item is not None and index - item[1] <= MODIFIER_WINDOW:
+            return item[0]
+        return None
+    
+    for index, match in enumerate(TOKEN_PATTERN.finditer(text.lower())):
+        kind = match.lastgroup
+        token = match.group()
         
-        # Parse JSON
-        intent = json.loads(response_text)
+        if kind != "word":
+            state = 0
+            if kind != "size":
+                boundary = index
+            if kind == "num":
+                pending["count"] = (quantity(int(token)), index)
+            elif kind == "size":
+                pending["size"] = (token, index)
+                if last is not None and last.sentence == sentence and last.trailing_size is None:
+                    last.trailing_size = token
+            elif kind == "cidr":
+                if vpc_cidr is None:
+                    vpc_cidr = valid_cidr(token)
+            elif kind == "stop":
+                sentence += 1
+                action = None
+                pending.clear()
+            continue
         
-        print(f"✅ Gemini API successfully parsed infrastructure request")
-        return intent
+        state, found = KEYWORD_AUTOMATON.step(state, token)
+        if found is None:
+            if state == 0:
+                boundary = index
+            continue
+        length, category, value = found
+        start = index - length + 1
+        if category not in MODIFIER_CATEGORIES:
+            boundary = index
         
-    except Exception as e:
-        print(f"⚠️ Gemini API failed: {str(e)}, falling back to mock LLM")
-        return None
+        if category == "number":
+            pending["count"] = (int(value), index)
+        elif category == "family":
+            pending["size"] = (FAMILY_DEFAULT_SIZE[value], index)
+            if last is not None and last.sentence == sentence and last.trailing_size is None:
+                last.trailing_size = FAMILY_DEFAULT_SIZE[value]
+        elif category == "action":
+            action = value
+        elif category == "role":
+            pending["role"] = (value, index)
+        elif category == "vpc":
+            vpc_mentioned = True
+        elif category == "az":
+            count = take("count", index)
+            if count:
+                az_count = max(az_count, count)
+            elif value == "multi":
+                az_count = max(az_count, 2)
+        elif category == "subnet":
+            tier = take("tier", index)
+            count = take("count", index)
+            if tier and count:
+                tier_counts[tier] = max(tier_counts.get(tier, 0), count)
+        elif category == "tier":
+            tiers.add(value)
+            if (last is not None and last.sentence == sentence
+                    and last.kind == "compute" and last.tier is None):
+                last.tier = value
+            else:
+                pending["tier"] = (value, index)
+        elif category == "engine":
+            if (last is not None and last.sentence == sentence
+                    and last.kind == "database" and last.engine is None):
+                last.engine = value
+            else:
+                pending["engine"] = (value, index)
+        elif category in ("compute", "database", "lb"):
+            # Adjacent phrases describe the same resource ("EC2 instance",
+            # "RDS database", "database server")
+            if last is not None and boundary <= last.end and last.sentence == sentence:
+                if last.kind == category or (category == "compute" and value == "generic"):
+                    last.end = index
+                    last.plural = last.plural or token in PLURAL_NOUNS
+                    last.size = last.size or take("size", index)
+                    last.role = last.role or take("role", index)
+                    if last.kind == "database":
+                        last.engine = last.engine or take("engine", index)
+                    continue
+            mention = ResourceMention(category, start, index, sentence)
+            mention.action = action
+            mention.plural = token in PLURAL_NOUNS
+            mention.count = take("count", index)
+            mention.size = take("size", index)
+            mention.role = take("role", index)
+            mention.tier = take("tier", index)
+            if category == "database":
+                mention.engine = take("engine", index)
+            mentions.append(mention)
+            last = mention
+    
+    return {
+        "mentions": mentions,
+        "tiers": tiers,
+        "tier_counts": tier_counts,
+        "az_count": az_count,
+        "vpc_cidr": vpc_cidr,
+        "vpc_mentioned": vpc_mentioned,
+    }
+
+
+def valid_cidr(cidr: str) -> str:
+    """cidr if it is a valid IPv4 network ("10.0.0.0/33" is not), else DEFAULT_VPC_CIDR"""
+    try:
+        ipaddress.ip_network(cidr, strict=False)
+    except ValueError:
+        print(f"⚠️ Invalid CIDR {cidr}, using {DEFAULT_VPC_CIDR}")
+        return DEFAULT_VPC_CIDR
+    return cidr
+
+
+def allocate_subnet_cidrs(vpc_cidr: str, count: int) -> Tuple[str, List[str]]:
+    """
+    Carve `count` consecutive blocks out of the VPC, skipping the first:
+    /24s where they fit, otherwise the largest equal size that does. A VPC
+    too small for `count` /28s is widened to the smallest supernet that
+    holds them (with a warning), so every subnet gets a block.
+    
+    An invalid VPC CIDR is replaced by DEFAULT_VPC_CIDR (with a warning).
+    Returns the VPC CIDR and the subnet CIDRs.
+    """
+    network = ipaddress.ip_network(valid_cidr(vpc_cidr), strict=False)
+    # Enough prefix bits for count blocks plus the skipped first one
+    bits = count.bit_length()
+    new_prefix = max(24, network.prefixlen + bits)
+    if new_prefix > SMALLEST_SUBNET_PREFIX:
+        new_prefix = SMALLEST_SUBNET_PREFIX
+        widened = network.supernet(new_prefix=max(new_prefix - bits, LARGEST_VPC_PREFIX))
+        print(f"⚠️ VPC {network} can't hold {count} subnets, using {widened}")
+        network = widened
+    blocks = islice(network.subnets(new_prefix=new_prefix), 1, count + 1)
+    return str(network), [str(block) for block in blocks]
 
 
 def mock_llm_extract(text: str) -> Dict[str, Any]:
@@ -135,10 +506,13 @@ def mock_llm_extract(text: str) -> Dict[str, Any]:
     Mock LLM that extracts structured intent from text.
     In production, this would call OpenAI/Anthropic/etc. to get JSON.
     
-    For now, we use simple keyword matching to demonstrate the concept.
+    The text is tokenized and run through KEYWORD_AUTOMATON in a single pass,
+    picking up quantities, instance sizes, engines and AZ counts
+    ("3 t3.small app servers in 2 AZs"), so large models can be built offline.
     The LLM's job is ONLY to extract intent, not generate Terraform/diagrams.
     """
-    text_lower = text.lower()
+    scan = scan_text(text)
+    mentions = scan["mentions"]
     
     # Default structure
     intent = {
@@ -148,93 +522,107 @@ def mock_llm_extract(text: str) -> Dict[str, Any]:
         "load_balancers": []
     }
     
-    # Extract VPC information
-    vpc_match = re.search(r'vpc.*?(\d+\.\d+\.\d+\.\d+/\d+)', text_lower)
-    if vpc_match or 'vpc' in text_lower:
-        vpc_cidr = vpc_match.group(1) if vpc_match else "10.0.0.0/16"
-        vpc = {
-            "id": "vpc-main",
-            "name": "main-vpc",
-            "cidr": vpc_cidr,
-            "subnets": []
-        }
-        
-        # Extract subnet information
-        if 'public subnet' in text_lower or 'public' in text_lower:
+    if not (mentions or scan["vpc_mentioned"] or scan["vpc_cidr"]):
+        return intent
+    
+    # Work out which subnet tiers are needed and how many subnets each gets
+    az_count = max(scan["az_count"], 1)
+    needed = set(scan["tiers"])
+    for mention in mentions:
+        if mention.kind == "database":
+            needed.add("private")
+        elif mention.kind == "lb":
+            needed.add("public")
+        else:
+            mention.tier = mention.tier or ROLE_DEFAULT_TIER.get(mention.role, "public")
+            needed.add(mention.tier)
+    
+    tier_sizes = {}
+    if "public" in needed:
+        tier_sizes["public"] = max(scan["tier_counts"].get("public", 0), az_count)
+    if "private" in needed:
+        # RDS requires at least two subnets in different AZs
+        tier_sizes["private"] = max(scan["tier_counts"].get("private", 0), az_count, 2)
+    
+    vpc_cidr, subnet_cidrs = allocate_subnet_cidrs(scan["vpc_cidr"] or DEFAULT_VPC_CIDR,
+                                                   sum(tier_sizes.values()))
+    vpc = {
+        "id": "vpc-main",
+        "name": "main-vpc",
+        "cidr": vpc_cidr,
+        "subnets": []
+    }
+    
+    cidrs = iter(subnet_cidrs)
+    subnet_ids: Dict[str, List[str]] = {}
+    for tier in ("public", "private"):
+        subnet_ids[tier] = []
+        for n in range(1, tier_sizes.get(tier, 0) + 1):
+            subnet_id = f"subnet-{tier}-{n}"
             vpc["subnets"].append({
-                "id": "subnet-public-1",
-                "name": "public-subnet-1",
-                "cidr": "10.0.1.0/24",
-                "type": "public",
-                "az": "us-east-1a"
+                "id": subnet_id,
+                "name": f"{tier}-subnet-{n}",
+                "cidr": next(cidrs),
+                "type": tier,
+                "az": f"us-east-1{'abcdef'[(n - 1) % 6]}"
             })
-        
-        if 'private subnet' in text_lower or 'private' in text_lower:
-            vpc["subnets"].append({
-                "id": "subnet-private-1",
-                "name": "private-subnet-1",
-                "cidr": "10.0.2.0/24",
-                "type": "private",
-                "az": "us-east-1a"
+            subnet_ids[tier].append(subnet_id)
+    intent["vpcs"].append(vpc)
+    
+    # EC2 instances, spread round-robin across the subnets of their tier
+    role_counters: Dict[str, int] = {}
+    web_ids, all_ids = [], []
+    for mention in mentions:
+        if mention.kind != "compute":
+            continue
+        role = mention.role or "web"
+        instance_type = mention.size if mention.size in VALID_INSTANCE_TYPES else "t2.micro"
+        tier_subnets = subnet_ids[mention.tier]
+        for _ in range(mention.count or 1):
+            n = role_counters[role] = role_counters.get(role, 0) + 1
+            instance_id = f"ec2-{role}-{n}"
+            intent["ec2_instances"].append({
+                "id": instance_id,
+                "name": f"{role}-server-{n}",
+                "instance_type": instance_type,
+                "subnet_id": tier_subnets[(n - 1) % len(tier_subnets)]
             })
-            # Add second private subnet for RDS (requires multi-AZ)
-            vpc["subnets"].append({
-                "id": "subnet-private-2",
-                "name": "private-subnet-2",
-                "cidr": "10.0.3.0/24",
-                "type": "private",
-                "az": "us-east-1b"
+            all_ids.append(instance_id)
+            if role == "web":
+                web_ids.append(instance_id)
+    
+    # RDS databases in the private tier
+    n = 0
+    for mention in mentions:
+        if mention.kind != "database":
+            continue
+        instance_class = "db.t3.micro"
+        if mention.size:
+            instance_class = mention.size if mention.size.startswith("db.") else f"db.{mention.size}"
+        for _ in range(mention.count or 1):
+            n += 1
+            intent["rds_databases"].append({
+                "id": "rds-main" if n == 1 else f"rds-{n}",
+                "name": "main-database" if n == 1 else f"database-{n}",
+                "engine": mention.engine or "postgres",
+                "instance_class": instance_class,
+                "subnet_ids": subnet_ids["private"][:2],
+                "allocated_storage": 20
+            })
+    
+    # Load balancers in the public tier, fronting the web servers
+    n = 0
+    for mention in mentions:
+        if mention.kind != "lb":
+            continue
+        for _ in range(mention.count or 1):
+            n += 1
+            intent["load_balancers"].append({
+                "id": "lb-main" if n == 1 else f"lb-{n}",
+                "name": "main-load-balancer" if n == 1 else f"load-balancer-{n}",
+                "subnet_ids": list(subnet_ids["public"]),
+                "target_instance_ids": list(web_ids or all_ids)
             })
-        
-        intent["vpcs"].append(vpc)
-    
-    # Extract EC2 information
-    if 'ec2' in text_lower or 'instance' in text_lower or 'server' in text_lower:
-        instance_type = "t2.micro"
-        if 't2.small' in text_lower:
-            instance_type = "t2.small"
-        elif 't2.medium' in text_lower:
-            instance_type = "t2.medium"
-        elif 't3' in text_lower:
-            instance_type = "t3.small"
-        
-        # Determine which subnet (public by default, private if specified)
-        subnet_id = "subnet-public-1"
-        if 'private' in text_lower and 'ec2' in text_lower:
-            subnet_id = "subnet-private-1"
-        
-        intent["ec2_instances"].append({
-            "id": "ec2-web-1",
-            "name": "web-server-1",
-            "instance_type": instance_type,
-            "subnet_id": subnet_id
-        })
-    
-    # Extract RDS information
-    if 'rds' in text_lower or 'database' in text_lower or 'postgres' in text_lower or 'mysql' in text_lower:
-        engine = "postgres"
-        if 'mysql' in text_lower:
-            engine = "mysql"
-        elif 'mariadb' in text_lower:
-            engine = "mariadb"
-        
-        intent["rds_databases"].append({
-            "id": "rds-main",
-            "name": "main-database",
-            "engine": engine,
-            "instance_class": "db.t3.micro",
-            "subnet_ids": ["subnet-private-1", "subnet-private-2"],
-            "allocated_storage": 20
-        })
-    
-    # Extract Load Balancer information
-    if 'load balancer' in text_lower or 'alb' in text_lower or 'elb' in text_lower:
-        intent["load_balancers"].append({
-            "id": "lb-main",
-            "name": "main-load-balancer",
-            "subnet_ids": ["subnet-public-1"],
-            "target_instance_ids": ["ec2-web-1"]
-        })
     
     return intent
 
@@ -246,72 +634,224 @@ def parse_text_to_model(text: str) -> InfrastructureModel:
     This is the entry point for converting natural language to our infrastructure model.
     Steps:
     1. Try Google Gemini API first (if configured)
-    2. Fallback to mock LLM if Gemini unavailable or fails
-    3. Build InfrastructureModel from the JSON
+    2. Validate the Gemini intent; fall back to mock LLM if it is unusable
+    3. Build InfrastructureModel from the validated JSON
     4. Return the model (which becomes the source of truth)
     """
     # Step 1: Try Gemini API first
     intent = gemini_extract(text)
     
-    # Step 2: Fallback to mock LLM if Gemini failed
-    if intent is None:
-        print("ℹ️ Using mock LLM parser")
-        intent = mock_llm_extract(text)
-    
-    # Step 2: Build the infrastructure model
-    model = InfrastructureModel()
-    
-    # Add VPCs and their subnets
-    for vpc_data in intent.get("vpcs", []):
-        vpc = VPC(
-            id=vpc_data["id"],
-            name=vpc_data["name"],
-            cidr=vpc_data["cidr"]
-        )
+    # Step 2: Validate and build the model, rejecting bad LLM output as a whole
+    if intent is not None:
+        try:
+            return build_model_from_intent(intent)
+        except IntentError as e:
+            print(f"⚠️ Gemini intent rejected: {str(e)}, falling back to mock LLM")
+    
+    # Step 3: Fallback to mock LLM if Gemini failed
+    print("ℹ️ Using mock LLM parser")
+    return build_model_from_intent(mock_llm_extract(text))
+
+
+def summarize_model_for_prompt(model: InfrastructureModel) -> str:
+    """One compact line per resource, so edit prompts stay small"""
+    lines = []
+    for vpc in model.vpcs:
+        lines.append(f"vpc {vpc.id} {vpc.cidr}")
+        for s in vpc.subnets:
+            lines.append(f"subnet {s.id} {s.subnet_type.value} {s.availability_zone}")
+    for ec2 in model.ec2_instances:
+        lines.append(f"ec2 {ec2.id} {ec2.instance_type.value} {ec2.subnet_id}")
+    for rds in model.rds_databases:
+        lines.append(f"rds {rds.id} {rds.engine.value} {rds.instance_class} {','.join(rds.subnet_ids)}")
+    for lb in model.load_balancers:
+        lines.append(f"lb {lb.id} targets={','.join(lb.target_instance_ids)}")
+    return "\n".join(lines)
+
+
+def gemini_extract_edits(instruction: str, model: InfrastructureModel) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ask Gemini for edit operations only, never a full intent.
+    The prompt carries a one-line-per-resource summary instead of the
+    original description, and the reply is a short JSON list.
+    Returns None if Gemini is not available or fails.
+    """
+    if not GEMINI_AVAILABLE or not GEMINI_CONFIGURED:
+        return None
+    
+    prompt = f"""Current AWS infrastructure (one resource per line):
+{summarize_model_for_prompt(model)}
+
+Return ONLY a JSON list of edit operations that apply this change: {instruction}
+
+Operation forms:
+{{"operation": "add_resource", "resource_type": "ec2|rds|load_balancer|subnet", "properties": {{...}}}}
+{{"operation": "remove_resource", "resource_id": "..."}}
+{{"operation": "move_resource", "resource_id": "...", "target_subnet_id": "..."}}
+{{"operation": "update_resource_property", "resource_id": "...", "property": "instance_type|instance_class|allocated_storage|target_instance_ids", "value": ...}}
+
+ec2 properties: id, name, instance_type, subnet_id. rds properties: id, name, engine, instance_class, subnet_ids.
+load_balancer properties: id, name, subnet_ids, target_instance_ids. Keep existing ids; use new unique ids for added resources.
+
+JSON output:"""
+    
+    operations = gemini_generate_json(prompt)
+    if operations is not None:
+        print(f"✅ Gemini API successfully parsed edit instruction")
+    return operations
+
+
+def next_free_id(prefix: str, taken: set) -> Tuple[str, int]:
+    """Return the first `prefix-N` id not in `taken`, and N"""
+    n = 1
+    while f"{prefix}-{n}" in taken:
+        n += 1
+    return f"{prefix}-{n}", n
+
+
+def mock_llm_extract_edits(instruction: str, model: InfrastructureModel) -> List[Dict[str, Any]]:
+    """
+    Mock LLM for edit instructions.
+    
+    Reuses the keyword automaton: each resource mention is governed by the
+    verb before it in the same sentence (add/remove/update), so
+    "move the database to a t3 class and add a second web server" becomes an
+    update_resource_property on the database plus an add_resource for EC2.
+    """
+    scan = scan_text(instruction)
+    operations: List[Dict[str, Any]] = []
+    
+    subnets = [s for vpc in model.vpcs for s in vpc.subnets]
+    tier_subnets = {
+        tier: [s.id for s in subnets if s.subnet_type.value == tier] or [s.id for s in subnets]
+        for tier in ("public", "private")
+    }
+    taken = {
+        r.id for r in subnets + model.ec2_instances + model.rds_databases + model.load_balancers
+    }
+    instance_ids = [ec2.id for ec2 in model.ec2_instances]
+    
+    def matching(mention: ResourceMention) -> List[Any]:
+        if mention.kind == "compute":
+            resources = model.ec2_instances
+            if mention.role:
+                by_role = [e for e in resources if e.id.startswith(f"ec2-{mention.role}-")]
+                resources = by_role or resources
+            return resources
+        if mention.kind == "database":
+            return model.rds_databases
+        return model.load_balancers
+    
+    for mention in scan["mentions"]:
+        action = mention.action or "add"
+        size = mention.trailing_size or mention.size
+        
+        if action == "add":
+            for _ in range(mention.count or 1):
+                if mention.kind == "compute":
+                    role = mention.role or "web"
+                    tier = mention.tier or ROLE_DEFAULT_TIER.get(role, "public")
+                    if not tier_subnets[tier]:
+                        continue
+                    instance_id, n = next_free_id(f"ec2-{role}", taken)
+                    operations.append({
+                        "operation": "add_resource",
+                        "resource_type": "ec2",
+                        "properties": {
+                            "id": instance_id,
+                            "name": f"{role}-server-{n}",
+                            "instance_type": size if size in VALID_INSTANCE_TYPES else "t2.micro",
+                            "subnet_id": tier_subnets[tier][(n - 1) % len(tier_subnets[tier])]
+                        }
+                    })
+                    instance_ids.append(instance_id)
+                elif mention.kind == "database":
+                    if not tier_subnets["private"]:
+                        continue
+                    db_id, n = next_free_id("rds", taken)
+                    instance_class = "db.t3.micro"
+                    if size:
+                        instance_class = size if size.startswith("db.") else f"db.{size}"
+                    operations.append({
+                        "operation": "add_resource",
+                        "resource_type": "rds",
+                        "properties": {
+                            "id": db_id,
+                            "name": f"database-{n}",
+                            "engine": mention.engine or "postgres",
+                            "instance_class": instance_class,
+                            "subnet_ids": tier_subnets["private"][:2]
+                        }
+                    })
+                else:
+                    if not tier_subnets["public"]:
+                        continue
+                    lb_id, n = next_free_id("lb", taken)
+                    web_ids = [i for i in instance_ids if i.startswith("ec2-web-")]
+                    operations.append({
+                        "operation": "add_resource",
+                        "resource_type": "load_balancer",
+                        "properties": {
+                            "id": lb_id,
+                            "name": f"load-balancer-{n}",
+                            "subnet_ids": list(tier_subnets["public"]),
+                            "target_instance_ids": web_ids or list(instance_ids)
+                        }
+                    })
+                taken.add(operations[-1]["properties"]["id"])
+            continue
         
-        # Add subnets to VPC
-        for subnet_data in vpc_data.get("subnets", []):
-            subnet = Subnet(
-                id=subnet_data["id"],
-                name=subnet_data["name"],
-                cidr=subnet_data["cidr"],
-                subnet_type=SubnetType(subnet_data["type"]),
-                availability_zone=subnet_data.get("az", "us-east-1a")
-            )
-            vpc.add_subnet(subnet)
+        resources = matching(mention)
+        how_many = mention.count or (len(resources) if mention.plural else 1)
         
-        model.add_vpc(vpc)
-    
-    # Add EC2 instances
-    for ec2_data in intent.get("ec2_instances", []):
-        ec2 = EC2Instance(
-            id=ec2_data["id"],
-            name=ec2_data["name"],
-            instance_type=ec2_data["instance_type"],  # Pass string, __post_init__ will convert to enum
-            subnet_id=ec2_data["subnet_id"]
-        )
-        model.add_ec2(ec2)
-    
-    # Add RDS databases
-    for rds_data in intent.get("rds_databases", []):
-        rds = RDSDatabase(
-            id=rds_data["id"],
-            name=rds_data["name"],
-            engine=rds_data["engine"],  # Pass string, __post_init__ will convert to enum
-            instance_class=rds_data["instance_class"],
-            subnet_ids=rds_data["subnet_ids"],
-            allocated_storage=rds_data.get("allocated_storage", 20)
-        )
-        model.add_rds(rds)
-    
-    # Add Load Balancers
-    for lb_data in intent.get("load_balancers", []):
-        lb = LoadBalancer(
-            id=lb_data["id"],
-            name=lb_data["name"],
-            subnet_ids=lb_data["subnet_ids"],
-            target_instance_ids=lb_data.get("target_instance_ids", [])
-        )
-        model.add_load_balancer(lb)
-    
-    return model
+        if action == "remove":
+            for resource in resources[len(resources) - how_many:]:
+                operations.append({"operation": "remove_resource", "resource_id": resource.id})
+            continue
+        
+        # action == "update"
+        for resource in resources[:how_many]:
+            if mention.kind == "compute":
+                if size in VALID_INSTANCE_TYPES:
+                    operations.append({
+                        "operation": "update_resource_property",
+                        "resource_id": resource.id,
+                        "property": "instance_type",
+                        "value": size
+                    })
+                if mention.tier and tier_subnets[mention.tier]:
+                    current = model.get_subnet_by_id(resource.subnet_id)
+                    if current is None or current.subnet_type.value != mention.tier:
+                        operations.append({
+                            "operation": "move_resource",
+                            "resource_id": resource.id,
+                            "target_subnet_id": tier_subnets[mention.tier][0]
+                        })
+            elif mention.kind == "database" and size:
+                operations.append({
+                    "operation": "update_resource_property",
+                    "resource_id": resource.id,
+                    "property": "instance_class",
+                    "value": size if size.startswith("db.") else f"db.{size}"
+                })
+    
+    return operations
+
+
+def parse_text_to_edits(instruction: str, model: InfrastructureModel) -> List[Dict[str, Any]]:
+    """
+    Text instruction → edit operations against an existing model
+    
+    Tries Gemini first and validates its operations; falls back to the
+    mock LLM if Gemini is unavailable or returns something unusable.
+    """
+    operations = gemini_extract_edits(instruction, model)
+    
+    if operations is not None:
+        try:
+            return validate_edit_operations(operations)
+        except IntentError as e:
+            print(f"⚠️ Gemini edit operations rejected: {str(e)}, falling back to mock LLM")
+    
+    print("ℹ️ Using mock LLM edit parser")
+    return mock_llm_extract_edits(instruction, model)
@@ -2,9 +2,26 @@
 Model-to-Terraform Generator
 Converts InfrastructureModel to Terraform IaC code.
 This reads from the model, never directly from text or diagrams.
+
+Output is either one main.tf ("single" layout) or a multi-file module
+tree ("modules" layout, see generate_terraform_files), in HCL, or the same
+resources in Terraform's JSON syntax (generate_terraform_json).
 """
 
-from .model import InfrastructureModel, SubnetType
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from string import Formatter
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .model import InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer, SubnetType
+from .hcl import HCLBlock, HCLSyntaxError
+from .terraform_diff import SpanIndex, changed_hunks, span_index, touched_regions
+from .terraform_parser import infra_id_from_comments
 
 
 def generate_terraform_code(model: InfrastructureModel) -> str:
@@ -20,221 +37,787 @@ def generate_terraform_code(model: InfrastructureModel) -> str:
         # infra_id: resource-id  <- Maps back to model resource
         # editable: property     <- Marks safe-to-edit fields
     """
-    lines = [
-        "# Terraform Infrastructure as Code",
-        "# Generated from Infrastructure Model",
-        f"# Model ID: {model.model_id}",
-        f"# Last Edit Source: {model.last_edit_source.value}",
-        "#",
-        "# METADATA NOTES:",
-        "#   infra_id: <id>  - Maps resource to model (DO NOT MODIFY)",
-        "#   editable: <prop> - Safe to edit this property",
-        "",
-        "terraform {",
-        "  required_providers {",
-        "    aws = {",
-        "      source  = \"hashicorp/aws\"",
-        "      version = \"~> 5.0\"",
-        "    }",
-        "  }",
-        "}",
-        "",
-        "provider \"aws\" {",
-        "  region = \"us-east-1\"",
-        "}",
-        ""
-    ]
-    
-    # Generate VPCs
+    return "\n\n".join(iter_terraform_sections(model)) + "\n"
+
+
+def iter_terraform_code(model: InfrastructureModel) -> Iterator[str]:
+    """
+    Stream the Terraform code one section at a time.
+    
+    Joining the chunks gives exactly generate_terraform_code's output, but
+    only one resource's text is held at a time.
+    """
+    separator = ""
+    for section in iter_terraform_sections(model):
+        yield separator + section
+        separator = "\n\n"
+    yield "\n"
+
+
+def terraform_patch(base_code: bytes, base_model: InfrastructureModel,
+                    model: InfrastructureModel) -> Tuple[bytes, List[Dict]]:
+    """
+    Block-level patch from base_code, the Terraform a client holds for
+    base_model, to the Terraform of model. Returns model's code and the
+    edits, in document order:
+        {"block_ids": [...], "start": ..., "end": ..., "start_line": ...,
+         "end_line": ..., "text": ...}
+    start/end are byte offsets and start_line/end_line 0-based lines in
+    base_code; applied last to first, the edits turn it into the new code.
+    
+    Edits cover whole sections (a resource with its helper resources), so
+    block_ids are the model ids of the resources they replace or insert.
+    Changed lines are found with changed_hunks, so the work follows the
+    size of the edit. When base_code isn't what the generator renders for
+    base_model (the client's own document after a Terraform edit), its
+    blocks come from the span index instead, named by their infra_id
+    comments (or Terraform address).
+    """
+    code, index, ids = keyed_span_index(list(iter_keyed_sections(model)))
+    base_generated, base_index, base_ids = keyed_span_index(list(iter_keyed_sections(base_model)))
+    
+    if base_generated != base_code:
+        try:
+            base_index = span_index(base_code)
+        except HCLSyntaxError:
+            return code, [{"block_ids": [], "start": 0, "end": len(base_code), "start_line": 0,
+                           "end_line": base_code.count(b"\n"), "text": code.decode()}]
+        base_ids = [[block_id(block) for block in segment] for segment in base_index.segments]
+    
+    edits = []
+    for first, last, new_start, new_end in touched_regions(base_index, changed_hunks(base_code, code)):
+        start, end = base_index.segment_start(first), base_index.segment_end(last)
+        block_ids = [i for segment in base_ids[first:last + 1] for i in segment]
+        if new_end > new_start:
+            new_last = index.segment_at(new_end - 1)
+            block_ids += [i for segment in ids[index.segment_at(new_start):new_last + 1] for i in segment]
+        edits.append({
+            "block_ids": list(dict.fromkeys(block_ids)),
+            "start": start,
+            "end": end,
+            "start_line": base_index.segment_lines[first],
+            "end_line": base_index.segment_lines[first] + base_code.count(b"\n", start, end),
+            "text": code[new_start:new_end].decode(),
+        })
+    return code, edits
+
+
+def keyed_span_index(sections: List[Tuple[str, str]]) -> Tuple[bytes, SpanIndex, List[List[str]]]:
+    """
+    Join keyed sections like generate_terraform_code, and index them as
+    one segment per section (separator included) without parsing. Also
+    returns each segment's block ids.
+    """
+    pieces, ends, lines = [], [], [0]
+    offset = 0
+    for n, (_, section) in enumerate(sections):
+        piece = section + ("\n\n" if n < len(sections) - 1 else "\n")
+        pieces.append(piece)
+        offset += len(piece) if piece.isascii() else len(piece.encode())
+        ends.append(offset)
+        lines.append(lines[-1] + piece.count("\n"))
+    index = SpanIndex(ends, lines, offset, [], [], [])
+    return "".join(pieces).encode(), index, [[block_id] for block_id, _ in sections]
+
+
+def block_id(block: HCLBlock) -> str:
+    """A parsed resource's infra_id, or the block's Terraform address"""
+    address = ".".join((block.block_type,) + block.labels)
+    if block.block_type != "resource":
+        # The header's metadata notes sit above the terraform block
+        return address
+    return infra_id_from_comments(block.comments) or address
+
+
+# Rendered resource sections by resource id: (content key, text). Bounded,
+# oldest-rendered first out.
+SECTION_CACHE_SIZE = 65536
+SECTION_CACHE: "OrderedDict[str, Tuple[tuple, str]]" = OrderedDict()
+SECTION_CACHE_LOCK = Lock()
+
+# Content keys: every field a section renders, including what it references
+# from neighbouring resources (VPC id, subnet ids, target ids)
+EC2_KEY = attrgetter("name", "ami", "instance_type", "subnet_id")
+RDS_KEY = attrgetter("name", "engine", "instance_class", "allocated_storage")
+SUBNET_KEY = attrgetter("name", "cidr", "availability_zone", "subnet_type")
+
+
+def cached_section(slot: str, key: tuple, render: Callable[..., str], *args) -> str:
+    """
+    Return the cached text for slot if it was rendered from an equal key,
+    otherwise render(*args) and cache it.
+    
+    Slots are resource ids, so a hit costs one string-keyed lookup and a
+    tuple comparison. Edited models share their unchanged strings and enum
+    members with the original, so the comparison short-circuits on identity
+    and an edit only re-renders the sections whose content changed.
+    """
+    entry = SECTION_CACHE.get(slot)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    
+    text = render(*args)
+    with SECTION_CACHE_LOCK:
+        SECTION_CACHE[slot] = (key, text)
+        if len(SECTION_CACHE) > SECTION_CACHE_SIZE:
+            SECTION_CACHE.popitem(last=False)
+    return text
+
+
+def iter_terraform_sections(model: InfrastructureModel) -> Iterator[str]:
+    """
+    Header, then one section per resource (with its helper resources), in
+    file order. Unchanged sections come from the section cache, so after an
+    edit only the invalidated resources are rendered again.
+    """
+    return map(itemgetter(1), iter_keyed_sections(model))
+
+
+# Block ids of the sections that don't belong to a model resource
+HEADER_BLOCK_ID = "header"
+SECURITY_GROUP_BLOCK_ID = "ec2-security-group"
+
+
+def iter_keyed_sections(model: InfrastructureModel) -> Iterator[Tuple[str, str]]:
+    """(block id, section) pairs of iter_terraform_sections: the resource id, or a fixed id"""
+    yield HEADER_BLOCK_ID, terraform_header(model)
+    first_vpc = model.vpcs[0] if model.vpcs else None
+    first_vpc_id = first_vpc.id if first_vpc else None
+    
+    for vpc in model.vpcs:
+        yield from iter_vpc_sections(vpc)
+    
+    if model.ec2_instances or model.rds_databases:
+        yield SECURITY_GROUP_BLOCK_ID, security_group_section(first_vpc)
+    
+    for ec2 in model.ec2_instances:
+        yield ec2.id, cached_section(ec2.id, EC2_KEY(ec2), ec2_section, ec2)
+    
+    for rds in model.rds_databases:
+        yield rds.id, cached_section(rds.id, (RDS_KEY(rds), tuple(rds.subnet_ids)), rds_section, rds)
+    
+    for lb in model.load_balancers:
+        yield lb.id, cached_section(
+            lb.id, (lb.name, tuple(lb.subnet_ids), tuple(lb.target_instance_ids), first_vpc_id),
+            load_balancer_section, lb, first_vpc
+        )
+
+
+def iter_vpc_sections(vpc: VPC) -> Iterator[Tuple[str, str]]:
+    """A VPC's section and its subnets' sections (cached), with their ids"""
+    has_public = any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets)
+    yield vpc.id, cached_section(vpc.id, (vpc.name, vpc.cidr, has_public), vpc_section, vpc)
+    for subnet in vpc.subnets:
+        yield subnet.id, cached_section(subnet.id, (vpc.id, SUBNET_KEY(subnet)), subnet_section, vpc, subnet)
+
+
+# Output layouts for generate_terraform_files
+TERRAFORM_LAYOUTS = ("single", "modules")
+
+
+def generate_terraform_files(model: InfrastructureModel, layout: str = "modules") -> Dict[str, str]:
+    """
+    Generate Terraform code as a set of files: path → content, in a stable
+    order.
+    
+    - single: everything in main.tf (generate_terraform_code's output)
+    - modules: providers.tf, network.tf (one module call per VPC),
+      compute.tf (security group, EC2 instances, load balancers), data.tf
+      (RDS databases), and modules/<vpc>/main.tf + outputs.tf for every VPC.
+      Root resources reach subnets and VPCs through the module outputs.
+      Files with nothing to declare are left out.
+    
+    The VPC modules reuse the cached sections of the single-file output, so
+    their text is identical to the VPC part of main.tf.
+    """
+    if layout == "single":
+        return {"main.tf": generate_terraform_code(model)}
+    if layout != "modules":
+        raise ValueError(f"Unknown Terraform layout: {layout}")
+    
+    modules = module_names(model)
+    ref_subnet, ref_vpc = module_references(model, modules)
+    first_vpc = model.vpcs[0] if model.vpcs else None
+    
+    network = [MODULE_CALL_TEMPLATE(vpc.id, modules[vpc.id]) for vpc in model.vpcs]
+    compute = []
+    if model.ec2_instances or model.rds_databases:
+        compute.append(security_group_section(first_vpc, ref_vpc))
+    compute.extend(ec2_section(ec2, ref_subnet) for ec2 in model.ec2_instances)
+    compute.extend(load_balancer_section(lb, first_vpc, ref_subnet, ref_vpc) for lb in model.load_balancers)
+    data = [rds_section(rds, ref_subnet) for rds in model.rds_databases]
+    
+    # No model id header here, so the file's ETag survives edits
+    files = {"providers.tf": PROVIDERS_BLOCK + "\n"}
+    for path, sections in (("network.tf", network), ("compute.tf", compute), ("data.tf", data)):
+        if sections:
+            files[path] = "\n\n".join(sections) + "\n"
+    for vpc in model.vpcs:
+        module = modules[vpc.id]
+        files[f"modules/{module}/main.tf"] = "\n\n".join(section for _, section in iter_vpc_sections(vpc)) + "\n"
+        files[f"modules/{module}/outputs.tf"] = vpc_outputs(vpc)
+    return files
+
+
+def file_etag(content: bytes) -> str:
+    """Strong ETag for one generated file (content hash)"""
+    return f'"{hashlib.sha1(content).hexdigest()[:16]}"'
+
+
+def terraform_manifest(files: Dict[str, bytes]) -> List[Dict]:
+    """Path, ETag and size of every generated file, in file order"""
+    return [{"path": path, "etag": file_etag(content), "size": len(content)}
+            for path, content in files.items()]
+
+
+def compile_emitter(template: str, *fields: str) -> Callable[..., str]:
+    """
+    Compile a Terraform text template, once at import, into a function
+    taking the values of `fields` positionally, in that order, as strings.
+    
+    Templates use str.format syntax with plain field names ({tf}, {{ for a
+    literal brace). The template is split up front into its constant
+    segments and, for each slot between them, the index of the value that
+    fills it. Rendering drops the values into a copy of the segment list and
+    joins it: no parsing, and no keyword dict per call.
+    """
+    segments, slots = [], []
+    pending = ""
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        pending += literal
+        if field_name is None:
+            continue
+        if field_name not in fields or format_spec or conversion:
+            raise ValueError(f"Unsupported template field: {field_name!r}")
+        segments.append(pending)
+        slots.append(fields.index(field_name))
+        pending = ""
+    segments.append(pending)
+    
+    unused = set(fields) - {fields[i] for i in slots}
+    if unused:
+        raise ValueError(f"Template fields not used: {sorted(unused)}")
+    if not slots:
+        constant = pending
+        return lambda: constant
+    
+    parts = [None] * (2 * len(slots) + 1)
+    parts[0::2] = segments
+    
+    if slots == list(range(len(fields))):
+        # Each value fills one slot, in order
+        def emit(*values: str) -> str:
+            text = parts.copy()
+            text[1::2] = values
+            return "".join(text)
+        return emit
+    
+    # Repeated or reordered fields; itemgetter of one index isn't a tuple
+    pick = itemgetter(*slots) if len(slots) > 1 else lambda values: (values[slots[0]],)
+    
+    def emit_picked(*values: str) -> str:
+        text = parts.copy()
+        text[1::2] = pick(values)
+        return "".join(text)
+    return emit_picked
+
+
+@lru_cache(maxsize=65536)
+def tf_name(resource_id: str) -> str:
+    """Terraform resource name for a model id (memoized)"""
+    return resource_id.replace("-", "_")
+
+
+@lru_cache(maxsize=65536)
+def subnet_ref(subnet_id: str) -> str:
+    """Reference to a subnet's id in the single-file layout (memoized)"""
+    return f"aws_subnet.{tf_name(subnet_id)}.id"
+
+
+def vpc_ref(vpc_id: str) -> str:
+    return f"aws_vpc.{tf_name(vpc_id)}.id"
+
+
+def subnet_refs(subnet_ids: List[str], ref: Callable[[str], str] = subnet_ref) -> str:
+    return ", ".join(map(ref, subnet_ids))
+
+
+def module_names(model: InfrastructureModel) -> Dict[str, str]:
+    """
+    Module name, and modules/ directory, of every VPC: its id reduced to a
+    Terraform identifier ([A-Za-z0-9_], not starting with a digit). Ids are
+    user input, so they never reach a path as-is; ids that reduce to the
+    same name (compared case-insensitively, for filesystems that do) get a
+    _2, _3, ... suffix.
+    """
+    names = {}
+    used = set()
+    for vpc in model.vpcs:
+        base = re.sub(r"[^A-Za-z0-9_]", "_", vpc.id)
+        if not base[:1].isalpha() and not base.startswith("_"):
+            base = "vpc_" + base
+        name = base
+        suffix = 1
+        while name.lower() in used:
+            suffix += 1
+            name = f"{base}_{suffix}"
+        used.add(name.lower())
+        names[vpc.id] = name
+    return names
+
+
+def module_references(model: InfrastructureModel,
+                      modules: Dict[str, str]) -> Tuple[Callable[[str], str], Callable[[str], str]]:
+    """
+    Subnet and VPC reference functions for the root of the modules layout,
+    where both live inside their VPC's module (named by module_names).
+    Subnets that belong to no VPC keep the plain aws_subnet reference.
+    """
+    module_of = {subnet.id: modules[vpc.id] for vpc in model.vpcs for subnet in vpc.subnets}
+    
+    def module_subnet_ref(subnet_id: str) -> str:
+        module = module_of.get(subnet_id)
+        if module is None:
+            return subnet_ref(subnet_id)
+        return f'module.{module}.subnet_ids["{tf_name(subnet_id)}"]'
+    
+    def module_vpc_ref(vpc_id: str) -> str:
+        return f"module.{modules[vpc_id]}.vpc_id"
+    
+    return module_subnet_ref, module_vpc_ref
+
+
+HEADER_TEMPLATE = compile_emitter('''# Terraform Infrastructure as Code
+# Generated from Infrastructure Model
+# Model ID: {model_id}
+# Last Edit Source: {edit_source}
+#
+# METADATA NOTES:
+#   infra_id: <id>  - Maps resource to model (DO NOT MODIFY)
+#   editable: <prop> - Safe to edit this property
+
+{providers}''', "model_id", "edit_source", "providers")
+
+# Constant text: rendered once
+PROVIDERS_BLOCK = compile_emitter('''terraform {{
+  required_providers {{
+    aws = {{
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }}
+  }}
+}}
+
+provider "aws" {{
+  region = "us-east-1"
+}}''')()
+
+VPC_TEMPLATE = compile_emitter('''# infra_id: {id}
+resource "aws_vpc" "{tf}" {{
+  cidr_block           = "{cidr}"
+  enable_dns_hostnames = true
+  enable_dns_support   = true
+
+  tags = {{
+    Name = "{name}"
+  }}
+}}''', "id", "tf", "cidr", "name")
+
+INTERNET_GATEWAY_TEMPLATE = compile_emitter('''
+
+# Internet Gateway for {id}
+resource "aws_internet_gateway" "{tf}_igw" {{
+  vpc_id = aws_vpc.{tf}.id
+
+  tags = {{
+    Name = "{name}-igw"
+  }}
+}}''', "id", "tf", "name")
+
+SUBNET_TEMPLATE = compile_emitter('''# infra_id: {id}
+resource "aws_subnet" "{tf}" {{
+  vpc_id            = aws_vpc.{vpc_tf}.id
+  cidr_block        = "{cidr}"
+  availability_zone = "{az}"{public_ip}
+
+  tags = {{
+    Name = "{name}"
+    Type = "{subnet_type}"
+  }}
+}}''', "id", "tf", "vpc_tf", "cidr", "az", "public_ip", "name", "subnet_type")
+
+PUBLIC_IP_LINE = "\n  map_public_ip_on_launch = true"
+
+ROUTE_TABLE_TEMPLATE = compile_emitter('''
+
+# Route Table for {id}
+resource "aws_route_table" "{tf}_rt" {{
+  vpc_id = aws_vpc.{vpc_tf}.id
+
+  route {{
+    cidr_block = "0.0.0.0/0"
+    gateway_id = aws_internet_gateway.{vpc_tf}_igw.id
+  }}
+
+  tags = {{
+    Name = "{name}-rt"
+  }}
+}}
+
+resource "aws_route_table_association" "{tf}_rta" {{
+  subnet_id      = aws_subnet.{tf}.id
+  route_table_id = aws_route_table.{tf}_rt.id
+}}''', "id", "tf", "vpc_tf", "name")
+
+SECURITY_GROUP_TEMPLATE = compile_emitter('''# Security Group for EC2 instances
+resource "aws_security_group" "ec2_sg" {{
+  name        = "ec2-security-group"
+  description = "Security group for EC2 instances"{vpc_line}
+
+  ingress {{
+    from_port   = 80
+    to_port     = 80
+    protocol    = "tcp"
+    cidr_blocks = ["0.0.0.0/0"]
+  }}
+
+  ingress {{
+    from_port   = 443
+    to_port     = 443
+    protocol    = "tcp"
+    cidr_blocks = ["0.0.0.0/0"]
+  }}
+
+  egress {{
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }}
+}}''', "vpc_line")
+
+SECURITY_GROUP_VPC_LINE_TEMPLATE = compile_emitter("\n  vpc_id      = {vpc_ref}", "vpc_ref")
+
+EC2_TEMPLATE = compile_emitter('''# infra_id: {id}
+resource "aws_instance" "{tf}" {{
+  ami           = "{ami}"
+  # editable: instance_type
+  instance_type = "{instance_type}"
+  # editable: subnet_id
+  subnet_id     = {subnet_ref}
+  vpc_security_group_ids = [aws_security_group.ec2_sg.id]
+
+  tags = {{
+    Name = "{name}"
+  }}
+}}''', "id", "tf", "ami", "instance_type", "subnet_ref", "name")
+
+RDS_TEMPLATE = compile_emitter('''# DB Subnet Group for {id}
+resource "aws_db_subnet_group" "{tf}_subnet_group" {{
+  name       = "{name}-subnet-group"
+  subnet_ids = [{subnet_refs}]
+
+  tags = {{
+    Name = "{name}-subnet-group"
+  }}
+}}
+
+# infra_id: {id}
+resource "aws_db_instance" "{tf}" {{
+  identifier           = "{name}"
+  engine               = "{engine}"
+  # editable: instance_class
+  instance_class       = "{instance_class}"
+  # editable: allocated_storage
+  allocated_storage    = {allocated_storage}
+  db_subnet_group_name = aws_db_subnet_group.{tf}_subnet_group.name
+  skip_final_snapshot  = true
+
+  # Credentials should be managed via AWS Secrets Manager in production
+  username = "admin"
+  password = "change-me-in-production"
+
+  tags = {{
+    Name = "{name}"
+  }}
+}}''', "id", "tf", "name", "subnet_refs", "engine", "instance_class", "allocated_storage")
+
+LOAD_BALANCER_TEMPLATE = compile_emitter('''# infra_id: {id}
+resource "aws_lb" "{tf}" {{
+  name               = "{name}"
+  internal           = false
+  load_balancer_type = "application"
+  subnets            = [{subnet_refs}]
+
+  tags = {{
+    Name = "{name}"
+  }}
+}}''', "id", "tf", "name", "subnet_refs")
+
+TARGET_GROUP_TEMPLATE = compile_emitter('''
+
+# Target Group for {id}
+resource "aws_lb_target_group" "{tf}_tg" {{
+  name     = "{name}-tg"
+  port     = 80
+  protocol = "HTTP"{vpc_line}
+}}''', "id", "tf", "name", "vpc_line")
+
+TARGET_GROUP_VPC_LINE_TEMPLATE = compile_emitter("\n  vpc_id   = {vpc_ref}", "vpc_ref")
+
+# Stands in for an attachment's target while rendering; never in a model id
+TARGET_PLACEHOLDER = "\0"
+
+TARGET_ATTACHMENT_TEMPLATE = compile_emitter('''
+
+resource "aws_lb_target_group_attachment" "{tf}_{target_tf}" {{
+  target_group_arn = aws_lb_target_group.{tf}_tg.arn
+  target_id        = aws_instance.{target_tf}.id
+  port             = 80
+}}''', "tf", "target_tf")
+
+
+MODULE_CALL_TEMPLATE = compile_emitter('''# VPC module for {id}
+module "{tf}" {{
+  source = "./modules/{tf}"
+}}''', "id", "tf")
+
+VPC_OUTPUTS_TEMPLATE = compile_emitter('''output "vpc_id" {{
+  value = aws_vpc.{tf}.id
+}}
+
+output "subnet_ids" {{
+  value = {{{subnet_entries}
+  }}
+}}
+''', "tf", "subnet_entries")
+
+
+def terraform_header(model: InfrastructureModel) -> str:
+    return HEADER_TEMPLATE(model.model_id, model.last_edit_source.value, PROVIDERS_BLOCK)
+
+
+def vpc_section(vpc: VPC) -> str:
+    """VPC, plus an Internet Gateway if it has public subnets"""
+    tf = tf_name(vpc.id)
+    text = VPC_TEMPLATE(vpc.id, tf, vpc.cidr, vpc.name)
+    if any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets):
+        text += INTERNET_GATEWAY_TEMPLATE(vpc.id, tf, vpc.name)
+    return text
+
+
+def subnet_section(vpc: VPC, subnet: Subnet) -> str:
+    """Subnet, plus a route table and association for public subnets"""
+    tf = tf_name(subnet.id)
+    vpc_tf = tf_name(vpc.id)
+    public = subnet.subnet_type == SubnetType.PUBLIC
+    text = SUBNET_TEMPLATE(subnet.id, tf, vpc_tf, subnet.cidr, subnet.availability_zone,
+                           PUBLIC_IP_LINE if public else "", subnet.name, subnet.subnet_type.value)
+    if public:
+        text += ROUTE_TABLE_TEMPLATE(subnet.id, tf, vpc_tf, subnet.name)
+    return text
+
+
+def vpc_outputs(vpc: VPC) -> str:
+    """outputs.tf of a VPC module: the VPC id and a subnet id map"""
+    entries = "".join(f"\n    {tf_name(s.id)} = aws_subnet.{tf_name(s.id)}.id" for s in vpc.subnets)
+    return VPC_OUTPUTS_TEMPLATE(tf_name(vpc.id), entries)
+
+
+def security_group_section(first_vpc: Optional[VPC], ref_vpc: Callable[[str], str] = vpc_ref) -> str:
+    """Shared security group for EC2 instances, in the first VPC"""
+    vpc_line = SECURITY_GROUP_VPC_LINE_TEMPLATE(ref_vpc(first_vpc.id)) if first_vpc else ""
+    return SECURITY_GROUP_TEMPLATE(vpc_line)
+
+
+def ec2_section(ec2: EC2Instance, ref_subnet: Callable[[str], str] = subnet_ref) -> str:
+    # Enum.value is a Python-level property; _value_ is the plain attribute behind it
+    return EC2_TEMPLATE(ec2.id, tf_name(ec2.id), ec2.ami, ec2.instance_type._value_,
+                        ref_subnet(ec2.subnet_id), ec2.name)
+
+
+def rds_section(rds: RDSDatabase, ref_subnet: Callable[[str], str] = subnet_ref) -> str:
+    """DB subnet group and RDS instance"""
+    return RDS_TEMPLATE(rds.id, tf_name(rds.id), rds.name, subnet_refs(rds.subnet_ids, ref_subnet),
+                        rds.engine.value, rds.instance_class, str(rds.allocated_storage))
+
+
+def load_balancer_section(lb: LoadBalancer, first_vpc: Optional[VPC],
+                          ref_subnet: Callable[[str], str] = subnet_ref,
+                          ref_vpc: Callable[[str], str] = vpc_ref) -> str:
+    """Load balancer, plus its target group and attachments"""
+    tf = tf_name(lb.id)
+    parts = [LOAD_BALANCER_TEMPLATE(lb.id, tf, lb.name, subnet_refs(lb.subnet_ids, ref_subnet))]
+    
+    if lb.target_instance_ids:
+        vpc_line = TARGET_GROUP_VPC_LINE_TEMPLATE(ref_vpc(first_vpc.id)) if first_vpc else ""
+        parts.append(TARGET_GROUP_TEMPLATE(lb.id, tf, lb.name, vpc_line))
+        # Attachments only differ by target: render the template once with a
+        # placeholder target and join each target's name into the pieces
+        pieces = TARGET_ATTACHMENT_TEMPLATE(tf, TARGET_PLACEHOLDER).split(TARGET_PLACEHOLDER)
+        parts.extend(tf_name(target_id).join(pieces) for target_id in lb.target_instance_ids)
+    return "".join(parts)
+
+
+# Terraform JSON syntax (.tf.json)
+
+# Properties the reverse parser accepts edits for, per Terraform type
+EDITABLE_PROPERTIES = {
+    "aws_instance": ["instance_type", "subnet_id"],
+    "aws_db_instance": ["instance_class", "allocated_storage"],
+}
+
+OPEN_CIDR = ["0.0.0.0/0"]
+
+
+def generate_terraform_json(model: InfrastructureModel) -> str:
+    """
+    Generate the same resources as generate_terraform_code in Terraform's
+    JSON syntax, as a .tf.json file.
+    
+    The metadata comments become structured "//" properties, which
+    Terraform ignores:
+        "//": {"infra_id": "ec2-web-1", "editable": ["instance_type", "subnet_id"]}
+    so the reverse parser reads them with one json.loads call instead of
+    scanning lines.
+    """
+    return json.dumps(build_terraform_json(model), indent=2) + "\n"
+
+
+def build_terraform_json(model: InfrastructureModel) -> Dict:
+    """The .tf.json document as plain dicts, resources in file order"""
+    resources: Dict[str, Dict[str, Dict]] = {}
+    
+    def add(tf_type: str, name: str, body: Dict, infra_id: Optional[str] = None):
+        if infra_id is not None:
+            body = {"//": json_metadata(tf_type, infra_id), **body}
+        resources.setdefault(tf_type, {})[name] = body
+    
     for vpc in model.vpcs:
-        lines.append(f"# infra_id: {vpc.id}")
-        lines.append(f"resource \"aws_vpc\" \"{vpc.id.replace('-', '_')}\" {{")
-        lines.append(f"  cidr_block           = \"{vpc.cidr}\"")
-        lines.append(f"  enable_dns_hostnames = true")
-        lines.append(f"  enable_dns_support   = true")
-        lines.append(f"")
-        lines.append(f"  tags = {{")
-        lines.append(f"    Name = \"{vpc.name}\"")
-        lines.append(f"  }}")
-        lines.append(f"}}")
-        lines.append("")
-        
-        # Generate Internet Gateway for VPCs with public subnets
-        has_public = any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets)
-        if has_public:
-            lines.append(f"# Internet Gateway for {vpc.id}")
-            lines.append(f"resource \"aws_internet_gateway\" \"{vpc.id.replace('-', '_')}_igw\" {{")
-            lines.append(f"  vpc_id = aws_vpc.{vpc.id.replace('-', '_')}.id")
-            lines.append(f"")
-            lines.append(f"  tags = {{")
-            lines.append(f"    Name = \"{vpc.name}-igw\"")
-            lines.append(f"  }}")
-            lines.append(f"}}")
-            lines.append("")
-        
-        # Generate Subnets
+        tf = tf_name(vpc.id)
+        add("aws_vpc", tf, {
+            "cidr_block": vpc.cidr,
+            "enable_dns_hostnames": True,
+            "enable_dns_support": True,
+            "tags": {"Name": vpc.name}
+        }, vpc.id)
+        if any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets):
+            add("aws_internet_gateway", f"{tf}_igw", {
+                "vpc_id": interpolate(vpc_ref(vpc.id)),
+                "tags": {"Name": f"{vpc.name}-igw"}
+            })
         for subnet in vpc.subnets:
-            lines.append(f"# infra_id: {subnet.id}")
-            lines.append(f"resource \"aws_subnet\" \"{subnet.id.replace('-', '_')}\" {{")
-            lines.append(f"  vpc_id            = aws_vpc.{vpc.id.replace('-', '_')}.id")
-            lines.append(f"  cidr_block        = \"{subnet.cidr}\"")
-            lines.append(f"  availability_zone = \"{subnet.availability_zone}\"")
-            
-            if subnet.subnet_type == SubnetType.PUBLIC:
-                lines.append(f"  map_public_ip_on_launch = true")
-            
-            lines.append(f"")
-            lines.append(f"  tags = {{")
-            lines.append(f"    Name = \"{subnet.name}\"")
-            lines.append(f"    Type = \"{subnet.subnet_type.value}\"")
-            lines.append(f"  }}")
-            lines.append(f"}}")
-            lines.append("")
-            
-            # Generate Route Table for public subnets
-            if subnet.subnet_type == SubnetType.PUBLIC:
-                lines.append(f"# Route Table for {subnet.id}")
-                lines.append(f"resource \"aws_route_table\" \"{subnet.id.replace('-', '_')}_rt\" {{")
-                lines.append(f"  vpc_id = aws_vpc.{vpc.id.replace('-', '_')}.id")
-                lines.append(f"")
-                lines.append(f"  route {{")
-                lines.append(f"    cidr_block = \"0.0.0.0/0\"")
-                lines.append(f"    gateway_id = aws_internet_gateway.{vpc.id.replace('-', '_')}_igw.id")
-                lines.append(f"  }}")
-                lines.append(f"")
-                lines.append(f"  tags = {{")
-                lines.append(f"    Name = \"{subnet.name}-rt\"")
-                lines.append(f"  }}")
-                lines.append(f"}}")
-                lines.append("")
-                
-                lines.append(f"resource \"aws_route_table_association\" \"{subnet.id.replace('-', '_')}_rta\" {{")
-                lines.append(f"  subnet_id      = aws_subnet.{subnet.id.replace('-', '_')}.id")
-                lines.append(f"  route_table_id = aws_route_table.{subnet.id.replace('-', '_')}_rt.id")
-                lines.append(f"}}")
-                lines.append("")
-    
-    # Generate Security Groups
+            add_subnet_json(add, vpc, subnet)
+    
+    first_vpc = model.vpcs[0] if model.vpcs else None
     if model.ec2_instances or model.rds_databases:
-        lines.append("# Security Group for EC2 instances")
-        lines.append(f"resource \"aws_security_group\" \"ec2_sg\" {{")
-        lines.append(f"  name        = \"ec2-security-group\"")
-        lines.append(f"  description = \"Security group for EC2 instances\"")
-        if model.vpcs:
-            lines.append(f"  vpc_id      = aws_vpc.{model.vpcs[0].id.replace('-', '_')}.id")
-        lines.append(f"")
-        lines.append(f"  ingress {{")
-        lines.append(f"    from_port   = 80")
-        lines.append(f"    to_port     = 80")
-        lines.append(f"    protocol    = \"tcp\"")
-        lines.append(f"    cidr_blocks = [\"0.0.0.0/0\"]")
-        lines.append(f"  }}")
-        lines.append(f"")
-        lines.append(f"  ingress {{")
-        lines.append(f"    from_port   = 443")
-        lines.append(f"    to_port     = 443")
-        lines.append(f"    protocol    = \"tcp\"")
-        lines.append(f"    cidr_blocks = [\"0.0.0.0/0\"]")
-        lines.append(f"  }}")
-        lines.append(f"")
-        lines.append(f"  egress {{")
-        lines.append(f"    from_port   = 0")
-        lines.append(f"    to_port     = 0")
-        lines.append(f"    protocol    = \"-1\"")
-        lines.append(f"    cidr_blocks = [\"0.0.0.0/0\"]")
-        lines.append(f"  }}")
-        lines.append(f"}}")
-        lines.append("")
-    
-    # Generate EC2 Instances
+        add("aws_security_group", "ec2_sg", {
+            "name": "ec2-security-group",
+            "description": "Security group for EC2 instances",
+            **({"vpc_id": interpolate(vpc_ref(first_vpc.id))} if first_vpc else {}),
+            "ingress": [
+                {"from_port": port, "to_port": port, "protocol": "tcp", "cidr_blocks": OPEN_CIDR}
+                for port in (80, 443)
+            ],
+            "egress": [{"from_port": 0, "to_port": 0, "protocol": "-1", "cidr_blocks": OPEN_CIDR}]
+        })
+    
     for ec2 in model.ec2_instances:
-        lines.append(f"# infra_id: {ec2.id}")
-        lines.append(f"resource \"aws_instance\" \"{ec2.id.replace('-', '_')}\" {{")
-        lines.append(f"  ami           = \"{ec2.ami}\"")
-        lines.append(f"  # editable: instance_type")
-        lines.append(f"  instance_type = \"{ec2.instance_type.value}\"")
-        lines.append(f"  # editable: subnet_id")
-        lines.append(f"  subnet_id     = aws_subnet.{ec2.subnet_id.replace('-', '_')}.id")
-        lines.append(f"  vpc_security_group_ids = [aws_security_group.ec2_sg.id]")
-        lines.append(f"")
-        lines.append(f"  tags = {{")
-        lines.append(f"    Name = \"{ec2.name}\"")
-        lines.append(f"  }}")
-        lines.append(f"}}")
-        lines.append("")
-    
-    # Generate RDS Databases
+        add("aws_instance", tf_name(ec2.id), {
+            "ami": ec2.ami,
+            "instance_type": ec2.instance_type.value,
+            "subnet_id": interpolate(subnet_ref(ec2.subnet_id)),
+            "vpc_security_group_ids": ["${aws_security_group.ec2_sg.id}"],
+            "tags": {"Name": ec2.name}
+        }, ec2.id)
+    
     for rds in model.rds_databases:
-        # Create DB Subnet Group
-        lines.append(f"# DB Subnet Group for {rds.id}")
-        lines.append(f"resource \"aws_db_subnet_group\" \"{rds.id.replace('-', '_')}_subnet_group\" {{")
-        lines.append(f"  name       = \"{rds.name}-subnet-group\"")
-        subnet_refs = [f"aws_subnet.{sid.replace('-', '_')}.id" for sid in rds.subnet_ids]
-        lines.append(f"  subnet_ids = [{', '.join(subnet_refs)}]")
-        lines.append(f"")
-        lines.append(f"  tags = {{")
-        lines.append(f"    Name = \"{rds.name}-subnet-group\"")
-        lines.append(f"  }}")
-        lines.append(f"}}")
-        lines.append("")
-        
-        # Create RDS instance
-        lines.append(f"# infra_id: {rds.id}")
-        lines.append(f"resource \"aws_db_instance\" \"{rds.id.replace('-', '_')}\" {{")
-        lines.append(f"  identifier           = \"{rds.name}\"")
-        lines.append(f"  engine               = \"{rds.engine.value}\"")
-        lines.append(f"  # editable: instance_class")
-        lines.append(f"  instance_class       = \"{rds.instance_class}\"")
-        lines.append(f"  # editable: allocated_storage")
-        lines.append(f"  allocated_storage    = {rds.allocated_storage}")
-        lines.append(f"  db_subnet_group_name = aws_db_subnet_group.{rds.id.replace('-', '_')}_subnet_group.name")
-        lines.append(f"  skip_final_snapshot  = true")
-        lines.append(f"")
-        lines.append(f"  # Credentials should be managed via AWS Secrets Manager in production")
-        lines.append(f"  username = \"admin\"")
-        lines.append(f"  password = \"change-me-in-production\"")
-        lines.append(f"")
-        lines.append(f"  tags = {{")
-        lines.append(f"    Name = \"{rds.name}\"")
-        lines.append(f"  }}")
-        lines.append(f"}}")
-        lines.append("")
-    
-    # Generate Load Balancers
+        tf = tf_name(rds.id)
+        add("aws_db_subnet_group", f"{tf}_subnet_group", {
+            "name": f"{rds.name}-subnet-group",
+            "subnet_ids": [interpolate(subnet_ref(sid)) for sid in rds.subnet_ids],
+            "tags": {"Name": f"{rds.name}-subnet-group"}
+        })
+        add("aws_db_instance", tf, {
+            "identifier": rds.name,
+            "engine": rds.engine.value,
+            "instance_class": rds.instance_class,
+            "allocated_storage": rds.allocated_storage,
+            "db_subnet_group_name": f"${{aws_db_subnet_group.{tf}_subnet_group.name}}",
+            "skip_final_snapshot": True,
+            "username": "admin",
+            "password": "change-me-in-production",
+            "tags": {"Name": rds.name}
+        }, rds.id)
+    
     for lb in model.load_balancers:
-        lines.append(f"# infra_id: {lb.id}")
-        lines.append(f"resource \"aws_lb\" \"{lb.id.replace('-', '_')}\" {{")
-        lines.append(f"  name               = \"{lb.name}\"")
-        lines.append(f"  internal           = false")
-        lines.append(f"  load_balancer_type = \"application\"")
-        subnet_refs = [f"aws_subnet.{sid.replace('-', '_')}.id" for sid in lb.subnet_ids]
-        lines.append(f"  subnets            = [{', '.join(subnet_refs)}]")
-        lines.append(f"")
-        lines.append(f"  tags = {{")
-        lines.append(f"    Name = \"{lb.name}\"")
-        lines.append(f"  }}")
-        lines.append(f"}}")
-        lines.append("")
-        
-        # Create Target Group
+        tf = tf_name(lb.id)
+        add("aws_lb", tf, {
+            "name": lb.name,
+            "internal": False,
+            "load_balancer_type": "application",
+            "subnets": [interpolate(subnet_ref(sid)) for sid in lb.subnet_ids],
+            "tags": {"Name": lb.name}
+        }, lb.id)
         if lb.target_instance_ids:
-            lines.append(f"# Target Group for {lb.id}")
-            lines.append(f"resource \"aws_lb_target_group\" \"{lb.id.replace('-', '_')}_tg\" {{")
-            lines.append(f"  name     = \"{lb.name}-tg\"")
-            lines.append(f"  port     = 80")
-            lines.append(f"  protocol = \"HTTP\"")
-            if model.vpcs:
-                lines.append(f"  vpc_id   = aws_vpc.{model.vpcs[0].id.replace('-', '_')}.id")
-            lines.append(f"}}")
-            lines.append("")
-            
-            # Attach instances to target group
+            add("aws_lb_target_group", f"{tf}_tg", {
+                "name": f"{lb.name}-tg",
+                "port": 80,
+                "protocol": "HTTP",
+                **({"vpc_id": interpolate(vpc_ref(first_vpc.id))} if first_vpc else {})
+            })
             for target_id in lb.target_instance_ids:
-                lines.append(f"resource \"aws_lb_target_group_attachment\" \"{lb.id.replace('-', '_')}_{target_id.replace('-', '_')}\" {{")
-                lines.append(f"  target_group_arn = aws_lb_target_group.{lb.id.replace('-', '_')}_tg.arn")
-                lines.append(f"  target_id        = aws_instance.{target_id.replace('-', '_')}.id")
-                lines.append(f"  port             = 80")
-                lines.append(f"}}")
-                lines.append("")
-    
-    return "\n".join(lines)
+                target_tf = tf_name(target_id)
+                add("aws_lb_target_group_attachment", f"{tf}_{target_tf}", {
+                    "target_group_arn": f"${{aws_lb_target_group.{tf}_tg.arn}}",
+                    "target_id": f"${{aws_instance.{target_tf}.id}}",
+                    "port": 80
+                })
+    
+    document = {
+        "//": {"model_id": model.model_id, "last_edit_source": model.last_edit_source.value},
+        "terraform": {"required_providers": {"aws": {"source": "hashicorp/aws", "version": "~> 5.0"}}},
+        "provider": {"aws": {"region": "us-east-1"}}
+    }
+    if resources:
+        document["resource"] = resources
+    return document
+
+
+def add_subnet_json(add: Callable, vpc: VPC, subnet: Subnet):
+    """Subnet, plus a route table and association for public subnets"""
+    tf = tf_name(subnet.id)
+    vpc_tf = tf_name(vpc.id)
+    public = subnet.subnet_type == SubnetType.PUBLIC
+    body = {
+        "vpc_id": interpolate(vpc_ref(vpc.id)),
+        "cidr_block": subnet.cidr,
+        "availability_zone": subnet.availability_zone
+    }
+    if public:
+        body["map_public_ip_on_launch"] = True
+    body["tags"] = {"Name": subnet.name, "Type": subnet.subnet_type.value}
+    add("aws_subnet", tf, body, subnet.id)
+    
+    if public:
+        add("aws_route_table", f"{tf}_rt", {
+            "vpc_id": interpolate(vpc_ref(vpc.id)),
+            "route": [{"cidr_block": "0.0.0.0/0", "gateway_id": f"${{aws_internet_gateway.{vpc_tf}_igw.id}}"}],
+            "tags": {"Name": f"{subnet.name}-rt"}
+        })
+        add("aws_route_table_association", f"{tf}_rta", {
+            "subnet_id": interpolate(subnet_ref(subnet.id)),
+            "route_table_id": f"${{aws_route_table.{tf}_rt.id}}"
+        })
+
+
+def json_metadata(tf_type: str, infra_id: str) -> Dict:
+    metadata = {"infra_id": infra_id}
+    if tf_type in EDITABLE_PROPERTIES:
+        metadata["editable"] = EDITABLE_PROPERTIES[tf_type]
+    return metadata
+
+
+def interpolate(reference: str) -> str:
+    """A reference as a JSON-syntax expression string"""
+    return f"${{{reference}}}"
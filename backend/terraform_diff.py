@@ -0,0 +1,450 @@
+"""
+Incremental Terraform Diffing
+Finds what changed between two versions of a generated .tf file without
+parsing either of them in full.
+
+1. Equal stretches are skipped with chunked bytes compares (memcmp
+   speed), and only the lines around each difference are diffed with
+   difflib into hunks.
+2. A span index of the original (byte range of every top-level block,
+   comments above it included) maps each hunk to the blocks it touches.
+3. Only those blocks, and the matching bytes of the modified file, are
+   parsed again.
+
+So the Python-level work depends on the size of the change, not the file.
+
+Parse results are cached by the SHA-1 of their content (hashlib's fastest
+hash here, hardware-accelerated): span indexes per document in
+DOCUMENT_CACHE, parsed regions in BLOCK_CACHE. After a diff, the modified
+document's index is spliced together from the original's and the
+re-parsed regions and cached too, so when it is sent back as the next
+edit's original it isn't parsed at all.
+"""
+
+import difflib
+import hashlib
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate, islice
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .hcl import HCLBlock, HCLSyntaxError, parse_hcl
+
+
+# Bytes compared per step when skipping equal stretches
+COMPARE_CHUNK = 1 << 16
+
+# Bytes of lines diffed around a difference at first (doubled until the
+# sides fall back in step), and the equal lines that count as in step
+RESYNC_WINDOW = 4096
+RESYNC_LINES = 3
+
+# Parse caches, bounded by entry count and by the total size of the
+# source they were parsed from, oldest-used first out
+DOCUMENT_CACHE_ENTRIES = 32
+DOCUMENT_CACHE_BYTES = 64 << 20
+BLOCK_CACHE_ENTRIES = 4096
+BLOCK_CACHE_BYTES = 8 << 20
+
+# A hunk: original bytes [a1, a2) became modified bytes [b1, b2), whole lines
+Hunk = Tuple[int, int, int, int]
+
+NEWLINE = re.compile(b"\n")
+
+
+class ContentCache:
+    """
+    LRU cache of parse results keyed by content hash, with hit/miss counts.
+
+    Each entry weighs the size of the source it was parsed from, so a few
+    multi-MB documents can't hold more than max_bytes of parse trees.
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.entries: "OrderedDict[bytes, Tuple[Any, int]]" = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def get(self, key: bytes) -> Any:
+        """Cached value for key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: bytes, value: Any, weight: int):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[key] = (value, weight)
+            self.size += weight
+            while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+DOCUMENT_CACHE = ContentCache(DOCUMENT_CACHE_ENTRIES, DOCUMENT_CACHE_BYTES)
+BLOCK_CACHE = ContentCache(BLOCK_CACHE_ENTRIES, BLOCK_CACHE_BYTES)
+
+
+def content_key(data: bytes) -> bytes:
+    return hashlib.sha1(data).digest()
+
+
+def parse_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Sizes and hit/miss counts of the document and block parse caches"""
+    return {"documents": DOCUMENT_CACHE.stats(), "blocks": BLOCK_CACHE.stats()}
+
+
+def clear_parse_caches():
+    DOCUMENT_CACHE.clear()
+    BLOCK_CACHE.clear()
+
+
+def common_prefix_length(a: bytes, b: bytes, start_a: int = 0, start_b: int = 0) -> int:
+    """
+    Length of the common prefix of a[start_a:] and b[start_b:], found by
+    galloping over equal chunks
+    """
+    limit = min(len(a) - start_a, len(b) - start_b)
+    length, step = 0, COMPARE_CHUNK
+    while step:
+        while (length + step <= limit and
+               a[start_a + length:start_a + length + step] == b[start_b + length:start_b + length + step]):
+            length += step
+        step //= 2
+    return length
+
+
+def split_lines(data: bytes, start: int, size: int) -> Tuple[List[bytes], bool]:
+    """
+    Whole lines of data from start within about size bytes, and whether
+    they reach the end of data
+    """
+    end = start + size
+    if end >= len(data):
+        return data[start:].splitlines(keepends=True), True
+    end = data.rfind(b"\n", start, end) + 1 or data.find(b"\n", end) + 1 or len(data)
+    return data[start:end].splitlines(keepends=True), end == len(data)
+
+
+def changed_hunks(original: bytes, modified: bytes) -> List[Hunk]:
+    """
+    Changed line ranges between two documents, in order, as byte ranges.
+
+    Equal stretches are skipped with common_prefix_length. At each
+    difference, windows of lines from both sides go through difflib,
+    doubling in size until the two sides fall back in step for
+    RESYNC_LINES equal lines; the scan resumes there. Only lines near a
+    change are ever split or compared one by one.
+    """
+    hunks = []
+    position_a = position_b = 0
+    while True:
+        equal = common_prefix_length(original, modified, position_a, position_b)
+        if position_a + equal == len(original) and position_b + equal == len(modified):
+            return hunks
+        # Back up to the start of the line holding the difference
+        line_start = original.rfind(b"\n", position_a, position_a + equal) + 1 or position_a
+        position_b += line_start - position_a
+        position_a = line_start
+
+        window = RESYNC_WINDOW
+        while True:
+            old_lines, old_done = split_lines(original, position_a, window)
+            new_lines, new_done = split_lines(modified, position_b, window)
+            at_end = old_done and new_done
+            old_offsets = list(accumulate(map(len, old_lines), initial=position_a))
+            new_offsets = list(accumulate(map(len, new_lines), initial=position_b))
+
+            found = []
+            resync = None
+            matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag != "equal":
+                    found.append((old_offsets[i1], old_offsets[i2], new_offsets[j1], new_offsets[j2]))
+                elif found and i2 - i1 >= RESYNC_LINES:
+                    resync = (old_offsets[i1], new_offsets[j1])
+                    break
+            if resync or at_end:
+                break
+            window *= 2
+
+        hunks += found
+        if resync is None:
+            return hunks
+        position_a, position_b = resync
+
+
+class SpanIndex:
+    """
+    Top-level blocks of a parsed document as consecutive byte segments.
+
+    Segment k runs from the end of segment k-1 through the end of the line
+    where block k closes, so it holds block k plus the comments and blank
+    lines above it (blocks closing on the same line share a segment). A
+    final segment holds whatever follows the last block. Every byte belongs
+    to exactly one segment, so a segment boundary is always a safe place to
+    cut the document. segment_lines holds the 0-based line each segment
+    starts on, so any line can be found from the segment before it.
+
+    A spliced index reuses blocks parsed from another document (or from a
+    region of this one), so their recorded offsets and lines are off by
+    the segment's byte_shifts/line_shifts entry.
+    """
+    def __init__(self, segment_ends: List[int], segment_lines: List[int], size: int,
+                 segments: List[List[HCLBlock]], byte_shifts: List[int], line_shifts: List[int]):
+        self.segment_ends = segment_ends
+        self.segment_lines = segment_lines
+        self.size = size
+        self.segments = segments
+        self.byte_shifts = byte_shifts
+        self.line_shifts = line_shifts
+
+    def segment_at(self, offset: int) -> int:
+        """Index of the segment holding a byte offset"""
+        return bisect_right(self.segment_ends, offset)
+
+    def segment_start(self, segment: int) -> int:
+        return self.segment_ends[segment - 1] if segment else 0
+
+    def segment_end(self, segment: int) -> int:
+        return self.segment_ends[segment] if segment < len(self.segment_ends) else self.size
+
+    def iter_blocks(self, first: int = 0, last: Optional[int] = None) -> Iterator[Tuple[HCLBlock, int, int]]:
+        """(block, byte shift, line shift) for the blocks in segments first..last (inclusive)"""
+        last = len(self.segments) - 1 if last is None else last
+        for segment in range(first, min(last, len(self.segments) - 1) + 1):
+            byte_shift = self.byte_shifts[segment]
+            line_shift = self.line_shifts[segment]
+            for block in self.segments[segment]:
+                yield block, byte_shift, line_shift
+
+    def line_anchor(self, line: int) -> Tuple[int, int]:
+        """(line, offset) of the start of the segment holding a line"""
+        segment = bisect_right(self.segment_lines, line) - 1
+        return self.segment_lines[segment], self.segment_start(segment)
+
+
+def build_span_index(data: bytes) -> SpanIndex:
+    """
+    Parse a document and index its top-level blocks.
+    Raises HCLSyntaxError for code outside the HCL subset.
+    """
+    index = SpanIndex([], [0], len(data), [], [], [])
+    add_segments(index, data, parse_hcl(data).blocks, 0, 0)
+    return index
+
+
+def add_segments(index: SpanIndex, data: bytes, blocks: List[HCLBlock], byte_shift: int, line_shift: int):
+    """
+    Append segments for blocks parsed from data[byte_shift:], starting on
+    0-based line line_shift, to an index being built
+    """
+    segment_ends = index.segment_ends
+    segment_lines = index.segment_lines
+    start = byte_shift
+    for block in blocks:
+        end = data.find(b"\n", block.end + byte_shift) + 1 or len(data)
+        if segment_ends and segment_ends[-1] == end:
+            index.segments[-1].append(block)
+            continue
+        segment_lines.append(segment_lines[-1] + data.count(b"\n", start, end))
+        segment_ends.append(end)
+        index.segments.append([block])
+        index.byte_shifts.append(byte_shift)
+        index.line_shifts.append(line_shift)
+        start = end
+
+
+def span_index(data: bytes, key: Optional[bytes] = None) -> SpanIndex:
+    """
+    Span index of a document from DOCUMENT_CACHE, built on a miss.
+    key is content_key(data) when the caller already has it.
+    """
+    key = key or content_key(data)
+    index = DOCUMENT_CACHE.get(key)
+    if index is None:
+        index = build_span_index(data)
+        DOCUMENT_CACHE.put(key, index, len(data))
+    return index
+
+
+def parse_region(region: bytes) -> List[HCLBlock]:
+    """
+    Top-level blocks of a region cut at segment boundaries, from BLOCK_CACHE.
+    Raises HCLSyntaxError if the region doesn't parse on its own, or holds
+    top-level attributes (only the whole document shows whether they clash).
+    """
+    key = content_key(region)
+    blocks = BLOCK_CACHE.get(key)
+    if blocks is None:
+        root = parse_hcl(region)
+        if root.attributes:
+            name, (start, _) = next(iter(root.attribute_spans.items()))
+            raise HCLSyntaxError(f"attribute {name!r} outside a block", region, start)
+        blocks = root.blocks
+        BLOCK_CACHE.put(key, blocks, len(region))
+    return blocks
+
+
+def splice_span_index(index: SpanIndex, modified: bytes, regions: List[Tuple[int, int, int, int]],
+                      region_blocks: List[List[HCLBlock]]) -> Tuple[SpanIndex, List[Tuple[int, int]]]:
+    """
+    Span index of the modified document, from the original's index and the
+    blocks parsed from each touched region, without parsing anything else.
+
+    Untouched segments are shared with the original, their boundaries and
+    shifts moved by the size change of the regions before them. Also
+    returns the new index's (first, last) segments of each region.
+    """
+    spliced = SpanIndex([], [0], len(modified), [], [], [])
+    region_segments = []
+    copied = 0  # next original segment to copy
+    byte_delta = line_delta = 0
+
+    def copy_segments(end: int):
+        spliced.segment_ends += [offset + byte_delta for offset in index.segment_ends[copied:end]]
+        spliced.segment_lines += [line + line_delta for line in index.segment_lines[copied + 1:end + 1]]
+        spliced.segments += index.segments[copied:end]
+        spliced.byte_shifts += [shift + byte_delta for shift in index.byte_shifts[copied:end]]
+        spliced.line_shifts += [shift + line_delta for shift in index.line_shifts[copied:end]]
+
+    for (first, last, new_start, new_end), blocks in zip(regions, region_blocks):
+        copy_segments(min(first, len(index.segments)))
+        start_line = index.segment_lines[first] + line_delta
+        first_new = len(spliced.segments)
+        add_segments(spliced, modified, blocks, new_start, start_line)
+        region_segments.append((first_new, len(spliced.segments) - 1))
+
+        copied = last + 1
+        if copied < len(index.segment_lines):
+            byte_delta = new_end - index.segment_start(copied)
+            line_delta = start_line + modified.count(b"\n", new_start, new_end) - index.segment_lines[copied]
+    copy_segments(len(index.segments))
+    return spliced, region_segments
+
+
+def touched_regions(index: SpanIndex, hunks: List[Hunk]) -> List[Tuple[int, int, int, int]]:
+    """
+    Widen hunks to whole segments of the original and merge overlaps.
+
+    Returns (first_segment, last_segment, new_start, new_end): the original
+    segments a region covers and the modified bytes that replace them.
+    """
+    regions = []
+    delta = 0  # modified offset minus original offset, before the current hunk
+    for a1, a2, b1, b2 in hunks:
+        first = index.segment_at(a1)
+        # An insertion touches the segment it lands in
+        last = index.segment_at(a2 - 1) if a2 > a1 else first
+        if regions and first <= regions[-1][1]:
+            first, previous_last, new_start, _ = regions.pop()
+            last = max(last, previous_last)
+        else:
+            new_start = index.segment_start(first) + delta
+        delta += (b2 - b1) - (a2 - a1)
+        regions.append((first, last, new_start, index.segment_end(last) + delta))
+    return regions
+
+
+def skip_lines(data: bytes, offset: int, count: int) -> int:
+    """Offset of the line count lines after the one starting at offset"""
+    if count <= 0:
+        return offset
+    newline = next(islice(NEWLINE.finditer(data, offset), count - 1, None), None)
+    if newline is None:
+        raise ValueError("Invalid range: line is past the end of the document")
+    return newline.end()
+
+
+def utf16_to_byte_offset(line: bytes, character: int) -> int:
+    """Byte length of the first character UTF-16 code units of a line (clamped to the line)"""
+    if line.isascii():
+        return min(character, len(line))
+    units = 0
+    text = line.decode()
+    for index, char in enumerate(text):
+        if units >= character:
+            return len(text[:index].encode())
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(line)
+
+
+class TextDocument:
+    """
+    A document changed in place by LSP didChange-style content changes.
+
+    Each change is {"range": {"start": {"line", "character"}, "end": ...},
+    "text": ...} against the document as left by the changes before it; a
+    change without a range replaces the whole document. Lines are 0-based
+    and characters count UTF-16 code units, as in LSP.
+
+    Lines before every change so far are found from the original's span
+    index, so they cost a bisect plus a few lines of scanning. Lines after
+    the first change are scanned forward from it. Editors send multi-cursor
+    changes bottom-up, so in practice every lookup takes the first path.
+    """
+    def __init__(self, data: bytes, index: SpanIndex):
+        self.data = data
+        self.index: Optional[SpanIndex] = index
+        # (line, offset) of the start of the first line changed so far
+        self.changed: Optional[Tuple[int, int]] = None
+
+    def offset_of(self, position: Dict[str, int]) -> int:
+        line, character = position["line"], position["character"]
+        if line < 0 or character < 0:
+            raise ValueError("Invalid range: positions must not be negative")
+        if self.changed is not None and line >= self.changed[0]:
+            anchor_line, anchor_offset = self.changed
+        elif self.index is not None:
+            anchor_line, anchor_offset = self.index.line_anchor(line)
+        else:
+            anchor_line, anchor_offset = 0, 0
+        start = skip_lines(self.data, anchor_offset, line - anchor_line)
+        end = self.data.find(b"\n", start)
+        end = len(self.data) if end < 0 else end
+        return start + utf16_to_byte_offset(self.data[start:end], character)
+
+    def apply(self, change: Dict[str, Any]):
+        text = change["text"].encode()
+        if change.get("range") is None:
+            self.data = text
+            self.index = None
+            self.changed = (0, 0)
+            return
+        start_position = change["range"]["start"]
+        start = self.offset_of(start_position)
+        end = self.offset_of(change["range"]["end"])
+        if end < start:
+            raise ValueError("Invalid range: end is before start")
+        self.data = self.data[:start] + text + self.data[end:]
+        line = start_position["line"]
+        if self.changed is None or line < self.changed[0]:
+            self.changed = (line, self.data.rfind(b"\n", 0, start) + 1)
+
+
+def apply_text_changes(data: bytes, index: SpanIndex, changes: List[Dict[str, Any]]) -> bytes:
+    """Apply LSP didChange-style content changes to a document in order (see TextDocument)"""
+    document = TextDocument(data, index)
+    for change in changes:
+        document.apply(change)
+    return document.data
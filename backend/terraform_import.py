@@ -0,0 +1,642 @@
+"""
+Terraform Importer
+Builds an InfrastructureModel from an existing Terraform code base, not
+only from code this system generated.
+
+Pipeline:
+1. iter_terraform_files walks the directory lazily (skipping .terraform
+   and hidden directories) and yields *.tf / *.tf.json paths
+2. A process pool parses the files in parallel. Workers read their own
+   files and return compact records for the resource types we import, so
+   the parent never holds file contents or parse trees: memory is bounded
+   by the workers' largest files plus the records themselves
+3. Records stream into a symbol table per directory (each directory is a
+   Terraform module with its own "aws_subnet.web" namespace)
+4. Once every file is in, references such as subnet_id = aws_subnet.web.id
+   are resolved through the symbol tables and the model is assembled
+
+Imported: aws_vpc, aws_subnet, aws_instance, aws_db_instance, aws_lb
+(aws_alb), aws_s3_bucket, aws_security_group. Helper resources are read to
+resolve relationships: DB subnet groups, target groups, attachments and
+listeners, and aws_s3_bucket_versioning.
+
+Files outside the HCL subset hcl.py supports are recovered block by
+block: the unsupported block is reported and the rest of the file is
+still imported. Variables, locals and module calls are not evaluated, and
+values the model can't represent (e.g. instance_type = "m5.large") fall
+back to a default with a warning.
+"""
+
+import ipaddress
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .model import (
+    InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer, S3Bucket, SecurityGroup,
+    SubnetType, InstanceType, DatabaseEngine
+)
+from .hcl import parse_hcl, HCLSyntaxError, Reference
+from .parser import allocate_subnet_cidrs, DEFAULT_VPC_CIDR
+from .terraform_parser import infra_id_from_comments
+
+
+# Resource types that become model resources, and their id prefixes
+MODEL_TYPES = {
+    "aws_vpc": "vpc",
+    "aws_subnet": "subnet",
+    "aws_instance": "ec2",
+    "aws_db_instance": "rds",
+    "aws_lb": "lb",
+    "aws_alb": "lb",
+    "aws_s3_bucket": "s3",
+    "aws_security_group": "sg",
+}
+
+# Resource types only read to resolve relationships
+HELPER_TYPES = {
+    "aws_db_subnet_group", "aws_lb_target_group", "aws_alb_target_group",
+    "aws_lb_target_group_attachment", "aws_alb_target_group_attachment",
+    "aws_lb_listener", "aws_alb_listener", "aws_s3_bucket_versioning",
+}
+
+LB_TYPES = ("aws_lb", "aws_alb")
+TARGET_GROUP_TYPES = ("aws_lb_target_group", "aws_alb_target_group")
+
+# Directories never walked into
+SKIPPED_DIRECTORIES = {".terraform", ".git", "node_modules"}
+
+# Matches "aws_subnet.web", "aws_subnet.web[0]" and "aws_subnet.web[count.index]"
+REFERENCE_PATTERN = re.compile(r"\b(aws_[a-z0-9_]+)\.([A-Za-z_][\w-]*)(?:\[([^\]]*)\])?")
+
+# Finds top-level block boundaries in files the parser rejects: strings and
+# comments are skipped so their braces don't count, heredocs are jumped over
+BLOCK_SCAN_PATTERN = re.compile(
+    rb'"(?:[^"\\\n]|\\.)*"|(?:#|//)[^\n]*|/\*.*?\*/|<<-?[ \t]*"?([A-Za-z_]\w*)"?[^\n]*\n|[{}]', re.S)
+
+ENGINES = {
+    "postgres": DatabaseEngine.POSTGRES,
+    "aurora-postgresql": DatabaseEngine.POSTGRES,
+    "mysql": DatabaseEngine.MYSQL,
+    "aurora-mysql": DatabaseEngine.MYSQL,
+    "aurora": DatabaseEngine.MYSQL,
+    "mariadb": DatabaseEngine.MARIADB,
+}
+
+INSTANCE_TYPES = {t.value: t for t in InstanceType}
+
+# Files handed to a worker at a time
+DEFAULT_CHUNKSIZE = 4
+
+
+class TerraformImportResult:
+    """Result of importing a Terraform directory"""
+    def __init__(self, model: InfrastructureModel, warnings: List[str], stats: Dict[str, Any]):
+        self.model = model
+        self.warnings = warnings
+        self.stats = stats
+
+
+def iter_terraform_files(root: str) -> Iterator[str]:
+    """Yield *.tf and *.tf.json paths under root lazily, in sorted order"""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories
+                                   if d not in SKIPPED_DIRECTORIES and not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.endswith(".tf") or filename.endswith(".tf.json"):
+                yield os.path.join(directory, filename)
+
+
+def parse_terraform_file(path: str) -> Dict[str, Any]:
+    """
+    Worker: parse one file into resource records.
+    Runs in a pool process, so it only returns plain data.
+
+    Each record is {"type", "name", "body", "line", "infra_id"}, where body
+    is the block's attributes and nested blocks (HCLBlock.to_dict shape).
+    """
+    result = {"path": path, "directory": os.path.dirname(path), "resources": [],
+              "errors": [], "skipped": {}, "bytes": 0}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        result["errors"].append(f"{path}: {e}")
+        return result
+    result["bytes"] = len(data)
+
+    if path.endswith(".tf.json"):
+        blocks = json_resource_blocks(path, data, result["errors"])
+    else:
+        blocks = hcl_resource_blocks(path, data, result["errors"])
+
+    skipped = Counter()
+    for tf_type, name, body, line, infra_id in blocks:
+        if tf_type in MODEL_TYPES or tf_type in HELPER_TYPES:
+            result["resources"].append({"type": tf_type, "name": name, "body": body,
+                                        "line": line, "infra_id": infra_id})
+        else:
+            skipped[tf_type] += 1
+    result["skipped"] = dict(skipped)
+    return result
+
+
+def hcl_resource_blocks(path: str, data: bytes, errors: List[str]) -> Iterator[Tuple]:
+    """Resource blocks of an HCL file, recovering block by block on syntax errors"""
+    if b"<<" in data:
+        data = blank_heredocs(data)
+    try:
+        roots = [(parse_hcl(data), 0)]
+    except HCLSyntaxError:
+        roots = []
+        for start, end in top_level_spans(data):
+            try:
+                roots.append((parse_hcl(data[start:end]), data.count(b"\n", 0, start)))
+            except HCLSyntaxError as e:
+                line = e.line + data.count(b"\n", 0, start)
+                errors.append(f"{path}:{line}: skipped block outside the supported HCL subset ({e})")
+
+    for root, line_offset in roots:
+        for block in root.blocks:
+            if block.block_type != "resource" or len(block.labels) != 2:
+                continue
+            yield (block.labels[0], block.labels[1], block.to_dict(), block.line + line_offset,
+                   infra_id_from_comments(block.comments))
+
+
+def top_level_spans(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Byte spans of top-level blocks, from the start of their header line to the closing brace"""
+    depth = 0
+    block_start = previous_end = 0
+    position = 0
+    while True:
+        match = BLOCK_SCAN_PATTERN.search(data, position)
+        if not match:
+            if depth:
+                # Unterminated: the parser reports where it went wrong
+                yield block_start, len(data)
+            return
+        position = match.end()
+        token = match.group()
+        if match.group(1):
+            position = heredoc_end(data, match)
+        elif token == b"{":
+            if depth == 0:
+                block_start = data.rfind(b"\n", 0, match.start()) + 1
+                # Keep the comment lines directly above (e.g. "# infra_id: ...")
+                while block_start > previous_end:
+                    line_start = data.rfind(b"\n", 0, block_start - 1) + 1
+                    line = data[line_start:block_start].strip()
+                    if not (line.startswith(b"#") or line.startswith(b"//")) or line_start < previous_end:
+                        break
+                    block_start = line_start
+            depth += 1
+        elif token == b"}" and depth:
+            depth -= 1
+            if depth == 0:
+                previous_end = position
+                yield block_start, position
+
+
+def heredoc_end(data: bytes, match) -> int:
+    """End of the heredoc whose opener BLOCK_SCAN_PATTERN matched (after its terminator line)"""
+    terminator = re.compile(rb"^[ \t]*" + re.escape(match.group(1)) + rb"[ \t]*$", re.M)
+    end = terminator.search(data, match.end())
+    return end.end() if end else len(data)
+
+
+def blank_heredocs(data: bytes) -> bytes:
+    """
+    Replace heredoc values (user_data scripts, policies) with "", keeping
+    line numbers: the HCL subset has no heredocs and no imported field
+    comes from one.
+    """
+    parts = []
+    position = copied = 0
+    while True:
+        match = BLOCK_SCAN_PATTERN.search(data, position)
+        if not match:
+            break
+        position = match.end()
+        if match.group(1):
+            end = heredoc_end(data, match)
+            parts += [data[copied:match.start()], b'""', b"\n" * data.count(b"\n", match.start(), end)]
+            copied = position = end
+    parts.append(data[copied:])
+    return b"".join(parts)
+
+
+def json_resource_blocks(path: str, data: bytes, errors: List[str]) -> Iterator[Tuple]:
+    """Resource blocks of a .tf.json file"""
+    try:
+        document = json.loads(data)
+    except ValueError as e:
+        errors.append(f"{path}: invalid JSON ({e})")
+        return
+    resources = document.get("resource", {}) if isinstance(document, dict) else {}
+    for tf_type, named in resources.items():
+        if not isinstance(named, dict):
+            continue
+        for name, body in named.items():
+            # A resource may be given as a list of bodies; the first one counts
+            if isinstance(body, list):
+                body = body[0] if body else {}
+            if not isinstance(body, dict):
+                continue
+            metadata = body.get("//")
+            infra_id = metadata.get("infra_id") if isinstance(metadata, dict) else None
+            yield tf_type, name, body, 0, infra_id
+
+
+def is_literal(value: Any) -> bool:
+    """A plain string value: not a reference and without interpolation"""
+    return isinstance(value, str) and not isinstance(value, Reference) and "${" not in value
+
+
+def literal(value: Any, index: Optional[int] = None) -> Optional[str]:
+    """A string value with ${count.index} filled in, or None if it isn't a literal"""
+    if index is not None and isinstance(value, str) and not isinstance(value, Reference):
+        value = value.replace("${count.index}", str(index))
+    return value if is_literal(value) else None
+
+
+def references(value: Any) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """(type, name, index) of every resource reference in a value"""
+    if isinstance(value, str):
+        for match in REFERENCE_PATTERN.finditer(value):
+            yield match.group(1), match.group(2), match.group(3)
+    elif isinstance(value, list):
+        for item in value:
+            yield from references(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from references(item)
+
+
+def first_block(body: Dict[str, Any], name: str) -> Dict[str, Any]:
+    """The first nested block of a type, or {}"""
+    blocks = body.get(name)
+    if isinstance(blocks, list) and blocks and isinstance(blocks[0], dict):
+        return blocks[0]
+    return blocks if isinstance(blocks, dict) else {}
+
+
+class SymbolTable:
+    """
+    One Terraform module's resources, by address ("aws_subnet.web").
+    ids maps the address of each model resource to its model ids, one
+    per count instance.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.ids: Dict[str, List[str]] = {}
+
+    def add(self, record: Dict[str, Any]):
+        self.records[f"{record['type']}.{record['name']}"] = record
+
+    def sort(self):
+        """Order resources by file and line, since files are parsed in completion order"""
+        self.records = dict(sorted(self.records.items(), key=lambda item: (item[1]["file"], item[1]["line"])))
+
+    def of_type(self, *types: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        return ((address, record) for address, record in self.records.items() if record["type"] in types)
+
+    def resolve(self, value: Any, types: Tuple[str, ...], index: Optional[int] = None) -> List[str]:
+        """
+        Model ids referenced by value, for resources of the given types.
+        index is the referencing resource's count.index, if it has a count.
+        """
+        ids = []
+        for tf_type, name, subscript in references(value):
+            targets = self.ids.get(f"{tf_type}.{name}") if tf_type in types else None
+            if not targets:
+                continue
+            if subscript is not None and subscript.strip().isdigit():
+                position = int(subscript)
+                ids.extend(targets[position:position + 1])
+            elif index is not None and (subscript == "count.index" or "count.index" in str(value)):
+                ids.append(targets[index % len(targets)])
+            else:
+                ids.extend(targets)
+        return list(dict.fromkeys(ids))
+
+    def resolve_addresses(self, value: Any, types: Tuple[str, ...]) -> List[str]:
+        """Addresses of the helper resources referenced by value"""
+        addresses = [f"{tf_type}.{name}" for tf_type, name, _ in references(value) if tf_type in types]
+        return [address for address in dict.fromkeys(addresses) if address in self.records]
+
+
+class ModelAssembler:
+    """Turns the symbol tables into an InfrastructureModel, collecting warnings"""
+    def __init__(self, tables: Dict[str, SymbolTable]):
+        self.tables = tables
+        self.model = InfrastructureModel()
+        self.warnings: List[str] = []
+        self.used_ids = set()
+        self.fallbacks = Counter()
+        # Subnets whose cidr_block isn't a literal: (table, record, vpc, subnet)
+        self.unallocated: List[Tuple[SymbolTable, Dict[str, Any], VPC, Subnet]] = []
+
+    def warn(self, table: SymbolTable, record: Dict[str, Any], message: str):
+        location = f"{record['file']}:{record['line']}" if record["line"] else record["file"]
+        self.warnings.append(f"{location}: {record['type']}.{record['name']}: {message}")
+
+    def assemble(self) -> InfrastructureModel:
+        for table in self.tables.values():
+            table.sort()
+            self.assign_ids(table)
+        # Resources are built in dependency order: subnets need VPCs, and so on
+        for table in self.tables.values():
+            self.build_vpcs(table)
+        for table in self.tables.values():
+            self.build_subnets(table)
+            self.build_instances(table)
+            self.build_databases(table)
+            self.build_load_balancers(table)
+            self.build_buckets(table)
+            self.build_security_groups(table)
+        self.allocate_subnet_cidrs()
+        for (field, value, default), count in sorted(self.fallbacks.items()):
+            self.warnings.append(f"{field} {value!r} is not supported by the model; "
+                                 f"{count} resource(s) imported as {default}")
+        return self.model
+
+    def assign_ids(self, table: SymbolTable):
+        """Give every model resource (and every count instance) a unique model id"""
+        for address, record in table.records.items():
+            if record["type"] not in MODEL_TYPES:
+                continue
+            base = record["infra_id"] or self.default_id(record)
+            count = record["body"].get("count")
+            for_each = record["body"].get("for_each")
+            if for_each is not None:
+                self.warn(table, record, f"for_each {for_each!r} can't be evaluated; imported once")
+                table.ids[address] = [self.unique_id(base)]
+            elif count is None:
+                table.ids[address] = [self.unique_id(base)]
+            elif isinstance(count, int) and not isinstance(count, bool):
+                table.ids[address] = [self.unique_id(f"{base}-{i}") for i in range(count)]
+            else:
+                self.warn(table, record, f"count {count!r} can't be evaluated; imported once")
+                table.ids[address] = [self.unique_id(base)]
+
+    def default_id(self, record: Dict[str, Any]) -> str:
+        prefix = MODEL_TYPES[record["type"]]
+        name = record["name"].replace("_", "-")
+        return name if name == prefix or name.startswith(prefix + "-") else f"{prefix}-{name}"
+
+    def unique_id(self, base: str) -> str:
+        candidate, n = base, 2
+        while candidate in self.used_ids:
+            candidate = f"{base}-{n}"
+            n += 1
+        self.used_ids.add(candidate)
+        return candidate
+
+    def instances(self, table: SymbolTable, *types: str) -> Iterator[Tuple[Dict, Dict, str, Optional[int]]]:
+        """(record, body, id, count.index) for each instance of the given types"""
+        for address, record in table.of_type(*types):
+            ids = table.ids.get(address, [])
+            for i, resource_id in enumerate(ids):
+                yield record, record["body"], resource_id, (i if "count" in record["body"] else None)
+
+    def resource_name(self, record: Dict, body: Dict, index: Optional[int], *attributes: str) -> str:
+        """tags.Name, else the first literal of attributes, else the Terraform name"""
+        tags = body.get("tags")
+        candidates = [tags.get("Name") if isinstance(tags, dict) else None]
+        candidates += [body.get(attribute) for attribute in attributes]
+        for candidate in candidates:
+            candidate = literal(candidate, index)
+            if candidate:
+                return candidate
+        return record["name"] if index is None else f"{record['name']}-{index}"
+
+    def build_vpcs(self, table: SymbolTable):
+        for record, body, vpc_id, index in self.instances(table, "aws_vpc"):
+            cidr = literal(body.get("cidr_block"), index)
+            if not cidr:
+                self.warn(table, record, f"cidr_block is not a literal; using {DEFAULT_VPC_CIDR}")
+                cidr = DEFAULT_VPC_CIDR
+            self.model.add_vpc(VPC(id=vpc_id, name=self.resource_name(record, body, index), cidr=cidr))
+
+    def build_subnets(self, table: SymbolTable):
+        vpcs = {vpc.id: vpc for vpc in self.model.vpcs}
+        local_vpcs = [vpc_id for address, ids in table.ids.items()
+                      if table.records[address]["type"] == "aws_vpc" for vpc_id in ids]
+        for record, body, subnet_id, index in self.instances(table, "aws_subnet"):
+            vpc_ids = table.resolve(body.get("vpc_id"), ("aws_vpc",), index)
+            if not vpc_ids and len(local_vpcs) == 1:
+                self.warn(table, record, "vpc_id not resolved; placed in the module's only VPC")
+                vpc_ids = local_vpcs
+            if not vpc_ids:
+                self.warn(table, record, "vpc_id not resolved; subnet skipped")
+                continue
+
+            name = self.resource_name(record, body, index)
+            tags = body.get("tags") if isinstance(body.get("tags"), dict) else {}
+            if body.get("map_public_ip_on_launch") is True or tags.get("Type") == "public":
+                subnet_type = SubnetType.PUBLIC
+            elif tags.get("Type") == "private" or "public" not in name.lower():
+                subnet_type = SubnetType.PRIVATE
+            else:
+                subnet_type = SubnetType.PUBLIC
+
+            cidr = literal(body.get("cidr_block"), index)
+            zone = literal(body.get("availability_zone"), index)
+            subnet = Subnet(id=subnet_id, name=name, cidr=cidr or "", subnet_type=subnet_type)
+            if zone:
+                subnet.availability_zone = zone
+            vpc = vpcs[vpc_ids[0]]
+            vpc.add_subnet(subnet)
+            if not cidr:
+                self.unallocated.append((table, record, vpc, subnet))
+
+    def allocate_subnet_cidrs(self):
+        """
+        Give subnets without a literal cidr_block a block of their VPC, as
+        the text parser allocates them, skipping blocks that overlap the
+        VPC's literal subnets
+        """
+        by_vpc = defaultdict(list)
+        for table, record, vpc, subnet in self.unallocated:
+            by_vpc[vpc.id].append((table, record, vpc, subnet))
+        for pending in by_vpc.values():
+            vpc = pending[0][2]
+            taken = []
+            for subnet in vpc.subnets:
+                try:
+                    taken.append(ipaddress.ip_network(subnet.cidr, strict=False))
+                except ValueError:
+                    pass
+            # Enough blocks even if every literal subnet takes one of them
+            _, cidrs = allocate_subnet_cidrs(vpc.cidr, len(vpc.subnets) + len(taken))
+            free = (cidr for cidr in cidrs
+                    if not any(ipaddress.ip_network(cidr).overlaps(network) for network in taken))
+            for table, record, _, subnet in pending:
+                subnet.cidr = next(free, cidrs[-1])
+                self.warn(table, record, f"cidr_block is not a literal; allocated {subnet.cidr} from {vpc.cidr}")
+
+    def build_instances(self, table: SymbolTable):
+        for record, body, ec2_id, index in self.instances(table, "aws_instance"):
+            subnet_ids = table.resolve(body.get("subnet_id"), ("aws_subnet",), index)
+            if not subnet_ids:
+                self.warn(table, record, "subnet_id not resolved; instance skipped")
+                continue
+            instance_type = self.enum_value(body.get("instance_type"), INSTANCE_TYPES,
+                                            "instance_type", InstanceType.T2_MICRO)
+            instance = EC2Instance(id=ec2_id, name=self.resource_name(record, body, index),
+                                   instance_type=instance_type, subnet_id=subnet_ids[0])
+            if is_literal(body.get("ami")):
+                instance.ami = body["ami"]
+            self.model.add_ec2(instance)
+
+    def build_databases(self, table: SymbolTable):
+        for record, body, rds_id, index in self.instances(table, "aws_db_instance"):
+            subnet_ids = self.database_subnets(table, body.get("db_subnet_group_name"), index)
+            if not subnet_ids:
+                self.warn(table, record, "db_subnet_group_name not resolved to subnets")
+            storage = body.get("allocated_storage")
+            instance_class = body.get("instance_class")
+            self.model.add_rds(RDSDatabase(
+                id=rds_id, name=self.resource_name(record, body, index, "identifier"),
+                engine=self.enum_value(body.get("engine"), ENGINES, "engine", DatabaseEngine.POSTGRES),
+                instance_class=instance_class if is_literal(instance_class) else "db.t3.micro",
+                subnet_ids=subnet_ids,
+                allocated_storage=storage if isinstance(storage, int) and not isinstance(storage, bool) else 20))
+
+    def database_subnets(self, table: SymbolTable, group: Any, index: Optional[int]) -> List[str]:
+        """Subnets of the DB subnet group a database names, by reference or by literal name"""
+        addresses = table.resolve_addresses(group, ("aws_db_subnet_group",))
+        if not addresses and is_literal(group):
+            addresses = [address for address, record in table.of_type("aws_db_subnet_group")
+                         if record["body"].get("name") == group]
+        subnet_ids = []
+        for address in addresses:
+            subnet_ids += table.resolve(table.records[address]["body"].get("subnet_ids"), ("aws_subnet",), index)
+        return list(dict.fromkeys(subnet_ids))
+
+    def build_load_balancers(self, table: SymbolTable):
+        targets_by_group = defaultdict(list)
+        for _, attachment in table.of_type("aws_lb_target_group_attachment", "aws_alb_target_group_attachment"):
+            for group in table.resolve_addresses(attachment["body"].get("target_group_arn"), TARGET_GROUP_TYPES):
+                targets_by_group[group] += table.resolve(attachment["body"].get("target_id"), ("aws_instance",))
+        groups_by_lb = defaultdict(list)
+        for _, listener in table.of_type("aws_lb_listener", "aws_alb_listener"):
+            groups = table.resolve_addresses(listener["body"].get("default_action"), TARGET_GROUP_TYPES)
+            for lb_address in table.resolve_addresses(listener["body"].get("load_balancer_arn"), LB_TYPES):
+                groups_by_lb[lb_address] += groups
+
+        for address, record in table.of_type(*LB_TYPES):
+            body = record["body"]
+            # Without a listener, fall back to our own naming: "<lb>_tg"
+            groups = groups_by_lb.get(address) or [
+                group for group in (f"{tg_type}.{record['name']}_tg" for tg_type in TARGET_GROUP_TYPES)
+                if group in table.records]
+            targets = list(dict.fromkeys(target for group in groups for target in targets_by_group[group]))
+            for i, lb_id in enumerate(table.ids.get(address, [])):
+                index = i if "count" in body else None
+                subnet_ids = table.resolve(body.get("subnets"), ("aws_subnet",), index)
+                subnet_ids += table.resolve(body.get("subnet_mapping"), ("aws_subnet",), index)
+                if not subnet_ids:
+                    self.warn(table, record, "subnets not resolved; load balancer skipped")
+                    continue
+                self.model.add_load_balancer(LoadBalancer(
+                    id=lb_id, name=self.resource_name(record, body, index, "name"),
+                    subnet_ids=list(dict.fromkeys(subnet_ids)), target_instance_ids=targets))
+
+    def build_buckets(self, table: SymbolTable):
+        versioned = set()
+        for _, record in table.of_type("aws_s3_bucket_versioning"):
+            if first_block(record["body"], "versioning_configuration").get("status") == "Enabled":
+                versioned.update(table.resolve(record["body"].get("bucket"), ("aws_s3_bucket",)))
+        for record, body, bucket_id, index in self.instances(table, "aws_s3_bucket"):
+            enabled = first_block(body, "versioning").get("enabled") is True or bucket_id in versioned
+            self.model.add_s3_bucket(S3Bucket(id=bucket_id, name=self.resource_name(record, body, index, "bucket"),
+                                              versioning_enabled=enabled))
+
+    def build_security_groups(self, table: SymbolTable):
+        for record, body, sg_id, index in self.instances(table, "aws_security_group"):
+            vpc_ids = table.resolve(body.get("vpc_id"), ("aws_vpc",), index)
+            if not vpc_ids and body.get("vpc_id") is not None:
+                self.warn(table, record, "vpc_id not resolved")
+            description = body.get("description")
+            self.model.add_security_group(SecurityGroup(
+                id=sg_id, name=self.resource_name(record, body, index, "name"),
+                vpc_id=vpc_ids[0] if vpc_ids else "",
+                description=description if is_literal(description) else "Security group",
+                ingress_rules=[security_rule(rule) for rule in body.get("ingress", []) if isinstance(rule, dict)],
+                egress_rules=[security_rule(rule) for rule in body.get("egress", []) if isinstance(rule, dict)]))
+
+    def enum_value(self, value: Any, choices: Dict[str, Any], field: str, default: Any) -> Any:
+        """Map a literal to a model enum, counting values the model doesn't have"""
+        if is_literal(value) and value in choices:
+            return choices[value]
+        self.fallbacks[(field, value if is_literal(value) else str(value), default.value)] += 1
+        return default
+
+
+def security_rule(rule: Dict[str, Any]) -> Dict[str, Any]:
+    """An ingress/egress block as a rule dict (only literal values are kept)"""
+    return {key: value for key, value in rule.items()
+            if key in ("from_port", "to_port", "protocol", "cidr_blocks", "description")
+            and not isinstance(value, Reference)}
+
+
+def import_terraform_directory(root: str, workers: int = 1,
+                               chunksize: int = DEFAULT_CHUNKSIZE) -> TerraformImportResult:
+    """
+    Import every Terraform file under root into one InfrastructureModel.
+    With workers > 1 files are parsed on a process pool, otherwise in
+    this process.
+    """
+    if not os.path.isdir(root):
+        raise ValueError(f"Not a directory: {root}")
+
+    started = time.perf_counter()
+    tables: Dict[str, SymbolTable] = {}
+    warnings: List[str] = []
+    skipped = Counter()
+    files = total_bytes = resources = 0
+
+    def add(result: Dict[str, Any]):
+        nonlocal files, total_bytes, resources
+        files += 1
+        total_bytes += result["bytes"]
+        resources += len(result["resources"])
+        file = os.path.relpath(result["path"], root)
+        warnings.extend(error.replace(result["path"], file, 1) for error in result["errors"])
+        skipped.update(result["skipped"])
+        directory = os.path.relpath(result["directory"], root)
+        table = tables.setdefault(directory, SymbolTable(directory))
+        for record in result["resources"]:
+            record["file"] = file
+            table.add(record)
+
+    paths = iter_terraform_files(root)
+    if workers > 1:
+        with Pool(processes=workers) as pool:
+            for result in pool.imap_unordered(parse_terraform_file, paths, chunksize=chunksize):
+                add(result)
+    else:
+        for path in paths:
+            add(parse_terraform_file(path))
+    parse_seconds = time.perf_counter() - started
+
+    # imap_unordered returns files in completion order; sort for a stable model
+    assembler = ModelAssembler({directory: tables[directory] for directory in sorted(tables)})
+    model = assembler.assemble()
+    warnings.extend(assembler.warnings)
+
+    return TerraformImportResult(model, warnings, {
+        "files": files,
+        "bytes": total_bytes,
+        "resources": resources,
+        "skipped_resources": dict(skipped),
+        "parse_seconds": parse_seconds,
+        "seconds": time.perf_counter() - started,
+    })
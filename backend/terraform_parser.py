@@ -14,11 +14,29 @@ Parse Strategy:
 2. Parse only safe/editable fields
 3. Ignore any unknown blocks
 4. Convert to edit operations
+
+Terraform JSON (.tf.json) from generate_terraform_json carries the same
+metadata as structured "//" properties, so it is decoded with json.loads
+instead of the HCL parser.
+
+HCL edits are diffed incrementally (terraform_diff.py): only the resource
+blocks that changed lines touch are parsed from the modified code, and
+the original's blocks come from a cached span index. Parse results are
+cached by content hash, so re-sent documents aren't parsed again.
 """
 
+import json
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from .model import EditSource
+from .hcl import HCLSyntaxError
+from .terraform_diff import (
+    SpanIndex, DOCUMENT_CACHE, changed_hunks, content_key, parse_region, span_index, splice_span_index,
+    touched_regions
+)
+
+
+INFRA_ID_PATTERN = re.compile(r'#\s*infra_id:\s*(\S+)')
 
 
 class TerraformParseResult:
@@ -31,73 +49,90 @@ class TerraformParseResult:
         return len(self.resource_updates) > 0
 
 
-def extract_resource_blocks(terraform_code: str) -> List[Dict]:
+def extract_resource_blocks(terraform_code: Union[bytes, str]) -> List[Dict]:
     """
     Extract resource blocks with metadata from Terraform code
     
-    Returns list of resources with their infra_id and parsed properties
+    Parses the whole file with the HCL subset parser (hcl.py), so braces
+    inside strings don't confuse block boundaries and nested values (tags,
+    route blocks, subnet_ids lists) come back as dicts and lists. The parse
+    is cached by content hash (terraform_diff.DOCUMENT_CACHE).
+    
+    Returns list of resources with their infra_id, parsed properties and
+    byte span ('start', 'end') in the UTF-8 encoded code.
+    Raises HCLSyntaxError (a ValueError) for code outside the subset.
     """
+    if isinstance(terraform_code, str):
+        terraform_code = terraform_code.encode()
+    return index_resources(span_index(terraform_code))
+
+
+def index_resources(index: SpanIndex, first: int = 0, last: Optional[int] = None) -> List[Dict]:
+    """Resources in segments first..last of a span index (all by default)"""
     resources = []
     
-    # Split into lines for parsing
-    lines = terraform_code.split('\n')
+    for block, byte_shift, line_shift in index.iter_blocks(first, last):
+        if block.block_type != 'resource' or len(block.labels) != 2:
+            continue
+        infra_id = infra_id_from_comments(block.comments)
+        if not infra_id:
+            continue
+        
+        resources.append({
+            'infra_id': infra_id,
+            'terraform_type': block.labels[0],
+            'terraform_name': block.labels[1],
+            'properties': block.to_dict(),
+            'start_line': block.line - 1 + line_shift,
+            'start': block.start + byte_shift,
+            'end': block.end + byte_shift
+        })
+    
+    return resources
+
+
+def infra_id_from_comments(comments: List[str]) -> Optional[str]:
+    """The id from the last '# infra_id: <id>' comment above a block"""
+    for comment in reversed(comments):
+        match = INFRA_ID_PATTERN.match(comment)
+        if match:
+            return match.group(1)
+    return None
+
+
+def extract_resource_objects(terraform_json: str) -> List[Dict]:
+    """
+    Extract resources with metadata from .tf.json code
+    
+    One call into the C JSON decoder replaces the per-line regex scan.
+    Resources are picked up by their "//" infra_id metadata, and their
+    properties are the decoded values (numbers stay numbers).
+    """
+    try:
+        document = json.loads(terraform_json)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid Terraform JSON: {e}")
+    if not isinstance(document, dict):
+        raise ValueError("Invalid Terraform JSON: expected an object at the top level")
     
-    current_resource = None
-    current_infra_id = None
-    in_resource_block = False
-    brace_depth = 0
+    resources = []
+    resource_types = document.get("resource")
+    if not isinstance(resource_types, dict):
+        return resources
     
-    for i, line in enumerate(lines):
-        # Check for metadata comment
-        infra_id_match = re.match(r'#\s*infra_id:\s*(\S+)', line.strip())
-        if infra_id_match:
-            current_infra_id = infra_id_match.group(1)
+    for resource_type, blocks in resource_types.items():
+        if not isinstance(blocks, dict):
             continue
-        
-        # Check for resource block start
-        resource_match = re.match(r'resource\s+"([^"]+)"\s+"([^"]+)"\s*{', line.strip())
-        if resource_match and current_infra_id:
-            resource_type = resource_match.group(1)
-            resource_name = resource_match.group(2)
-            
-            current_resource = {
-                'infra_id': current_infra_id,
+        for resource_name, body in blocks.items():
+            metadata = body.get("//") if isinstance(body, dict) else None
+            if not isinstance(metadata, dict) or "infra_id" not in metadata:
+                continue
+            resources.append({
+                'infra_id': metadata['infra_id'],
                 'terraform_type': resource_type,
                 'terraform_name': resource_name,
-                'properties': {},
-                'start_line': i
-            }
-            in_resource_block = True
-            brace_depth = 1
-            current_infra_id = None  # Reset for next resource
-            continue
-        
-        # Count braces to track block depth
-        if in_resource_block:
-            brace_depth += line.count('{')
-            brace_depth -= line.count('}')
-            
-            # Parse properties (simple key = value)
-            prop_match = re.match(r'\s*(\w+)\s*=\s*(.+)', line.strip())
-            if prop_match:
-                key = prop_match.group(1)
-                value_str = prop_match.group(2).rstrip(',').strip()
-                
-                # Parse value (remove quotes, handle basic types)
-                if value_str.startswith('"') and value_str.endswith('"'):
-                    value = value_str[1:-1]
-                elif value_str.isdigit():
-                    value = int(value_str)
-                else:
-                    value = value_str
-                
-                current_resource['properties'][key] = value
-            
-            # End of resource block
-            if brace_depth == 0:
-                resources.append(current_resource)
-                current_resource = None
-                in_resource_block = False
+                'properties': body
+            })
     
     return resources
 
@@ -113,16 +148,74 @@ def map_terraform_to_model_type(terraform_type: str) -> Optional[str]:
     return mapping.get(terraform_type)
 
 
-def extract_edits_from_terraform(original_code: str, modified_code: str) -> TerraformParseResult:
+def extract_edits_from_terraform(original_code: Union[bytes, str], modified_code: Union[bytes, str],
+                                 terraform_format: str = "hcl",
+                                 incremental: bool = True) -> TerraformParseResult:
     """
     Compare original and modified Terraform to extract edit operations
     
+    terraform_format is "hcl" (.tf) or "json" (.tf.json). HCL is diffed
+    incrementally unless incremental is False (full parse of both files).
+    
     Returns:
         TerraformParseResult with list of resource updates
     """
-    original_resources = extract_resource_blocks(original_code)
-    modified_resources = extract_resource_blocks(modified_code)
+    if terraform_format == "json":
+        return compare_resources(extract_resource_objects(original_code),
+                                 extract_resource_objects(modified_code))
+    if incremental:
+        return extract_edits_incremental(original_code, modified_code)
+    return compare_resources(extract_resource_blocks(original_code),
+                             extract_resource_blocks(modified_code))
+
+
+def extract_edits_incremental(original_code: Union[bytes, str],
+                              modified_code: Union[bytes, str]) -> TerraformParseResult:
+    """
+    Diff HCL by changed hunks instead of parsing both files in full
+    
+    Each hunk is widened to the top-level blocks of the original it
+    touches (plus the comments above them), and only those bytes of the
+    modified code are parsed. Resources outside every hunk are identical
+    on both sides, so they can't produce edit operations.
+    
+    A hunk can cut a block in a way only the whole file explains (say, a
+    closing brace moved into the next block), and an infra_id that appears
+    in a hunk without being there before may duplicate an untouched block.
+    Both fall back to comparing the files in full.
+    """
+    original = original_code.encode() if isinstance(original_code, str) else original_code
+    modified = modified_code.encode() if isinstance(modified_code, str) else modified_code
+    hunks = changed_hunks(original, modified)
+    if not hunks:
+        return TerraformParseResult([], [])
     
+    index = span_index(original)
+    regions = touched_regions(index, hunks)
+    try:
+        region_blocks = [parse_region(modified[new_start:new_end]) for _, _, new_start, new_end in regions]
+    except HCLSyntaxError:
+        region_blocks = None
+    
+    if region_blocks is not None:
+        # The modified code is likely the next edit's original: index it now
+        modified_index, region_segments = splice_span_index(index, modified, regions, region_blocks)
+        original_resources = []
+        modified_resources = []
+        for (first, last, _, _), (new_first, new_last) in zip(regions, region_segments):
+            original_resources += index_resources(index, first, last)
+            modified_resources += index_resources(modified_index, new_first, new_last)
+        
+        original_ids = {r['infra_id'] for r in original_resources}
+        if all(r['infra_id'] in original_ids for r in modified_resources):
+            DOCUMENT_CACHE.put(content_key(modified), modified_index, len(modified))
+            return compare_resources(original_resources, modified_resources)
+    
+    return compare_resources(index_resources(index), extract_resource_blocks(modified))
+
+
+def compare_resources(original_resources: List[Dict], modified_resources: List[Dict]) -> TerraformParseResult:
+    """Edit operations that turn the original resources into the modified ones"""
     # Build lookup by infra_id
     original_by_id = {r['infra_id']: r for r in original_resources}
     modified_by_id = {r['infra_id']: r for r in modified_resources}
@@ -198,13 +291,14 @@ def extract_edits_from_terraform(original_code: str, modified_code: str) -> Terr
     return TerraformParseResult(resource_updates, errors)
 
 
-def parse_terraform_edits(original_terraform: str, modified_terraform: str) -> List[Dict]:
+def parse_terraform_edits(original_terraform: Union[bytes, str], modified_terraform: Union[bytes, str],
+                          terraform_format: str = "hcl") -> List[Dict]:
     """
     High-level function to parse Terraform edits into edit operations
     
     Returns list of edit operation dictionaries ready for edits.py
     """
-    result = extract_edits_from_terraform(original_terraform, modified_terraform)
+    result = extract_edits_from_terraform(original_terraform, modified_terraform, terraform_format)
     
     if result.errors:
         # Log errors but continue with what we could parse
@@ -0,0 +1,126 @@
+"""
+Benchmark for the streaming AWS inventory importer (aws_import.py).
+
+Writes describe-vpcs / describe-subnets / describe-instances /
+describe-db-instances style dumps for a synthetic model to a temporary
+directory (instances get the block device, network interface and tag
+noise real dumps have), then imports them:
+
+- load: json.load of every file, the baseline that holds whole documents
+- stream: import_aws_inventory, one record in memory at a time
+
+Columns: records/s and MB/s of the streaming import, and the Python heap
+peak (tracemalloc) of each; the streaming peak includes the model it
+builds. Every run asserts that the import reproduces the model's VPCs,
+subnets, instances and databases.
+
+Run: python extras/benchmark_aws_import.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from synthetic_models import make_synthetic_model
+from backend.aws_import import import_aws_inventory
+
+SIZES = [10_000, 50_000, 200_000]
+
+
+def tags(name):
+    return [{"Key": "Name", "Value": name}, {"Key": "Environment", "Value": "production"}]
+
+
+def instance_record(instance, vpc_id):
+    return {
+        "InstanceId": instance.id, "InstanceType": instance.instance_type.value, "ImageId": instance.ami,
+        "SubnetId": instance.subnet_id, "VpcId": vpc_id, "State": {"Code": 16, "Name": "running"},
+        "PrivateIpAddress": "10.0.0.10", "Tags": tags(instance.name),
+        "BlockDeviceMappings": [{"DeviceName": f"/dev/xvd{d}", "Ebs": {"VolumeId": f"vol-{instance.id}-{d}",
+                                                                      "Status": "attached"}} for d in "ab"],
+        "NetworkInterfaces": [{"NetworkInterfaceId": f"eni-{instance.id}", "SubnetId": instance.subnet_id,
+                               "Groups": [{"GroupId": "sg-web", "GroupName": "web"}]}],
+        "SecurityGroups": [{"GroupId": "sg-web", "GroupName": "web"}],
+    }
+
+
+def write_dumps(model, root):
+    vpc_of_subnet = {s.id: vpc.id for vpc in model.vpcs for s in vpc.subnets}
+    documents = {
+        "vpcs.json": {"Vpcs": [{"VpcId": vpc.id, "CidrBlock": vpc.cidr, "Tags": tags(vpc.name)}
+                               for vpc in model.vpcs]},
+        "subnets.json": {"Subnets": [
+            {"SubnetId": s.id, "VpcId": vpc.id, "CidrBlock": s.cidr, "AvailabilityZone": s.availability_zone,
+             "MapPublicIpOnLaunch": s.subnet_type.value == "public", "Tags": tags(s.name)}
+            for vpc in model.vpcs for s in vpc.subnets]},
+        "instances.json": {"Reservations": [
+            {"ReservationId": f"r-{n}", "Instances": [instance_record(i, vpc_of_subnet[i.subnet_id])
+                                                      for i in model.ec2_instances[n:n + 10]]}
+            for n in range(0, len(model.ec2_instances), 10)]},
+        "db-instances.json": {"DBInstances": [
+            {"DBInstanceIdentifier": db.id, "Engine": db.engine.value, "DBInstanceClass": db.instance_class,
+             "AllocatedStorage": db.allocated_storage,
+             "DBSubnetGroup": {"Subnets": [{"SubnetIdentifier": s} for s in db.subnet_ids]}}
+            for db in model.rds_databases]},
+    }
+    for filename, document in documents.items():
+        with open(os.path.join(root, filename), "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=4)
+
+
+def model_key(model):
+    return ([(v.id, v.cidr, [(s.id, s.subnet_type) for s in v.subnets]) for v in model.vpcs],
+            [(i.id, i.instance_type, i.subnet_id) for i in model.ec2_instances],
+            [(db.id, db.engine, db.subnet_ids) for db in model.rds_databases])
+
+
+def peak_of(func):
+    """(result, seconds, peak traced MB) of func()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def load_all(root):
+    documents = []
+    for filename in sorted(os.listdir(root)):
+        with open(os.path.join(root, filename), encoding="utf-8") as f:
+            documents.append(json.load(f))
+    return documents
+
+
+def main():
+    print(f"{'nodes':>8} {'records':>9} {'MB':>7} {'stream s':>9} {'records/s':>10} {'MB/s':>7} "
+          f"{'load peak MB':>13} {'stream peak MB':>15}")
+    for size in SIZES:
+        model = make_synthetic_model(size)
+        root = tempfile.mkdtemp(prefix="aws-import-")
+        try:
+            write_dumps(model, root)
+            _, _, load_peak = peak_of(lambda: load_all(root))
+
+            # Timed without tracemalloc, which slows allocation down
+            start = time.perf_counter()
+            result = import_aws_inventory(root)
+            seconds = time.perf_counter() - start
+            assert model_key(result.model) == model_key(model), "imported model differs"
+            assert not result.warnings, result.warnings[:3]
+            _, _, stream_peak = peak_of(lambda: import_aws_inventory(root))
+
+            megabytes = result.stats["bytes"] / 1e6
+            print(f"{size:>8} {result.stats['records']:>9} {megabytes:>7.1f} {seconds:>9.3f} "
+                  f"{result.stats['records'] / seconds:>10.0f} {megabytes / seconds:>7.1f} "
+                  f"{load_peak:>13.1f} {stream_peak:>15.1f}")
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark for the Mermaid diagram generator.
+Shows that generation time per node stays flat (linear scaling) up to 50k
+nodes, how many relationship edges bundling saves, and how many bytes the
+compact style (short aliases + classDef) saves. Every compact render is
+checked for aliases that collide or spell a Mermaid keyword.
+
+Run: python extras/benchmark_diagram.py
+"""
+
+import time
+
+from synthetic_models import make_synthetic_model
+from backend.diagram import generate_mermaid_diagram, generate_compact_diagram, FRAGMENT_CACHE, MERMAID_KEYWORDS
+
+SIZES = [1_000, 5_000, 10_000, 25_000, 50_000]
+REPEATS = 3
+
+# "full" edges grow as instances x databases; skip it beyond this size
+FULL_EDGES_MAX_NODES = 10_000
+
+
+STYLES = {
+    "standard": lambda model, edge_mode: generate_mermaid_diagram(model, edge_mode),
+    "compact": lambda model, edge_mode: generate_compact_diagram(model, edge_mode)[0],
+}
+
+
+def check_compact_aliases(model, edge_mode: str):
+    _, aliases = generate_compact_diagram(model, edge_mode)
+    resources = (len(model.vpcs) + sum(len(vpc.subnets) for vpc in model.vpcs) + len(model.ec2_instances)
+                 + len(model.rds_databases) + len(model.load_balancers))
+    assert len(aliases) == resources, "compact aliases collide"
+    reserved = [name for name in aliases if name.lower() in MERMAID_KEYWORDS]
+    assert not reserved, f"compact aliases spell Mermaid keywords: {reserved}"
+
+
+def count_edges(diagram: str) -> int:
+    return sum(1 for line in diagram.splitlines() if "-->" in line or "-.->" in line)
+
+
+def main():
+    print(f"{'nodes':>8} {'edge mode':>10} {'style':>9} {'seconds':>9} {'us/node':>9} "
+          f"{'edges':>10} {'bytes':>12}")
+    for nodes in SIZES:
+        model = make_synthetic_model(nodes)
+        for edge_mode in ("bundled", "full"):
+            if edge_mode == "full" and nodes > FULL_EDGES_MAX_NODES:
+                continue
+            check_compact_aliases(model, edge_mode)
+            for style, generate in STYLES.items():
+                best = float("inf")
+                for _ in range(REPEATS):
+                    FRAGMENT_CACHE.clear()  # Time cold renders, not cache hits
+                    start = time.perf_counter()
+                    diagram = generate(model, edge_mode)
+                    best = min(best, time.perf_counter() - start)
+                print(f"{nodes:>8} {edge_mode:>10} {style:>9} {best:>9.4f} {best / nodes * 1e6:>9.2f} "
+                      f"{count_edges(diagram):>10} {len(diagram.encode()):>12}")
+
+
+if __name__ == "__main__":
+    main()
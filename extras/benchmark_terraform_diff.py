@@ -0,0 +1,129 @@
+"""
+Benchmark for incremental Terraform edit diffing (terraform_diff.py).
+
+Each run diffs the Terraform of a synthetic model against the Terraform
+of the same model after some one-property edits:
+
+- full: both files parsed in full by the HCL subset parser
+- first: incremental with empty parse caches (parses the original once)
+- incremental: only hunks are diffed and re-parsed, with the span index
+  of the original already cached (the usual case: edits against the
+  file the server generated, or re-sent requests)
+- next: the following edit, whose original is this edit's modified file;
+  its span index was spliced together by this edit, so nothing is parsed
+  but the new hunks
+- range: the edit sent as LSP-style range changes, applied to the
+  compressed baseline the server keeps (decompress, apply, diff)
+
+Every run asserts that all of them agree, and reports the upload size of
+the range changes vs the two full texts.
+
+Run: python extras/benchmark_terraform_diff.py
+"""
+
+import json
+import time
+import zlib
+
+from synthetic_models import make_synthetic_model
+from backend.model import EditSource
+from backend.edits import update_resource_property
+from backend.terraform import generate_terraform_code
+from backend.terraform_diff import apply_text_changes, changed_hunks, clear_parse_caches, span_index
+from backend.terraform_parser import extract_edits_from_terraform
+
+SIZES = [1_000, 5_000, 10_000, 25_000]
+EDIT_COUNTS = [1, 10]
+REPEATS = 3
+
+
+def best_of(func) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def edit_instances(model, count: int):
+    """The model with count instances, spread over the file, given another type"""
+    instances = model.ec2_instances
+    for position in range(count):
+        target = instances[(2 * position + 1) * len(instances) // (2 * count)]
+        value = "t2.medium" if target.instance_type.value != "t2.medium" else "t3.small"
+        result = update_resource_property(model, target.id, "instance_type", value, EditSource.DIAGRAM)
+        assert result.success, result.error
+        model = result.model
+    return model
+
+
+def range_changes(original: bytes, modified: bytes):
+    """LSP-style changes turning original into modified, bottom-up like an editor sends them"""
+    changes = []
+    for a1, a2, b1, b2 in reversed(changed_hunks(original, modified)):
+        start = original.count(b"\n", 0, a1)
+        end = start + original.count(b"\n", a1, a2)
+        changes.append({
+            "range": {"start": {"line": start, "character": 0}, "end": {"line": end, "character": 0}},
+            "text": modified[b1:b2].decode()
+        })
+    return changes
+
+
+def main():
+    print(f"{'resources':>10} {'edits':>6} {'full s':>9} {'first s':>9} {'incr s':>9} {'next s':>9} "
+          f"{'range s':>9} {'speedup':>8} {'bytes':>12} {'upload':>8}")
+    for size in SIZES:
+        model = make_synthetic_model(size)
+        original = generate_terraform_code(model)
+        for count in EDIT_COUNTS:
+            modified = generate_terraform_code(edit_instances(model, count))
+            following_edit = modified.replace('"t2.micro"', '"t3.micro"', 1)
+
+            def full():
+                clear_parse_caches()
+                return extract_edits_from_terraform(original, modified, incremental=False).resource_updates
+
+            def incremental():
+                return extract_edits_from_terraform(original, modified).resource_updates
+
+            def first():
+                clear_parse_caches()
+                incremental()
+
+            def following():
+                clear_parse_caches()
+                incremental()
+                start = time.perf_counter()
+                extract_edits_from_terraform(modified, following_edit)
+                return time.perf_counter() - start
+
+            baseline = zlib.compress(original.encode(), 1)
+            changes = json.loads(json.dumps(range_changes(original.encode(), modified.encode())))
+
+            def ranged():
+                data = zlib.decompress(baseline)
+                edited = apply_text_changes(data, span_index(data), changes)
+                return extract_edits_from_terraform(data, edited).resource_updates
+
+            operations = full()
+            assert len(operations) == count, operations
+            assert incremental() == operations, "incremental diff disagrees with the full parse"
+            assert ranged() == operations, "range changes disagree with the full parse"
+
+            full_seconds = best_of(full)
+            first_seconds = best_of(first)
+            incremental()
+            incremental_seconds = best_of(incremental)
+            range_seconds = best_of(ranged)
+            next_seconds = min(following() for _ in range(REPEATS))
+            upload = len(json.dumps(changes)) / (len(original.encode()) + len(modified.encode()))
+
+            print(f"{size:>10} {count:>6} {full_seconds:>9.4f} {first_seconds:>9.4f} {incremental_seconds:>9.4f} "
+                  f"{next_seconds:>9.4f} {range_seconds:>9.4f} {full_seconds / incremental_seconds:>7.0f}x "
+                  f"{len(original.encode()):>12} {upload:>8.5%}")
+
+
+if __name__ == "__main__":
+    main()
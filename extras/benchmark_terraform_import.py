@@ -0,0 +1,70 @@
+"""
+Benchmark for the Terraform directory importer (terraform_import.py).
+
+The Terraform of a synthetic model is split into FILES files (one top-level
+block never spans two files) in a temporary directory, then imported with
+one worker and with one worker per CPU. Every run asserts that the
+imported model has the same resources as the original.
+
+Columns: import time, files/s and MB/s, and this process's peak RSS
+(which includes the synthetic model and its generated Terraform).
+
+Run: python extras/benchmark_terraform_import.py
+"""
+
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from synthetic_models import make_synthetic_model
+from backend.terraform import generate_terraform_code
+from backend.terraform_import import import_terraform_directory, top_level_spans
+
+SIZES = [1_000, 5_000, 10_000, 25_000]
+FILES = 64
+WORKER_COUNTS = sorted({1, os.cpu_count() or 1})
+
+
+def write_tree(root: str, code: str):
+    """Split code into FILES files on top-level block boundaries"""
+    data = code.encode()
+    spans = list(top_level_spans(data))
+    for n in range(FILES):
+        chunk = spans[n * len(spans) // FILES:(n + 1) * len(spans) // FILES]
+        with open(os.path.join(root, f"part_{n:03d}.tf"), "wb") as f:
+            f.write(b"\n\n".join(data[start:end] for start, end in chunk))
+
+
+def resource_ids(model):
+    return (sorted(v.id for v in model.vpcs), sorted(s.id for v in model.vpcs for s in v.subnets),
+            sorted(e.id for e in model.ec2_instances), sorted(r.id for r in model.rds_databases),
+            sorted((lb.id, tuple(lb.target_instance_ids)) for lb in model.load_balancers))
+
+
+def main():
+    print(f"{'resources':>10} {'workers':>8} {'import s':>9} {'files/s':>9} {'MB/s':>7} "
+          f"{'peak RSS MB':>12} {'MB':>7}")
+    for size in SIZES:
+        model = make_synthetic_model(size)
+        root = tempfile.mkdtemp(prefix="tf-import-")
+        try:
+            write_tree(root, generate_terraform_code(model))
+            for workers in WORKER_COUNTS:
+                start = time.perf_counter()
+                result = import_terraform_directory(root, workers=workers)
+                seconds = time.perf_counter() - start
+                assert resource_ids(result.model) == resource_ids(model), "imported model differs"
+                assert not result.warnings, result.warnings[:3]
+
+                megabytes = result.stats["bytes"] / 1e6
+                peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                print(f"{size:>10} {workers:>8} {seconds:>9.3f} {result.stats['files'] / seconds:>9.0f} "
+                      f"{megabytes / seconds:>7.1f} {peak:>12.0f} {megabytes:>7.1f}")
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark for the Terraform reverse parser: the HCL subset parser (.tf)
+vs one json.loads of the JSON syntax (.tf.json).
+
+Each run diffs the Terraform of a synthetic model against the Terraform of
+the same model after a one-property edit, in both formats, and asserts
+that both produce the same edit operations. The HCL parse caches are
+cleared before every run.
+
+Run: python extras/benchmark_terraform_parser.py
+"""
+
+import time
+
+from synthetic_models import make_synthetic_model
+from backend.model import EditSource
+from backend.edits import update_resource_property
+from backend.terraform import generate_terraform_code, generate_terraform_json
+from backend.terraform_diff import clear_parse_caches
+from backend.terraform_parser import parse_terraform_edits
+
+SIZES = [1_000, 5_000, 10_000, 25_000]
+REPEATS = 3
+
+
+def best_of(func) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'resources':>10} {'hcl s':>9} {'json s':>9} {'speedup':>8} {'hcl bytes':>12} {'json bytes':>12}")
+    for size in SIZES:
+        model = make_synthetic_model(size)
+        target = model.ec2_instances[len(model.ec2_instances) // 2]
+        result = update_resource_property(model, target.id, "instance_type", "t3.small", EditSource.DIAGRAM)
+        assert result.success, result.error
+        edited = result.model
+
+        hcl = (generate_terraform_code(model), generate_terraform_code(edited))
+        tf_json = (generate_terraform_json(model), generate_terraform_json(edited))
+
+        operations = parse_terraform_edits(*hcl)
+        assert operations == parse_terraform_edits(*tf_json, terraform_format="json"), "formats disagree"
+        assert len(operations) == 1, operations
+
+        hcl_seconds = best_of(lambda: (clear_parse_caches(), parse_terraform_edits(*hcl)))
+        json_seconds = best_of(lambda: parse_terraform_edits(*tf_json, terraform_format="json"))
+
+        print(f"{size:>10} {hcl_seconds:>9.4f} {json_seconds:>9.4f} {hcl_seconds / json_seconds:>7.1f}x "
+              f"{len(hcl[1].encode()):>12} {len(tf_json[1].encode()):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Legacy Terraform generator, kept as the reference for
+benchmark_terraform.py: backend.terraform as it was between the
+per-resource section cache and the precompiled templates (line-by-line
+f-strings joined per section, behind the same SECTION_CACHE). It is not
+the original uncached generator, so the benchmark isolates what the
+templates gain. Its output must stay byte-identical to the current
+generator's.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from operator import attrgetter
+from typing import Callable, Iterator, List, Tuple
+
+import synthetic_models  # noqa: F401 (puts the repo root on sys.path)
+from backend.model import InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer, SubnetType
+
+
+def generate_terraform_code(model: InfrastructureModel) -> str:
+    """
+    Generate Terraform code from the infrastructure model.
+    
+    Model → Terraform (never Text → Terraform directly)
+    
+    Embeds stable resource IDs in comments for reverse-parsing.
+    This allows us to parse Terraform back into edit operations.
+    
+    Metadata Format:
+        # infra_id: resource-id  <- Maps back to model resource
+        # editable: property     <- Marks safe-to-edit fields
+    """
+    pieces = []
+    for section in iter_terraform_sections(model):
+        pieces.append(section)
+        pieces.append("\n\n")
+    pieces[-1] = "\n"
+    return "".join(pieces)
+
+
+def iter_terraform_code(model: InfrastructureModel) -> Iterator[str]:
+    """
+    Stream the Terraform code one section at a time.
+    
+    Joining the chunks gives exactly generate_terraform_code's output, but
+    only one resource's text is held at a time.
+    """
+    separator = ""
+    for section in iter_terraform_sections(model):
+        yield separator + section
+        separator = "\n\n"
+    yield "\n"
+
+
+# Rendered resource sections by resource id: (content key, text). Bounded,
+# oldest-rendered first out.
+SECTION_CACHE_SIZE = 65536
+SECTION_CACHE: "OrderedDict[str, Tuple[tuple, str]]" = OrderedDict()
+SECTION_CACHE_LOCK = Lock()
+
+# Content keys: every field a section renders, including what it references
+# from neighbouring resources (VPC id, subnet ids, target ids)
+EC2_KEY = attrgetter("name", "ami", "instance_type", "subnet_id")
+RDS_KEY = attrgetter("name", "engine", "instance_class", "allocated_storage")
+SUBNET_KEY = attrgetter("name", "cidr", "availability_zone", "subnet_type")
+
+
+def cached_section(slot: str, key: tuple, render: Callable[..., str], *args) -> str:
+    """
+    Return the cached text for slot if it was rendered from an equal key,
+    otherwise render(*args) and cache it.
+    
+    Slots are resource ids, so a hit costs one string-keyed lookup and a
+    tuple comparison. Edited models share their unchanged strings and enum
+    members with the original, so the comparison short-circuits on identity
+    and an edit only re-renders the sections whose content changed.
+    """
+    entry = SECTION_CACHE.get(slot)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    
+    text = render(*args)
+    with SECTION_CACHE_LOCK:
+        SECTION_CACHE[slot] = (key, text)
+        if len(SECTION_CACHE) > SECTION_CACHE_SIZE:
+            SECTION_CACHE.popitem(last=False)
+    return text
+
+
+def iter_terraform_sections(model: InfrastructureModel) -> Iterator[str]:
+    """
+    Header, then one section per resource (with its helper resources), in
+    file order. Unchanged sections come from the section cache, so after an
+    edit only the invalidated resources are rendered again.
+    """
+    yield terraform_header(model)
+    first_vpc = model.vpcs[0] if model.vpcs else None
+    first_vpc_id = first_vpc.id if first_vpc else None
+    
+    for vpc in model.vpcs:
+        has_public = any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets)
+        yield cached_section(vpc.id, (vpc.name, vpc.cidr, has_public), vpc_section, vpc)
+        for subnet in vpc.subnets:
+            yield cached_section(subnet.id, (vpc.id, SUBNET_KEY(subnet)), subnet_section, vpc, subnet)
+    
+    if model.ec2_instances or model.rds_databases:
+        yield security_group_section(first_vpc)
+    
+    for ec2 in model.ec2_instances:
+        yield cached_section(ec2.id, EC2_KEY(ec2), ec2_section, ec2)
+    
+    for rds in model.rds_databases:
+        yield cached_section(rds.id, (RDS_KEY(rds), tuple(rds.subnet_ids)), rds_section, rds)
+    
+    for lb in model.load_balancers:
+        yield cached_section(
+            lb.id, (lb.name, tuple(lb.subnet_ids), tuple(lb.target_instance_ids), first_vpc_id),
+            load_balancer_section, lb, first_vpc
+        )
+
+
+def terraform_header(model: InfrastructureModel) -> str:
+    lines = [
+        "# Terraform Infrastructure as Code",
+        "# Generated from Infrastructure Model",
+        f"# Model ID: {model.model_id}",
+        f"# Last Edit Source: {model.last_edit_source.value}",
+        "#",
+        "# METADATA NOTES:",
+        "#   infra_id: <id>  - Maps resource to model (DO NOT MODIFY)",
+        "#   editable: <prop> - Safe to edit this property",
+        "",
+        "terraform {",
+        "  required_providers {",
+        "    aws = {",
+        "      source  = \"hashicorp/aws\"",
+        "      version = \"~> 5.0\"",
+        "    }",
+        "  }",
+        "}",
+        "",
+        "provider \"aws\" {",
+        "  region = \"us-east-1\"",
+        "}",
+    ]
+    return "\n".join(lines)
+
+
+def vpc_section(vpc: VPC) -> str:
+    """VPC, plus an Internet Gateway if it has public subnets"""
+    lines = []
+    lines.append(f"# infra_id: {vpc.id}")
+    lines.append(f"resource \"aws_vpc\" \"{vpc.id.replace('-', '_')}\" {{")
+    lines.append(f"  cidr_block           = \"{vpc.cidr}\"")
+    lines.append(f"  enable_dns_hostnames = true")
+    lines.append(f"  enable_dns_support   = true")
+    lines.append(f"")
+    lines.append(f"  tags = {{")
+    lines.append(f"    Name = \"{vpc.name}\"")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    
+    # Generate Internet Gateway for VPCs with public subnets
+    has_public = any(s.subnet_type == SubnetType.PUBLIC for s in vpc.subnets)
+    if has_public:
+        lines.append("")
+        lines.append(f"# Internet Gateway for {vpc.id}")
+        lines.append(f"resource \"aws_internet_gateway\" \"{vpc.id.replace('-', '_')}_igw\" {{")
+        lines.append(f"  vpc_id = aws_vpc.{vpc.id.replace('-', '_')}.id")
+        lines.append(f"")
+        lines.append(f"  tags = {{")
+        lines.append(f"    Name = \"{vpc.name}-igw\"")
+        lines.append(f"  }}")
+        lines.append(f"}}")
+    return "\n".join(lines)
+
+
+def subnet_section(vpc: VPC, subnet: Subnet) -> str:
+    """Subnet, plus a route table and association for public subnets"""
+    lines = []
+    lines.append(f"# infra_id: {subnet.id}")
+    lines.append(f"resource \"aws_subnet\" \"{subnet.id.replace('-', '_')}\" {{")
+    lines.append(f"  vpc_id            = aws_vpc.{vpc.id.replace('-', '_')}.id")
+    lines.append(f"  cidr_block        = \"{subnet.cidr}\"")
+    lines.append(f"  availability_zone = \"{subnet.availability_zone}\"")
+    
+    if subnet.subnet_type == SubnetType.PUBLIC:
+        lines.append(f"  map_public_ip_on_launch = true")
+    
+    lines.append(f"")
+    lines.append(f"  tags = {{")
+    lines.append(f"    Name = \"{subnet.name}\"")
+    lines.append(f"    Type = \"{subnet.subnet_type.value}\"")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    
+    # Generate Route Table for public subnets
+    if subnet.subnet_type == SubnetType.PUBLIC:
+        lines.append("")
+        lines.append(f"# Route Table for {subnet.id}")
+        lines.append(f"resource \"aws_route_table\" \"{subnet.id.replace('-', '_')}_rt\" {{")
+        lines.append(f"  vpc_id = aws_vpc.{vpc.id.replace('-', '_')}.id")
+        lines.append(f"")
+        lines.append(f"  route {{")
+        lines.append(f"    cidr_block = \"0.0.0.0/0\"")
+        lines.append(f"    gateway_id = aws_internet_gateway.{vpc.id.replace('-', '_')}_igw.id")
+        lines.append(f"  }}")
+        lines.append(f"")
+        lines.append(f"  tags = {{")
+        lines.append(f"    Name = \"{subnet.name}-rt\"")
+        lines.append(f"  }}")
+        lines.append(f"}}")
+        lines.append("")
+        
+        lines.append(f"resource \"aws_route_table_association\" \"{subnet.id.replace('-', '_')}_rta\" {{")
+        lines.append(f"  subnet_id      = aws_subnet.{subnet.id.replace('-', '_')}.id")
+        lines.append(f"  route_table_id = aws_route_table.{subnet.id.replace('-', '_')}_rt.id")
+        lines.append(f"}}")
+    return "\n".join(lines)
+
+
+def security_group_section(first_vpc: "VPC | None") -> str:
+    """Shared security group for EC2 instances, in the first VPC"""
+    lines = []
+    lines.append("# Security Group for EC2 instances")
+    lines.append(f"resource \"aws_security_group\" \"ec2_sg\" {{")
+    lines.append(f"  name        = \"ec2-security-group\"")
+    lines.append(f"  description = \"Security group for EC2 instances\"")
+    if first_vpc:
+        lines.append(f"  vpc_id      = aws_vpc.{first_vpc.id.replace('-', '_')}.id")
+    lines.append(f"")
+    lines.append(f"  ingress {{")
+    lines.append(f"    from_port   = 80")
+    lines.append(f"    to_port     = 80")
+    lines.append(f"    protocol    = \"tcp\"")
+    lines.append(f"    cidr_blocks = [\"0.0.0.0/0\"]")
+    lines.append(f"  }}")
+    lines.append(f"")
+    lines.append(f"  ingress {{")
+    lines.append(f"    from_port   = 443")
+    lines.append(f"    to_port     = 443")
+    lines.append(f"    protocol    = \"tcp\"")
+    lines.append(f"    cidr_blocks = [\"0.0.0.0/0\"]")
+    lines.append(f"  }}")
+    lines.append(f"")
+    lines.append(f"  egress {{")
+    lines.append(f"    from_port   = 0")
+    lines.append(f"    to_port     = 0")
+    lines.append(f"    protocol    = \"-1\"")
+    lines.append(f"    cidr_blocks = [\"0.0.0.0/0\"]")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    return "\n".join(lines)
+
+
+def ec2_section(ec2: EC2Instance) -> str:
+    lines = []
+    lines.append(f"# infra_id: {ec2.id}")
+    lines.append(f"resource \"aws_instance\" \"{ec2.id.replace('-', '_')}\" {{")
+    lines.append(f"  ami           = \"{ec2.ami}\"")
+    lines.append(f"  # editable: instance_type")
+    lines.append(f"  instance_type = \"{ec2.instance_type.value}\"")
+    lines.append(f"  # editable: subnet_id")
+    lines.append(f"  subnet_id     = aws_subnet.{ec2.subnet_id.replace('-', '_')}.id")
+    lines.append(f"  vpc_security_group_ids = [aws_security_group.ec2_sg.id]")
+    lines.append(f"")
+    lines.append(f"  tags = {{")
+    lines.append(f"    Name = \"{ec2.name}\"")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    return "\n".join(lines)
+
+
+def rds_section(rds: RDSDatabase) -> str:
+    """DB subnet group and RDS instance"""
+    lines = []
+    # Create DB Subnet Group
+    lines.append(f"# DB Subnet Group for {rds.id}")
+    lines.append(f"resource \"aws_db_subnet_group\" \"{rds.id.replace('-', '_')}_subnet_group\" {{")
+    lines.append(f"  name       = \"{rds.name}-subnet-group\"")
+    subnet_refs = [f"aws_subnet.{sid.replace('-', '_')}.id" for sid in rds.subnet_ids]
+    lines.append(f"  subnet_ids = [{', '.join(subnet_refs)}]")
+    lines.append(f"")
+    lines.append(f"  tags = {{")
+    lines.append(f"    Name = \"{rds.name}-subnet-group\"")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    lines.append("")
+    
+    # Create RDS instance
+    lines.append(f"# infra_id: {rds.id}")
+    lines.append(f"resource \"aws_db_instance\" \"{rds.id.replace('-', '_')}\" {{")
+    lines.append(f"  identifier           = \"{rds.name}\"")
+    lines.append(f"  engine               = \"{rds.engine.value}\"")
+    lines.append(f"  # editable: instance_class")
+    lines.append(f"  instance_class       = \"{rds.instance_class}\"")
+    lines.append(f"  # editable: allocated_storage")
+    lines.append(f"  allocated_storage    = {rds.allocated_storage}")
+    lines.append(f"  db_subnet_group_name = aws_db_subnet_group.{rds.id.replace('-', '_')}_subnet_group.name")
+    lines.append(f"  skip_final_snapshot  = true")
+    lines.append(f"")
+    lines.append(f"  # Credentials should be managed via AWS Secrets Manager in production")
+    lines.append(f"  username = \"admin\"")
+    lines.append(f"  password = \"change-me-in-production\"")
+    lines.append(f"")
+    lines.append(f"  tags = {{")
+    lines.append(f"    Name = \"{rds.name}\"")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    return "\n".join(lines)
+
+
+def load_balancer_section(lb: LoadBalancer, first_vpc: "VPC | None") -> str:
+    """Load balancer, plus its target group and attachments"""
+    lines = []
+    lines.append(f"# infra_id: {lb.id}")
+    lines.append(f"resource \"aws_lb\" \"{lb.id.replace('-', '_')}\" {{")
+    lines.append(f"  name               = \"{lb.name}\"")
+    lines.append(f"  internal           = false")
+    lines.append(f"  load_balancer_type = \"application\"")
+    subnet_refs = [f"aws_subnet.{sid.replace('-', '_')}.id" for sid in lb.subnet_ids]
+    lines.append(f"  subnets            = [{', '.join(subnet_refs)}]")
+    lines.append(f"")
+    lines.append(f"  tags = {{")
+    lines.append(f"    Name = \"{lb.name}\"")
+    lines.append(f"  }}")
+    lines.append(f"}}")
+    
+    # Create Target Group
+    if lb.target_instance_ids:
+        lines.append("")
+        lines.append(f"# Target Group for {lb.id}")
+        lines.append(f"resource \"aws_lb_target_group\" \"{lb.id.replace('-', '_')}_tg\" {{")
+        lines.append(f"  name     = \"{lb.name}-tg\"")
+        lines.append(f"  port     = 80")
+        lines.append(f"  protocol = \"HTTP\"")
+        if first_vpc:
+            lines.append(f"  vpc_id   = aws_vpc.{first_vpc.id.replace('-', '_')}.id")
+        lines.append(f"}}")
+        
+        # Attach instances to target group
+        for target_id in lb.target_instance_ids:
+            lines.append("")
+            lines.append(f"resource \"aws_lb_target_group_attachment\" \"{lb.id.replace('-', '_')}_{target_id.replace('-', '_')}\" {{")
+            lines.append(f"  target_group_arn = aws_lb_target_group.{lb.id.replace('-', '_')}_tg.arn")
+            lines.append(f"  target_id        = aws_instance.{target_id.replace('-', '_')}.id")
+            lines.append(f"  port             = 80")
+            lines.append(f"}}")
+    return "\n".join(lines)
@@ -0,0 +1,80 @@
+"""
+Legacy Terraform resource scanner, kept as the reference for
+benchmark_hcl.py: backend.terraform_parser.extract_resource_blocks as it was
+before the HCL subset parser (per-line regexes and brace counting, flat
+key = value properties only).
+"""
+
+import re
+from typing import Dict, List
+
+
+def extract_resource_blocks(terraform_code: str) -> List[Dict]:
+    """
+    Extract resource blocks with metadata from Terraform code
+    
+    Returns list of resources with their infra_id and parsed properties
+    """
+    resources = []
+    
+    # Split into lines for parsing
+    lines = terraform_code.split('\n')
+    
+    current_resource = None
+    current_infra_id = None
+    in_resource_block = False
+    brace_depth = 0
+    
+    for i, line in enumerate(lines):
+        # Check for metadata comment
+        infra_id_match = re.match(r'#\s*infra_id:\s*(\S+)', line.strip())
+        if infra_id_match:
+            current_infra_id = infra_id_match.group(1)
+            continue
+        
+        # Check for resource block start
+        resource_match = re.match(r'resource\s+"([^"]+)"\s+"([^"]+)"\s*{', line.strip())
+        if resource_match and current_infra_id:
+            resource_type = resource_match.group(1)
+            resource_name = resource_match.group(2)
+            
+            current_resource = {
+                'infra_id': current_infra_id,
+                'terraform_type': resource_type,
+                'terraform_name': resource_name,
+                'properties': {},
+                'start_line': i
+            }
+            in_resource_block = True
+            brace_depth = 1
+            current_infra_id = None  # Reset for next resource
+            continue
+        
+        # Count braces to track block depth
+        if in_resource_block:
+            brace_depth += line.count('{')
+            brace_depth -= line.count('}')
+            
+            # Parse properties (simple key = value)
+            prop_match = re.match(r'\s*(\w+)\s*=\s*(.+)', line.strip())
+            if prop_match:
+                key = prop_match.group(1)
+                value_str = prop_match.group(2).rstrip(',').strip()
+                
+                # Parse value (remove quotes, handle basic types)
+                if value_str.startswith('"') and value_str.endswith('"'):
+                    value = value_str[1:-1]
+                elif value_str.isdigit():
+                    value = int(value_str)
+                else:
+                    value = value_str
+                
+                current_resource['properties'][key] = value
+            
+            # End of resource block
+            if brace_depth == 0:
+                resources.append(current_resource)
+                current_resource = None
+                in_resource_block = False
+    
+    return resources
@@ -0,0 +1,71 @@
+"""
+Synthetic infrastructure models for benchmarks.
+Builds large but realistic models directly from the dataclasses.
+"""
+
+import os
+import sys
+
+# Allow running the extras scripts from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.model import (
+    InfrastructureModel, VPC, Subnet, EC2Instance, RDSDatabase, LoadBalancer,
+    SubnetType, InstanceType, DatabaseEngine
+)
+
+
+def make_synthetic_model(nodes: int, subnets_per_vpc: int = 20, instances_per_db: int = 50,
+                         instances_per_lb: int = 100) -> InfrastructureModel:
+    """
+    Build a model with roughly `nodes` diagram nodes (subnets + resources).
+
+    Subnets alternate public/private; one VPC per `subnets_per_vpc` subnets.
+    Web servers go in public subnets, app servers in private ones, and each
+    load balancer targets a run of consecutive instances.
+    """
+    model = InfrastructureModel()
+    subnet_count = max(2, nodes // 25)
+    instance_types = list(InstanceType)
+    engines = list(DatabaseEngine)
+
+    public, private = [], []
+    for n in range(subnet_count):
+        if n % subnets_per_vpc == 0:
+            v = n // subnets_per_vpc
+            vpc = VPC(id=f"vpc-{v}", name=f"vpc-{v}", cidr=f"10.{v % 256}.0.0/16")
+            model.add_vpc(vpc)
+        subnet_type = SubnetType.PUBLIC if n % 2 == 0 else SubnetType.PRIVATE
+        subnet = Subnet(
+            id=f"subnet-{n}", name=f"subnet-{n}",
+            cidr=f"10.{(n // subnets_per_vpc) % 256}.{n % subnets_per_vpc}.0/24",
+            subnet_type=subnet_type, availability_zone=f"us-east-1{'abc'[n % 3]}"
+        )
+        vpc.add_subnet(subnet)
+        (public if subnet_type == SubnetType.PUBLIC else private).append(subnet.id)
+
+    remaining = nodes - subnet_count
+    db_count = max(1, remaining // instances_per_db)
+    lb_count = max(1, remaining // instances_per_lb)
+    instance_count = max(1, remaining - db_count - lb_count)
+
+    for n in range(instance_count):
+        pool = public if n % 2 == 0 else private
+        model.add_ec2(EC2Instance(
+            id=f"ec2-{n}", name=f"server-{n}",
+            instance_type=instance_types[n % len(instance_types)],
+            subnet_id=pool[(n // 2) % len(pool)]
+        ))
+    for n in range(db_count):
+        model.add_rds(RDSDatabase(
+            id=f"rds-{n}", name=f"database-{n}", engine=engines[n % len(engines)],
+            instance_class="db.t3.micro",
+            subnet_ids=[private[n % len(private)], private[(n + 1) % len(private)]]
+        ))
+    per_lb = max(1, instance_count // lb_count)
+    for n in range(lb_count):
+        model.add_load_balancer(LoadBalancer(
+            id=f"lb-{n}", name=f"lb-{n}", subnet_ids=public[:2],
+            target_instance_ids=[f"ec2-{i}" for i in range(n * per_lb, min((n + 1) * per_lb, instance_count))]
+        ))
+    return model